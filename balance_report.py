@@ -0,0 +1,332 @@
+# balance_report.py
+"""
+カードプールのバランスレポート（差分だけ再シミュレーション）
+
+    python balance_report.py                      # スターター＋各カード1枚の表
+    python balance_report.py --cards S9 S12       # 一部のカードだけ
+    python balance_report.py --enemy-hp 60 --games 4000
+    python balance_report.py --enemy SAMURAI_SCRIPTED
+    python balance_report.py --run FIRST_CAMPAIGN    # 連戦の難易度曲線（encounter.py。キャッシュなし）
+
+- 各カード spec（data.CARD_SPECS の1エントリ）を内容でハッシュする
+  ＋エンジンの指紋（ENGINE_VERSION と戦闘コードのソース）
+  ＋policy の指紋（simulate.policy_key：名前・設定・定義モジュールのソース）
+- 対戦結果は (デッキ, 敵・戦闘条件, seed 範囲) 単位でディスクにキャッシュ（CACHE_DIR）
+  デッキのキーは「spec_id とその spec ハッシュ」の多重集合なので、
+  1枚の数値を変えたときに再実行されるのはそのカードを含む対戦だけ
+- seed 範囲は BLOCK 戦ずつに区切る（--games を増やしても既存ブロックは使い回す）
+- カード別の指標
+    win Δ      : ベースデッキ＋そのカード1枚の勝率 − ベースデッキの勝率
+    turns Δ    : 同じく平均ターン数の差
+    plays/game : そのカードを1戦で何回出したか
+    dmg/energy : そのカードで減らした敵HP ÷ 払ったエナジー（コスト0のカードは dmg/play）
+"""
+
+from __future__ import annotations
+import argparse
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from data import CARD_SPECS, ENEMY_SPECS, RUN_SPECS
+from parallel_sim import SimJob, SimStats, run_jobs
+from simulate import Policy, _play_out, greedy_policy, policy_key
+
+# ルール・乱数の使い方を変えたら上げる（ソースの変更は ENGINE_FILES のハッシュでも拾う）
+ENGINE_VERSION = "1"
+
+# 戦闘結果に影響するモジュール（ここが変わればキャッシュは全部無効）
+ENGINE_FILES: Tuple[str, ...] = (
+    "battle.py", "battle_deck.py", "battle_state.py", "buff_store.py", "card_effects.py", "card_table.py",
+    "enemy_ai.py", "model.py", "rng.py", "simulate.py", "parallel_sim.py",
+)
+# policy のモジュール（search_ai.py など）はここに入れず、policy_key のソースハッシュで拾う
+
+CACHE_DIR = ".balance_cache"
+BLOCK = 1000
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# =========================
+# ハッシュ
+# =========================
+
+def _sha(obj: Any) -> str:
+    data = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+_ENGINE: Optional[str] = None
+
+
+def engine_fingerprint() -> str:
+    """ENGINE_VERSION と戦闘コードのソースから作る指紋（プロセス内で1回だけ計算）。"""
+    global _ENGINE
+    if _ENGINE is None:
+        h = hashlib.sha1(ENGINE_VERSION.encode("utf-8"))
+        for name in ENGINE_FILES:
+            with open(os.path.join(_HERE, name), "rb") as f:
+                h.update(name.encode("utf-8"))
+                h.update(f.read())
+        _ENGINE = h.hexdigest()
+    return _ENGINE
+
+
+def spec_hash(spec_id: str) -> str:
+    """カード spec 1つの内容ハッシュ。"""
+    return _sha(CARD_SPECS[spec_id])[:16]
+
+
+def _battle_params(battle_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """戦闘パラメータを既定値で埋める（省略しても明示しても同じキーになるように）。"""
+    params = {
+        name: p.default for name, p in inspect.signature(_play_out).parameters.items()
+        if p.kind is p.KEYWORD_ONLY and name not in ("card_stats", "actions")
+    }
+    params.update(battle_kwargs)
+    return params
+
+
+def block_key(
+    card_ids: Sequence[str],
+    start: int,
+    count: int,
+    *,
+    master_seed: int,
+    policy: Policy,
+    rng_kind: str,
+    battle_kwargs: Dict[str, Any],
+) -> str:
+    """
+    (デッキ, 敵・戦闘条件, seed 範囲) のキャッシュキー。敵は spec の中身ごとハッシュする。
+    deck 型の敵は山札のカード spec でも結果が変わるので、そのハッシュも入れる。
+    """
+    params = _battle_params(battle_kwargs)
+    enemy = ENEMY_SPECS[params["enemy"]]
+    return _sha({
+        "engine": engine_fingerprint(),
+        "deck": sorted((sid, spec_hash(sid)) for sid in card_ids),
+        "battle": params,
+        "enemy": enemy,
+        "enemy_deck": sorted((sid, spec_hash(sid)) for sid in enemy.get("deck", ())),
+        "policy": policy_key(policy),
+        "rng": rng_kind,
+        "seeds": [master_seed, start, count],
+    })
+
+
+# =========================
+# ディスクキャッシュ
+# =========================
+
+class ResultCache:
+    """キー → SimStats の JSON ファイル（CACHE_DIR/ab/abcdef....json）。"""
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[SimStats]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                d = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return SimStats(**d)
+
+    def put(self, key: str, stats: SimStats) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dataclasses.asdict(stats), f)
+        os.replace(tmp, path)
+
+
+# =========================
+# 対戦の実行（キャッシュに無いブロックだけ）
+# =========================
+
+def run_matchups(
+    decks: Dict[str, Sequence[str]],
+    n_games: int,
+    *,
+    cache: ResultCache,
+    master_seed: int = 0,
+    workers: Optional[int] = None,
+    policy: Policy = greedy_policy,
+    rng_kind: str = "mt",
+    **battle_kwargs,
+) -> Tuple[Dict[str, SimStats], int]:
+    """
+    ラベル → デッキを n_games 戦ずつ。ブロック単位でキャッシュを引き、無いものだけ回す。
+    戻り値は (ラベル → SimStats, 今回回した戦闘数)。
+    """
+    totals = {label: SimStats() for label in decks}
+    jobs: List[SimJob] = []
+    owners: Dict[str, Tuple[str, str]] = {}   # job label -> (deck label, cache key)
+    for label, ids in decks.items():
+        for start in range(0, n_games, BLOCK):
+            count = min(BLOCK, n_games - start)
+            key = block_key(ids, start, count, master_seed=master_seed, policy=policy,
+                            rng_kind=rng_kind, battle_kwargs=battle_kwargs)
+            hit = cache.get(key)
+            if hit is not None:
+                totals[label].merge(hit)
+                continue
+            job_label = f"{label}#{start}"
+            owners[job_label] = (label, key)
+            jobs.append(SimJob(job_label, tuple(ids), count, first=start))
+
+    if not jobs:
+        return totals, 0
+    fresh: Dict[str, SimStats] = {}
+    for job_label, stats in run_jobs(
+        jobs, master_seed=master_seed, workers=workers, chunk_size=BLOCK,
+        policy=policy, rng_kind=rng_kind, track_cards=True, **battle_kwargs,
+    ):
+        fresh[job_label] = stats
+    for job_label, stats in fresh.items():
+        label, key = owners[job_label]
+        cache.put(key, stats)
+        totals[label].merge(stats)
+    return totals, sum(job.n_games for job in jobs)
+
+
+# =========================
+# レポート
+# =========================
+
+@dataclass
+class CardMetrics:
+    spec_id: str
+    name: str
+    spec_hash: str
+    win_rate: float
+    win_delta: float
+    turns_delta: float
+    plays_per_game: float
+    dmg_per_energy: Optional[float]
+
+
+def card_metrics(spec_id: str, stats: SimStats, base: SimStats) -> CardMetrics:
+    n, energy, dmg = stats.card_stats.get(spec_id, (0, 0, 0))
+    if energy:
+        dpe: Optional[float] = dmg / energy
+    elif n:
+        dpe = dmg / n
+    else:
+        dpe = None
+    return CardMetrics(
+        spec_id=spec_id,
+        name=CARD_SPECS[spec_id].get("name", spec_id),
+        spec_hash=spec_hash(spec_id),
+        win_rate=stats.win_rate,
+        win_delta=stats.win_rate - base.win_rate,
+        turns_delta=stats.avg_turns - base.avg_turns,
+        plays_per_game=n / stats.games if stats.games else 0.0,
+        dmg_per_energy=dpe,
+    )
+
+
+def balance_report(
+    base_ids: Sequence[str],
+    cards: Optional[Iterable[str]] = None,
+    n_games: int = 2000,
+    *,
+    cache: Optional[ResultCache] = None,
+    **kwargs,
+) -> Tuple[SimStats, List[CardMetrics], int]:
+    """
+    ベースデッキと「ベース＋各カード1枚」の対戦からカード別の指標を作る。
+    kwargs は run_matchups へ（master_seed / workers / policy / rng_kind / 戦闘パラメータ）。
+    戻り値は (ベースの SimStats, カード別指標, 今回回した戦闘数)。
+    """
+    cache = cache if cache is not None else ResultCache()
+    base = tuple(base_ids)
+    decks: Dict[str, Sequence[str]] = {"BASE": base}
+    for sid in (cards if cards is not None else CARD_SPECS):
+        decks[sid] = base + (sid,)
+    totals, ran = run_matchups(decks, n_games, cache=cache, **kwargs)
+    base_stats = totals.pop("BASE")
+    rows = [card_metrics(sid, stats, base_stats) for sid, stats in totals.items()]
+    return base_stats, rows, ran
+
+
+def format_report(base: SimStats, rows: List[CardMetrics], sort: str = "win") -> str:
+    if sort == "dpe":
+        rows = sorted(rows, key=lambda r: -(r.dmg_per_energy or 0.0))
+    elif sort == "name":
+        rows = sorted(rows, key=lambda r: r.spec_id)
+    else:
+        rows = sorted(rows, key=lambda r: -r.win_delta)
+    lines = [
+        f"BASE: win {base.win_rate:6.1%}  turns {base.avg_turns:5.2f}  ({base.games} games)",
+        f"{'card':<5} {'win':>7} {'win Δ':>7} {'turns Δ':>8} {'plays/g':>8} {'dmg/E':>6}  {'hash':<8}  name",
+    ]
+    for r in rows:
+        dpe = f"{r.dmg_per_energy:6.2f}" if r.dmg_per_energy is not None else f"{'-':>6}"
+        lines.append(
+            f"{r.spec_id:<5} {r.win_rate:7.1%} {r.win_delta:+7.1%} "
+            f"{r.turns_delta:+8.2f} {r.plays_per_game:8.2f} {dpe}  {r.spec_hash[:8]}  {r.name}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    from starter_decks import make_starter_deck
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--deck", nargs="*", help="ベースデッキの spec_id（既定はスターター）")
+    ap.add_argument("--cards", nargs="*", help="評価するカード（既定は CARD_SPECS 全部）")
+    ap.add_argument("--games", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--player-hp", type=int, default=40)
+    ap.add_argument("--enemy-hp", type=int, default=35)
+    ap.add_argument("--enemy", default="DEFAULT", choices=list(ENEMY_SPECS), help="敵の種類")
+    ap.add_argument("--run", choices=list(RUN_SPECS), help="カード表の代わりにこの連戦の難易度曲線を出す")
+    ap.add_argument("--sort", choices=("win", "dpe", "name"), default="win")
+    ap.add_argument("--cache-dir", default=CACHE_DIR)
+    ap.add_argument("--json", help="カード別指標を JSON でも書き出す")
+    args = ap.parse_args(argv)
+
+    base_ids = args.deck or [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    t0 = time.perf_counter()
+    if args.run:
+        from encounter import format_curve, run_runs_parallel
+        stats = run_runs_parallel(base_ids, args.games, run=args.run, master_seed=args.seed,
+                                  workers=args.workers, player_hp=args.player_hp)
+        print(format_curve(stats))
+        print(f"{stats.runs} runs simulated ({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+        return 0
+    cache = ResultCache(args.cache_dir)
+    base, rows, ran = balance_report(
+        base_ids, args.cards, args.games, cache=cache,
+        master_seed=args.seed, workers=args.workers,
+        player_hp=args.player_hp, enemy_hp=args.enemy_hp, enemy=args.enemy,
+    )
+    print(format_report(base, rows, args.sort))
+    print(f"{ran} battles simulated, {cache.hits} blocks cached / {cache.misses} re-run "
+          f"({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([dataclasses.asdict(r) for r in rows], f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
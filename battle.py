@@ -1,15 +1,25 @@
 # battle.py
-from typing import Optional
-import random
+from typing import Dict, List, Optional, Sequence, Union
 
 from battle_deck import BattleDeck
 from model import CardInstance
+from rng import BattleRNG
+from battle_state import BattleState
+from events import (
+    EventLog,
+    EV_BATTLE_START, EV_TURN_START, EV_TURN_END,
+    EV_TEMP_BUFF, EV_TEMP_BUFF_END,
+    EV_ENEMY_INTENT,
+)
 from card_effects import (
     apply_card_effect,
     apply_buffs_on_turn_start,
     apply_buffs_on_card_play,
     tick_buffs,
 )
+from enemy_ai import MODE_DECK, EnemyPlan, get_enemy_plan
+
+PLAYER_AID = 0    # actors[0] はプレイヤー。敵は 1..N
 
 
 class BattleManager:
@@ -26,6 +36,13 @@ class BattleManager:
             - apply_buffs_on_turn_start(...)
             - apply_buffs_on_card_play(...)
             - tick_buffs(...)
+
+    複数の敵:
+        - enemy / edeck に敵と BattleDeck の列を渡すと N 体戦（1体なら従来どおり）
+        - 参加者は actors[aid]（0 = プレイヤー、1..N = 敵）。decks / plans / temp_buffs も同じ添字
+          Actor.aid に自分の添字が入るので、actor → 各表の引き当ては O(1)
+        - self.enemy / self.edeck / self.enemy_plan は「いまの攻撃対象」（target）の敵。
+          対象が倒れたら次に生きている敵へ自動で移る。set_target で選び直せる
     """
 
     def __init__(
@@ -33,39 +50,100 @@ class BattleManager:
         player,
         enemy,
         pdeck: BattleDeck,
-        edeck: BattleDeck,
+        edeck: Union[BattleDeck, Sequence[BattleDeck]],
         *,
         max_energy: int = 3,
         hand_size: int = 5,
+        rng: Optional[BattleRNG] = None,
     ):
+        enemies = list(enemy) if isinstance(enemy, (list, tuple)) else [enemy]
+        edecks = list(edeck) if isinstance(edeck, (list, tuple)) else [edeck]
+        if len(edecks) != len(enemies):
+            raise ValueError("敵と敵デッキの数が合いません")
         self.player = player
-        self.enemy = enemy
         self.pdeck = pdeck
-        self.edeck = edeck
+        # aid で引く参加者の表
+        self.actors: List = [player] + enemies
+        self.decks: List[BattleDeck] = [pdeck] + edecks
+        self.enemies: List = enemies
+        for aid, actor in enumerate(self.actors):
+            actor.aid = aid
         self.turn = 1
+        # 直前の play_player_card でカードを出せたか（手札枚数では判定できない：ドロー効果で戻ることがある）
+        self.last_play_ok = False
         self.max_energy = max_energy
         self.hand_size = hand_size
+        # 戦闘ごとの乱数（敵AI・カード効果で共用）。未指定ならプレイヤーデッキの rng を共有
+        self.rng = rng if rng is not None else pdeck.rng
+        # 敵の行動表（data.ENEMY_SPECS をコンパイルしたもの。Enemy.spec_id で引く）。プレイヤーは None
+        self.plans: List[Optional[EnemyPlan]] = [None] + [
+            get_enemy_plan(getattr(e, "spec_id", "DEFAULT")) for e in enemies
+        ]
+        self._set_target(PLAYER_AID + 1)
 
         # 旧システムの一時バフ（防御+2など）用
         # いまは主に防御号令などの互換性維持のため残している
-        self.temp_buffs = {"player": {}, "enemy": {}}  # { name: {value, duration} }
+        self.temp_buffs: List[Dict[str, Dict[str, int]]] = [{} for _ in self.actors]  # aid -> { name: {value, duration} }
 
+        # 戦闘イベントの出口。logger を設定したときだけ日本語ログに整形される
+        self.events = EventLog()
         self.logger = print
-        setattr(self.player, "battle", self)
-        setattr(self.enemy, "battle", self)
-
-    # ---- internal helpers ----
-    def _akey(self, actor):
-        return "player" if actor is self.player else "enemy"
-
-    def _peer(self, actor):
-        return self.enemy if actor is self.player else self.player
+        for actor in self.actors:
+            setattr(actor, "battle", self)
+
+    # ---- ログ出力先（None で整形なし） ----
+    @property
+    def logger(self):
+        return self.events.text_sink
+
+    @logger.setter
+    def logger(self, fn):
+        self.events.set_text_sink(fn)
+
+    # ========= 攻撃対象 =========
+    def set_target(self, aid: int) -> bool:
+        """プレイヤーの攻撃対象を敵 aid にする。倒れている・敵でないなら False。"""
+        if aid <= PLAYER_AID or aid >= len(self.actors) or self.actors[aid].hp <= 0:
+            return False
+        self._set_target(aid)
+        return True
+
+    def _set_target(self, aid: int) -> None:
+        self.target = aid
+        self.enemy = self.actors[aid]
+        self.edeck = self.decks[aid]
+        self.enemy_plan = self.plans[aid]
+
+    def _retarget(self) -> None:
+        # 対象が倒れていたら、生きている最初の敵へ（全滅ならそのまま）
+        if self.enemy.hp > 0:
+            return
+        for e in self.enemies:
+            if e.hp > 0:
+                self._set_target(e.aid)
+                return
+
+    def living_enemies(self) -> List:
+        return [e for e in self.enemies if e.hp > 0]
+
+    def enemies_down(self) -> bool:
+        """敵が全滅したか。"""
+        for e in self.enemies:
+            if e.hp > 0:
+                return False
+        return True
+
+    def enemy_hp_total(self) -> int:
+        return sum(max(e.hp, 0) for e in self.enemies)
 
     # ========= 戦闘/ターン進行 =========
     def start_battle(self) -> int:
-        self.logger(f"=== ⚔️  戦闘開始: {self.player.name} vs {self.enemy.name} ===")
+        ev = self.events
+        if ev.on:
+            ev.emit((EV_BATTLE_START, self.player, 0, None, self.enemy))
         self.player.block = 0
-        self.enemy.block = 0
+        for e in self.enemies:
+            e.block = 0
         self.player.energy = self.max_energy
         # 初期手札
         self._draw_player_to(self.hand_size)
@@ -73,10 +151,13 @@ class BattleManager:
         return self.turn
 
     def start_turn(self):
-        self.logger(f"\n=== 🧭 ターン {self.turn} 開始 ===")
+        ev = self.events
+        if ev.on:
+            ev.emit((EV_TURN_START, None, self.turn, None))
         # v1.10：ブロック持ち越しなし・エナジー補充
         self.player.block = 0
-        self.enemy.block = 0
+        for e in self.enemies:
+            e.block = 0
         self.player.energy = self.max_energy
 
         # --- バフ処理（プレイヤー側のターン開始） ---
@@ -91,110 +172,187 @@ class BattleManager:
         self._draw_player_to(self.hand_size)
 
     def end_turn(self):
-        self.logger(f"=== 🔚 ターン {self.turn} 終了 ===")
+        ev = self.events
+        if ev.on:
+            ev.emit((EV_TURN_END, None, self.turn, None))
         self.turn += 1
 
     # ========= プレイヤー行動 =========
-    def play_player_card(self, idx: int) -> str:
-        if idx < 0 or idx >= len(self.pdeck.hand):
+    def play_player_card(self, idx: int, target: Optional[int] = None) -> str:
+        """
+        手札 idx のカードを使う。target は対象の敵の aid（省略時はいまの攻撃対象）。
+        戻り値はこのカードで起きたイベントのログ（logger 未設定なら ""）。
+        出せたかどうかは last_play_ok に入る。
+        """
+        self.last_play_ok = False
+        hand = self.pdeck.hand
+        if idx < 0 or idx >= len(hand):
             return "⚠ 無効な番号です。"
-        card: CardInstance = self.pdeck.hand[idx]
-        cost = self._effective_cost(self.player, card)
-        if self.player.energy < cost:
-            return f"⚠ エナジー不足（必要:{cost}, 残り:{self.player.energy}）"
+        if target is not None and target != self.target and not self.set_target(target):
+            return "⚠ 無効な対象です。"
+        player = self.player
+        card: CardInstance = hand[idx]
+        cost = self._effective_cost(player, card)
+        if player.energy < cost:
+            return f"⚠ エナジー不足（必要:{cost}, 残り:{player.energy}）"
 
         # エナジー支払い＆手札から取り出し
-        self.player.energy -= cost
-        card = self.pdeck.hand.pop(idx)
+        player.energy -= cost
+        card = hand.pop(idx)
+        self.last_play_ok = True
+        ev = self.events
+        if ev.on:
+            ev.begin_span()
 
         # カード使用時トリガーバフの適用
-        apply_buffs_on_card_play(self, card, self.player, self.enemy)
+        enemy = self.enemy
+        apply_buffs_on_card_play(self, card, player, enemy)
 
         # 効果解決
-        log = self._resolve_card_effect(card, user=self.player, target=self.enemy)
+        self._resolve_card_effect(card, user=player, target=enemy)
 
         # 捨て札へ
         self._discard(self.pdeck, card)
-        return log
+        if enemy.hp <= 0:
+            self._retarget()
+        return ev.end_span() if ev.on else ""
 
      # ========= 敵行動（簡易AI：攻撃優先→防御） =========
     def enemy_act(self) -> str:
-        # 敵ターン開始時のバフ処理（敵側の陣形など）
-        apply_buffs_on_turn_start(self, self.enemy, self.player)
-        tick_buffs(self.enemy)
-        e = self.enemy
+        """
+        敵の1ターン（生きている敵が aid 順に1体ずつ）。戻り値は敵行動のログ（logger 未設定なら ""）。
+        行動は plans[aid]（weighted / pattern / deck）で選び、カードと同じ ops エンジンで実行する。
+        """
         p = self.player
-        # 3パターンからランダム選択
-        action = random.choice(["attack", "multi_attack", "defense"])
-        if action == "attack":
-            dmg = 8
-            dealt = p.take_damage(dmg)
-            return f"▶ {e.name} の攻撃 → {p.name} に {dealt} ダメージ"
-        elif action == "multi_attack":
-            # 例：4ダメ×2回（ブロックに2回別々に当たる）
-            dmg_each = 4
-            total = 0
-            for i in range(2):
-                dealt = p.take_damage(dmg_each)
-                total += dealt
-            return f"▶ {e.name} の連続攻撃 → {p.name} に 合計 {total} ダメージ"
-        else:  # "defense"
-            gain = 6
-            e.block += gain
-            return f"▶ {e.name} は防御を固めた → Block+{gain}（合計 {e.block}）"
+        # 敵ターン開始時のバフ処理（敵側の陣形など）
+        for e in self.enemies:
+            if e.hp > 0:
+                apply_buffs_on_turn_start(self, e, p)
+                tick_buffs(e)
+        ev = self.events
+        if ev.on:
+            ev.begin_span()
+        for e in self.enemies:
+            if e.hp <= 0:
+                continue
+            self._enemy_turn(e, p)
+            if p.hp <= 0:
+                break
+        if self.enemy.hp <= 0:
+            # 反撃で倒れた
+            self._retarget()
+        return ev.end_span() if ev.on else ""
+
+    def _enemy_turn(self, e, p) -> None:
+        ev = self.events
+        plan = self.plans[e.aid]
+        if plan.mode == MODE_DECK:
+            # 手札の先頭から plays 枚出して、手札を引き直す
+            deck = self.decks[e.aid]
+            hand = deck.hand
+            for _ in range(min(plan.plays, len(hand))):
+                card = hand.pop(0)
+                if ev.on:
+                    ev.emit((EV_ENEMY_INTENT, e, e.turn_index, card.spec_id))
+                apply_buffs_on_card_play(self, card, e, p)
+                self._resolve_card_effect(card, user=e, target=p)
+                self._discard(deck, card)
+            self._draw_to(deck, self.hand_size)
+        else:
+            intent = plan.choose(e, self.rng)
+            if ev.on:
+                ev.emit((EV_ENEMY_INTENT, e, e.turn_index, intent.spec_id))
+            self._resolve_card_effect(intent, user=e, target=p)
+        e.turn_index += 1
+
+    # ========= 同じ顔ぶれでやり直す（一括シミュレーション用） =========
+    def reset(self) -> None:
+        """
+        同じ参加者・同じデッキで戦闘を最初からやり直す（simulate.BattleRunner が1戦ごとに呼ぶ）。
+        HP を max_hp に戻し、Block・バフ・一時バフ・敵の行動回数・手札を捨てて山札を組み直す。
+        山札のシャッフルはプレイヤー → 敵（aid 順）で、組み立て直したときと同じ乱数の引き方になる
+        （rng は呼び出し側で seed し直しておく）。EventLog と logger・購読はそのまま残す。
+        """
+        for actor in self.actors:
+            actor.hp = actor.max_hp
+            actor.block = 0
+            actor.buffs.clear()
+        for e in self.enemies:
+            e.turn_index = 0
+        for buffs in self.temp_buffs:
+            buffs.clear()
+        for deck in self.decks:
+            deck.reset()
+        self.turn = 1
+        self.last_play_ok = False
+        self._set_target(PLAYER_AID + 1)
+
+    # ========= 状態の保存/復元（先読み探索用） =========
+    def snapshot(self, include_rng: bool = True) -> BattleState:
+        """現在の戦闘状態を O(状態サイズ) で写し取る。"""
+        return BattleState(self, include_rng)
+
+    def restore(self, state: BattleState) -> None:
+        """snapshot() の時点に戻す。同じ state から何度でも戻せる。"""
+        state.apply(self)
 
     # ========= 勝敗判定 =========
     def is_battle_over(self):
-        if self.player.hp <= 0 and self.enemy.hp <= 0:
+        down = self.enemies_down()
+        if self.player.hp <= 0 and down:
             return True, "相打ちだ…"
         if self.player.hp <= 0:
             return True, "敗北…"
-        if self.enemy.hp <= 0:
+        if down:
             return True, "勝利！"
         return False, ""
 
     # ========= 効果解決 =========
-    def _resolve_card_effect(self, card: CardInstance, *, user, target) -> str:
+    def _resolve_card_effect(self, card: CardInstance, *, user, target) -> None:
         # すべて card_effects 側に委譲
-        return apply_card_effect(self, card, user, target)
+        apply_card_effect(self, card, user, target)
 
     # ========= 一時バフ（旧仕様。防御号令などのため残置） =========
     def add_temp_buff(self, actor, name: str, value: int, duration: int = 1):
-        k = self._akey(actor)
-        buffs = self.temp_buffs.setdefault(k, {})
+        buffs = self.temp_buffs[actor.aid]
         buffs[name] = {"value": value, "duration": duration}
-        self.logger(f"🟢 {actor.name} に {name}+{value}（{duration}T）")
+        ev = self.events
+        if ev.on:
+            ev.emit((EV_TEMP_BUFF, actor, value, None, name, duration))
 
     def get_temp_buff_value(self, actor, name: str) -> int:
-        k = self._akey(actor)
-        return self.temp_buffs.get(k, {}).get(name, {}).get("value", 0)
+        return self.temp_buffs[actor.aid].get(name, {}).get("value", 0)
 
     def clear_temp_buff(self, actor, name: str):
-        k = self._akey(actor)
-        self.temp_buffs.get(k, {}).pop(name, None)
+        self.temp_buffs[actor.aid].pop(name, None)
 
     def _decrement_temp_buffs(self):
-        for k, buffs in self.temp_buffs.items():
+        for aid, buffs in enumerate(self.temp_buffs):
+            if not buffs:
+                continue
             expired = []
             for name, info in list(buffs.items()):
                 info["duration"] -= 1
                 if info["duration"] <= 0:
                     expired.append(name)
             for name in expired:
-                who = self.player.name if k == "player" else self.enemy.name
-                self.logger(f"⚪️ {who} の {name} が切れた")
+                ev = self.events
+                if ev.on:
+                    ev.emit((EV_TEMP_BUFF_END, self.actors[aid], 0, None, name))
                 del buffs[name]
 
     # ========= ユーティリティ（BattleDeck前提） =========
     def _draw_player_to(self, n: int):
-        need = max(0, n - len(self.pdeck.hand))
-        if need > 0:
-            self._draw(self.pdeck, need)
+        self._draw_to(self.pdeck, n)
 
     def _draw_enemy_to(self, n: int):
-        need = max(0, n - len(self.edeck.hand))
+        for deck in self.decks[PLAYER_AID + 1:]:
+            self._draw_to(deck, n)
+
+    def _draw_to(self, deck: BattleDeck, n: int):
+        need = max(0, n - len(deck.hand))
         if need > 0:
-            self._draw(self.edeck, need)
+            self._draw(deck, need)
 
     @staticmethod
     def _draw(deck: BattleDeck, n: int):
@@ -206,13 +364,10 @@ class BattleManager:
 
     def draw_cards(self, actor, n: int):
         """card_effects から呼ぶための共通ドロー関数。"""
-        if actor is self.player:
-            self._draw(self.pdeck, n)
-        elif actor is self.enemy:
-            self._draw(self.edeck, n)
+        self._draw(self.decks[actor.aid], n)
     
     def _effective_cost(self, actor, card: CardInstance) -> int:
-        base = getattr(card, "cost", 0)
+        base = card.cost
         # v1.10：コスト補正なし（コスト軽減策などは今後バフで対応予定）
         return max(0, base)
 
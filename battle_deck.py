@@ -1,15 +1,32 @@
 # battle_deck.py
 import random
-from typing import List
+from typing import List, Optional
 from model import CardInstance
+from rng import BattleRNG
 
 class BattleDeck:
-    """戦闘用デッキ：山札・手札・捨て札を管理。"""
-    def __init__(self, draw_pile: List[CardInstance]):
+    """
+    戦闘用デッキ：山札・手札・捨て札を管理。
+    各山の要素は card_table の共有 CardInstance。
+    draw/discard/reshuffle は要素の中身を見ないので、card no（int）の列でもそのまま回る。
+    """
+    def __init__(self, draw_pile: List[CardInstance], rng: Optional[BattleRNG] = None):
+        # 戦闘ごとの rng（BattleManager と共有する）。未指定なら専用の Random を持つ
+        self.rng = rng if rng is not None else random.Random()
+        self.cards = tuple(draw_pile)      # 戦闘開始時の構成（reset で戻す）
         self.draw_pile = list(draw_pile)
         self.hand: List[CardInstance] = []
         self.discard_pile: List[CardInstance] = []
-        random.shuffle(self.draw_pile)
+        self.reshuffles = 0                # 山札切れで捨て札を切り直した回数（探索の局面キー用）
+        self.rng.shuffle(self.draw_pile)
+
+    def reset(self):
+        """戦闘開始時の構成に戻してシャッフルし直す（__init__ と同じ乱数の引き方）。"""
+        self.draw_pile[:] = self.cards
+        self.hand.clear()
+        self.discard_pile.clear()
+        self.reshuffles = 0
+        self.rng.shuffle(self.draw_pile)
 
     def draw(self, n: int):
         for _ in range(n):
@@ -37,4 +54,5 @@ class BattleDeck:
         if self.discard_pile:
             self.draw_pile = self.discard_pile
             self.discard_pile = []
-            random.shuffle(self.draw_pile)
+            self.reshuffles += 1
+            self.rng.shuffle(self.draw_pile)
@@ -0,0 +1,138 @@
+# battle_state.py
+"""
+戦闘状態のスナップショット（先読み探索用）
+
+BattleManager.snapshot() / restore() の中身。
+copy.deepcopy を使わず、戦闘状態を構成する値だけを O(状態サイズ) で写す：
+    - ターン数・攻撃対象・一時バフ
+    - Actor ごとの hp / block / energy / turn_index / BuffStore（bm.actors と同じ aid 順）
+    - デッキごとの山札・手札・捨て札（要素は共有 CardInstance なのでリストの浅いコピーで済む）と切り直し回数
+    - rng の内部状態（include_rng=True のとき）
+
+同じスナップショットから何度でも restore できる（restore 側でもコピーする）。
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+
+
+class ActorState:
+    __slots__ = ("hp", "block", "energy", "turn_index", "buffs")
+
+    def __init__(self, actor: Any):
+        self.hp = actor.hp
+        self.block = actor.block
+        self.energy = actor.energy
+        self.turn_index = getattr(actor, "turn_index", None)
+        self.buffs = actor.buffs.copy()
+
+    def apply(self, actor: Any) -> None:
+        actor.hp = self.hp
+        actor.block = self.block
+        actor.energy = self.energy
+        if self.turn_index is not None:
+            actor.turn_index = self.turn_index
+        actor.buffs = self.buffs.copy()
+
+
+class DeckState:
+    __slots__ = ("draw_pile", "hand", "discard_pile", "reshuffles")
+
+    def __init__(self, deck: Any):
+        self.draw_pile = list(deck.draw_pile)
+        self.hand = list(deck.hand)
+        self.discard_pile = list(deck.discard_pile)
+        self.reshuffles = getattr(deck, "reshuffles", 0)
+
+    def apply(self, deck: Any) -> None:
+        # リストの同一性は保つ（UI などが deck.hand を握っていても壊れない）
+        deck.draw_pile[:] = self.draw_pile
+        deck.hand[:] = self.hand
+        deck.discard_pile[:] = self.discard_pile
+        deck.reshuffles = self.reshuffles
+
+
+class BattleState:
+    """BattleManager 1戦ぶんの状態。actors / decks は bm.actors / bm.decks と同じ aid 順。"""
+    __slots__ = ("turn", "target", "temp_buffs", "actors", "decks", "rng_state")
+
+    def __init__(self, bm: Any, include_rng: bool = True):
+        self.turn = bm.turn
+        self.target = bm.target
+        self.temp_buffs = _copy_temp_buffs(bm.temp_buffs)
+        self.actors = tuple(ActorState(a) for a in bm.actors)
+        self.decks = tuple(DeckState(d) for d in bm.decks)
+        self.rng_state = bm.rng.getstate() if include_rng else None
+
+    @property
+    def player(self) -> ActorState:
+        return self.actors[0]
+
+    @property
+    def enemy(self) -> ActorState:
+        return self.actors[self.target]
+
+    @property
+    def pdeck(self) -> DeckState:
+        return self.decks[0]
+
+    def apply(self, bm: Any) -> None:
+        bm.turn = self.turn
+        bm.temp_buffs = _copy_temp_buffs(self.temp_buffs)
+        for st, actor in zip(self.actors, bm.actors):
+            st.apply(actor)
+        for st, deck in zip(self.decks, bm.decks):
+            st.apply(deck)
+        bm._set_target(self.target)
+        if self.rng_state is not None:
+            bm.rng.setstate(self.rng_state)
+
+    # ---- 探索用：局面の同一判定キー ----
+    def key(self) -> Tuple:
+        """
+        手札の並び順・バフの内部キーを無視した局面キー（転置表・探索木の使い回し用）。
+        山札は順序も意味を持つのでそのまま、手札・捨て札は spec_id の多重集合として扱う。
+        敵は行動回数（pattern 型の何番目か）と、deck 型の山札・手札（先頭から出すので順序つき）も入れる。
+        乱数は rng の内部状態（include_rng=False なら各デッキの切り直し回数）で区別する：
+        次の敵行動や山札の並びだけが違う局面を同じものとみなさない。
+        """
+        p = self.player
+        return (
+            self.turn,
+            p.hp, p.block, p.energy, _buff_key(p.buffs),
+            tuple((e.hp, e.block, e.turn_index, _buff_key(e.buffs)) for e in self.actors[1:]),
+            self.target,
+            tuple(c.spec_id for c in self.pdeck.draw_pile),
+            tuple(sorted(c.spec_id for c in self.pdeck.hand)),
+            tuple(sorted(c.spec_id for c in self.pdeck.discard_pile)),
+            tuple(_enemy_deck_key(d) for d in self.decks[1:]),
+            tuple(d.reshuffles for d in self.decks),
+            hash(self.rng_state) if self.rng_state is not None else None,
+        )
+
+
+def _enemy_deck_key(deck: DeckState) -> Tuple:
+    if not (deck.draw_pile or deck.hand or deck.discard_pile):
+        return ()
+    return (
+        tuple(c.spec_id for c in deck.draw_pile),
+        tuple(c.spec_id for c in deck.hand),
+        tuple(sorted(c.spec_id for c in deck.discard_pile)),
+    )
+
+
+def _copy_temp_buffs(tb: List[Dict[str, Dict[str, int]]]) -> List[Dict[str, Dict[str, int]]]:
+    return [{name: dict(info) for name, info in buffs.items()} if buffs else {} for buffs in tb]
+
+
+def _buff_key(store: Any) -> Tuple:
+    now = store.now
+    return tuple(sorted((b.kind, b.trigger, b.power, b.stacks, b.expires - now) for b in store))
+
+
+def snapshot(bm: Any, include_rng: bool = True) -> BattleState:
+    return BattleState(bm, include_rng)
+
+
+def restore(bm: Any, state: BattleState) -> None:
+    state.apply(bm)
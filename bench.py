@@ -0,0 +1,242 @@
+# bench.py
+"""
+ベンチマーク（戦闘スループットと各サブシステムのホットパス）
+
+    python bench.py                    # 計測して bench_results.json に書き、ベースラインと比較
+    python bench.py --save-baseline    # 計測結果を bench_baseline.json として保存
+    python bench.py --quick            # 回数を減らして手早く
+
+- micro : BattleDeck.draw/_reshuffle, apply_card_effect（ops / 旧タグ）,
+          apply_buffs_on_turn_start（大量の重ねがけ）, MasterDeck.instantiate
+- macro : アーキタイプ別デッキ（weaken / counter / formation）のヘッドレス戦闘/秒
+          と vector_sim（NumPy 一括版）の戦闘/秒
+
+数値はすべて「1秒あたりの回数」（大きいほど速い）。マシン差・負荷の揺れを
+打ち消すため、比較は同じ実行で測った基準ループ（calibration）との比で行う。
+ベースラインより tolerance 以上遅くなった項目があれば終了コード 1。
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List
+
+from model import Player, Enemy
+from battle import BattleManager
+from battle_deck import BattleDeck
+from card_effects import apply_card_effect, apply_buffs_on_turn_start, add_buff
+from master_deck import MasterDeck
+from rng import make_rng
+from simulate import run_batch
+from starter_decks import make_card, make_starter_deck
+from vector_sim import simulate_arrays, vectorizable
+
+DEFAULT_OUT = "bench_results.json"
+DEFAULT_BASELINE = "bench_baseline.json"
+
+# マクロベンチ用のアーキタイプ（スターターの一部＋テーマのカード）
+ARCHETYPES: Dict[str, List[str]] = {
+    "starter": [c.spec_id for c in make_starter_deck("HIDEYOSHI")],
+    "weaken": ["S1", "S1", "S1", "S4", "S4", "S9", "S9", "S10", "S12", "S25", "S2", "S3"],
+    "counter": ["S1", "S1", "S16", "S16", "S18", "S18", "S22", "S27", "S28", "S31", "S2", "S3"],
+    "formation": ["S1", "S1", "S2", "S2", "S23", "S24", "S25", "S26", "S27", "S32", "S3", "S9"],
+}
+
+
+def _rate(fn: Callable[[], int], min_time: float, repeat: int) -> float:
+    """fn() は1回で処理した件数を返す。repeat 回のうち最速の「件/秒」。"""
+    best = 0.0
+    for _ in range(repeat):
+        n = 0
+        t0 = time.perf_counter()
+        while True:
+            n += fn()
+            dt = time.perf_counter() - t0
+            if dt >= min_time:
+                break
+        best = max(best, n / dt)
+    return best
+
+
+def _calibration() -> int:
+    """マシン速度の基準（エンジンに依存しない素の Python ループ）。"""
+    acc = 0
+    d: Dict[int, int] = {}
+    for i in range(2000):
+        d[i & 63] = d.get(i & 63, 0) + i
+        acc += len(d)
+    return 2000
+
+
+def _new_battle(ids: List[str], seed: int = 0) -> BattleManager:
+    rng = make_rng(seed)
+    bm = BattleManager(
+        Player("p", max_hp=10**6), Enemy("e", max_hp=10**6),
+        BattleDeck(MasterDeck(ids).instantiate(), rng), BattleDeck([], rng), rng=rng,
+    )
+    bm.logger = None
+    return bm
+
+
+# =========================
+# micro
+# =========================
+
+def bench_deck_cycle() -> int:
+    deck = BattleDeck(MasterDeck(ARCHETYPES["starter"]).instantiate(), make_rng(0))
+    n = 0
+    for _ in range(200):
+        deck.draw(5)
+        while deck.hand:
+            deck.discard_from_hand(0)
+        n += 5
+    return n
+
+
+def _card_effect_bench(spec_id: str) -> Callable[[], int]:
+    bm = _new_battle(["S1"])
+    card = make_card(spec_id)
+    p, e = bm.player, bm.enemy
+
+    def run() -> int:
+        for _ in range(500):
+            apply_card_effect(bm, card, p, e)
+        p.hp = e.hp = 10**6
+        p.buffs.clear()
+        e.buffs.clear()
+        return 500
+    return run
+
+
+def bench_turn_start_stacked() -> int:
+    bm = _new_battle(["S1"])
+    p, e = bm.player, bm.enemy
+    # 期限の違う陣形を大量に積む（合算されないように1つずつ tick をずらす）
+    for i in range(200):
+        add_buff(p, "FORM_WALL", 1, 1000, "turn_start")
+        add_buff(p, "FORM_COUNTER_STACK", 1, 1000, "turn_start")
+        p.buffs.now += 1
+    p.buffs.now -= 200
+    for _ in range(20):
+        apply_buffs_on_turn_start(bm, p, e)
+        p.block = 0
+    return 20
+
+
+def bench_instantiate() -> int:
+    md = MasterDeck(ARCHETYPES["starter"])
+    for _ in range(200):
+        md.instantiate()
+    return 200
+
+
+# =========================
+# macro
+# =========================
+
+def _battles_bench(ids: List[str]) -> Callable[[], int]:
+    state = {"seed": 0}
+
+    def run() -> int:
+        s = state["seed"]
+        for _ in run_batch(ids, range(s, s + 200)):
+            pass
+        state["seed"] = s + 200
+        return 200
+    return run
+
+
+def _vector_bench(ids: List[str]) -> Callable[[], int]:
+    state = {"seed": 0}
+
+    def run() -> int:
+        s = state["seed"]
+        simulate_arrays(ids, range(s, s + 50_000))
+        state["seed"] = s + 50_000
+        return 50_000
+    return run
+
+
+def collect(min_time: float = 0.5, repeat: int = 3) -> Dict[str, float]:
+    benches: Dict[str, Callable[[], int]] = {
+        "calibration": _calibration,
+        "micro.deck_cycle_cards": bench_deck_cycle,
+        "micro.apply_card_effect.ops_S4": _card_effect_bench("S4"),
+        "micro.apply_card_effect.ops_S16": _card_effect_bench("S16"),
+        "micro.apply_card_effect.legacy_S18": _card_effect_bench("S18"),
+        "micro.apply_card_effect.legacy_S23": _card_effect_bench("S23"),
+        "micro.turn_start_400_buffs": bench_turn_start_stacked,
+        "micro.master_deck_instantiate": bench_instantiate,
+    }
+    for name, ids in ARCHETYPES.items():
+        benches[f"macro.battles.{name}"] = _battles_bench(ids)
+    if vectorizable(ARCHETYPES["starter"]):
+        benches["macro.vector_battles.starter"] = _vector_bench(ARCHETYPES["starter"])
+
+    out: Dict[str, float] = {}
+    for name, fn in benches.items():
+        out[name] = _rate(fn, min_time, repeat)
+        print(f"{name:<40} {out[name]:>14,.0f} /s", file=sys.stderr)
+    return out
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """ベースラインより tolerance 以上遅い項目の説明を返す（calibration 比で比較）。"""
+    scale = 1.0
+    if results.get("calibration") and baseline.get("calibration"):
+        scale = baseline["calibration"] / results["calibration"]
+    regressions = []
+    for name, base in baseline.items():
+        cur = results.get(name)
+        if name == "calibration" or cur is None or base <= 0:
+            continue
+        ratio = cur * scale / base
+        mark = ""
+        if ratio < 1.0 - tolerance:
+            mark = "  <-- REGRESSION"
+            regressions.append(f"{name}: {cur:,.0f}/s vs baseline {base:,.0f}/s ({ratio:.2f}x)")
+        print(f"{name:<40} {ratio:6.2f}x{mark}", file=sys.stderr)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--quick", action="store_true")
+    args = ap.parse_args(argv)
+
+    min_time, repeat = (0.1, 1) if args.quick else (0.5, 3)
+    results = collect(min_time, repeat)
+    doc = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    path = args.baseline if args.save_baseline else args.out
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+    print(f"wrote {path}", file=sys.stderr)
+    if args.save_baseline:
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline} (run with --save-baseline)", file=sys.stderr)
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print("REGRESSION " + line, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
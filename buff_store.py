@@ -0,0 +1,145 @@
+# buff_store.py
+"""
+トリガー別インデックス付きのバフ置き場（Actor.buffs）
+
+- trigger ごとに {キー: Buff} の辞書を持つ（by_trigger[trigger]）
+  → 各フックは自分の trigger の分だけ走査すればよい
+- 同じ kind・同じ期限のバフは1つの Buff にまとめ、power を合算・stacks を数える
+  （キーは kind と期限を1つの int に詰めたもの）
+- kind ごとの power 合計（totals）も追加/期限切れのたびに更新しておく
+- 期限は「このストアの tick 回数（now）」で持ち、期限ごとのバケツに登録する
+  → tick は期限切れのバケツだけ見る（O(期限切れ数)）
+- trigger ごとに「いま生きているバフの kind → エントリ数」（listeners）も持つ
+  → on_attack_calc / on_hit のディスパッチは、実在するリスナーの kind だけを回す
+    （追加時に登録・期限切れで外れる。バフが無い trigger は空の dict を見るだけ）
+- 与ダメージ補正（倍率, 加算）のキャッシュ（mods）も持つ
+  → on_attack_calc のバフが増えた/切れたときだけ None に戻し、次の攻撃で
+    card_effects.attack_modifiers が計算し直す（1ヒットあたりは O(1)）
+- copy() は Buff を複製するだけの O(バフ数)（探索用のスナップショット向け）
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from model import Buff, N_TRIGGERS, Trigger, buff_kind_id, trigger_id
+
+_KIND_BITS = 8  # キー = (expires << 8) | kind
+_ON_ATTACK_CALC = int(Trigger.ON_ATTACK_CALC)
+
+
+class BuffStore:
+    __slots__ = ("now", "by_trigger", "expiry", "totals", "listeners", "mods")
+
+    def __init__(self, buffs: Iterable[Any] = ()):
+        self.now = 0
+        self.by_trigger: List[Dict[int, Buff]] = [{} for _ in range(N_TRIGGERS)]
+        self.expiry: Dict[int, List[Tuple[int, int]]] = {}
+        self.totals: Dict[int, int] = {}
+        self.listeners: List[Dict[int, int]] = [{} for _ in range(N_TRIGGERS)]  # kind -> エントリ数
+        self.mods: Optional[Tuple[float, int]] = None  # 与ダメージの (倍率, 加算)。None = 未計算
+        # 旧形式（{"kind", "power", "turns", "trigger"} の dict のリスト）からの移行用
+        for b in buffs:
+            self.add(buff_kind_id(b["kind"]), b["power"], b.get("turns", 1), trigger_id(b["trigger"]))
+
+    # ---- 追加・経過 ----
+    def add(self, kind: int, power: int, turns: int, trigger: int) -> Buff:
+        """
+        バフを追加して、まとめ先の Buff を返す。
+        turns は1以上に丸める（0T のバフも次の tick までは有効、旧仕様と同じ）。
+        """
+        expires = self.now + (turns if turns > 0 else 1)
+        key = (expires << _KIND_BITS) | kind
+        totals = self.totals
+        totals[kind] = totals.get(kind, 0) + power
+        if trigger == _ON_ATTACK_CALC:
+            self.mods = None
+        bucket = self.by_trigger[trigger]
+        b = bucket.get(key)
+        if b is not None:
+            b.power += power
+            b.stacks += 1
+            return b
+        b = bucket[key] = Buff(kind, power, trigger, expires)
+        ls = self.listeners[trigger]
+        ls[kind] = ls.get(kind, 0) + 1
+        ex = self.expiry.get(expires)
+        if ex is None:
+            self.expiry[expires] = [(trigger, key)]
+        else:
+            ex.append((trigger, key))
+        return b
+
+    def tick(self) -> None:
+        """残りターンを1減らし、0になったものを消す。"""
+        self.now += 1
+        expired = self.expiry.pop(self.now, None)
+        if expired is None:
+            return
+        by_trigger = self.by_trigger
+        totals = self.totals
+        listeners = self.listeners
+        for trigger, key in expired:
+            if trigger == _ON_ATTACK_CALC:
+                self.mods = None
+            b = by_trigger[trigger].pop(key)
+            kind = b.kind
+            left = totals.get(kind, 0) - b.power
+            if left:
+                totals[kind] = left
+            else:
+                del totals[kind]
+            ls = listeners[trigger]
+            n = ls[kind] - 1
+            if n:
+                ls[kind] = n
+            else:
+                del ls[kind]
+
+    def clear(self) -> None:
+        """空のストアに戻す（tick の回数も0から）。"""
+        self.now = 0
+        for bucket in self.by_trigger:
+            bucket.clear()
+        self.expiry.clear()
+        self.totals.clear()
+        for ls in self.listeners:
+            ls.clear()
+        self.mods = None
+
+    def copy(self) -> "BuffStore":
+        new = BuffStore.__new__(BuffStore)
+        new.now = self.now
+        new.by_trigger = [{k: b.copy() for k, b in bucket.items()} for bucket in self.by_trigger]
+        new.expiry = {t: list(keys) for t, keys in self.expiry.items()}
+        new.totals = dict(self.totals)
+        new.listeners = [dict(ls) for ls in self.listeners]
+        new.mods = self.mods
+        return new
+
+    # ---- 参照 ----
+    def of(self, trigger: int) -> Iterable[Buff]:
+        """trigger のバフだけを返す（フックから呼ぶ）。"""
+        return self.by_trigger[trigger].values()
+
+    def turns_left(self, b: Buff) -> int:
+        return b.expires - self.now
+
+    def total(self, kind: int) -> int:
+        """kind の power 合計（UI・AI のヒューリスティック用）。"""
+        return self.totals.get(kind, 0)
+
+    def __iter__(self) -> Iterator[Buff]:
+        for bucket in self.by_trigger:
+            yield from bucket.values()
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self.by_trigger)
+
+    def __bool__(self) -> bool:
+        return any(self.by_trigger)
+
+    def __repr__(self) -> str:
+        items = ", ".join(
+            f"{b.kind_name}+{b.power}x{b.stacks}({self.turns_left(b)}T)" for b in self
+        )
+        return f"BuffStore([{items}])"
@@ -2,126 +2,285 @@
 
 """
 カード効果とバフ（Buff）処理 + mini ops エンジン
+
+乱数が必要な効果はモジュールグローバルの random ではなく bm.rng を使うこと。
+計測（profiling.PROFILER）が有効なときだけ、step / バフハンドラごとに時間を測る。
 """
 
 from __future__ import annotations
-from typing import Any, Dict, List
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from data import CARD_SPECS
-from model import CardInstance
+from model import (
+    Buff, BuffKind, CardInstance, N_BUFF_KINDS, Trigger, buff_kind_id, set_on_hit_dispatcher, trigger_id,
+)
+from buff_store import BuffStore
+from events import (
+    EV_ATTACK, EV_BLOCK, EV_BUFF, EV_BUFF_PROC, EV_SKILL, EV_UNKNOWN_OP,
+)
+from profiling import PROFILER, perf_counter
 
 # =========================
 # バフ関連ユーティリティ
 # =========================
 
-BuffDict = Dict[str, Any]  # {"kind": str, "power": int, "turns": int, "trigger": str}
-
-
-def _ensure_buffs_attr(actor: Any) -> None:
-    """Actor に buffs リストがなければ生やす。"""
-    if not hasattr(actor, "buffs") or actor.buffs is None:
-        actor.buffs: List[BuffDict] = []  # type: ignore[attr-defined]
-
-
-def add_buff(actor: Any, kind: str, power: int, turns: int, trigger: str) -> None:
+# よく使う kind / trigger はモジュール定数に落としておく（ホットパスで Enum を引かない）
+WEAK = int(BuffKind.WEAK)
+COUNTER = int(BuffKind.COUNTER)
+TURN_START = int(Trigger.TURN_START)
+ON_CARD_PLAY = int(Trigger.ON_CARD_PLAY)
+ON_ATTACK_CALC = int(Trigger.ON_ATTACK_CALC)
+ON_HIT = int(Trigger.ON_HIT)
+TRIG_BLOCK_RECOVER = int(BuffKind.TRIG_BLOCK_RECOVER)
+
+
+def _buffs(actor: Any) -> BuffStore:
+    """Actor の BuffStore を返す（なければ生やす／旧形式のリストなら移し替える）。"""
+    try:
+        store = actor.buffs
+    except AttributeError:
+        store = None
+    if store.__class__ is not BuffStore:
+        store = BuffStore(store or ())
+        actor.buffs = store  # type: ignore[attr-defined]
+    return store
+
+
+def add_buff(actor: Any, kind: Union[int, str], power: int, turns: int, trigger: Union[int, str]) -> None:
     """
-    バフ1つを追加する。
-    - 重ねがけは「インスタンスが増える」だけ。
+    バフ1つを追加する。kind / trigger は整数ID（文字列表記も可）。
+    - 同じ kind・同じ残りターンのバフとは1つにまとめて power を合算する。
     """
-    _ensure_buffs_attr(actor)
-    actor.buffs.append(
-        {"kind": kind, "power": int(power), "turns": int(turns), "trigger": trigger}
-    )
+    if kind.__class__ is str:
+        kind = buff_kind_id(kind)
+    if trigger.__class__ is str:
+        trigger = trigger_id(trigger)
+    _buffs(actor).add(kind, power, turns, trigger)
 
 
 def tick_buffs(actor: Any) -> None:
     """
     ターン終了などで呼び出して、すべてのバフの残ターンを1減らす。
-    0以下になったものは削除。
+    0以下になったものは削除（期限切れのものだけを見る）。
     """
-    _ensure_buffs_attr(actor)
-    alive: List[BuffDict] = []
-    for b in actor.buffs:
-        b["turns"] -= 1
-        if b["turns"] > 0:
-            alive.append(b)
-    actor.buffs = alive  # type: ignore[attr-defined]
+    _buffs(actor).tick()
 
 
 # --- イベントごとにバフを適用するための補助 ---
+#
+# kind → ハンドラの表（BuffKind の値で引く。None は「このタイミングでは何もしない」）
 
-def apply_buffs_on_turn_start(bm: Any, actor: Any, enemy: Any) -> None:
-    """
-    ターン開始時に呼び出してほしいフック。
-    """
-    _ensure_buffs_attr(actor)
-    logs: List[str] = []
-
-    for b in actor.buffs:
-        if b["trigger"] != "turn_start":
-            continue
-        kind = b["kind"]
-        power = b["power"]
+TurnStartHandler = Callable[[Any, Any, Any, Buff], None]
+CardPlayHandler = Callable[[Any, str, Any, Buff], None]
 
-        if kind == "FORM_WALL":  # S23: 陣形：堅壁（3T毎ターンBlock+3）
-            actor.block += power
-            logs.append(f"{actor.name} の堅壁 → Block+{power}（合計 {actor.block}）")
 
-        elif kind == "FORM_WEAK_STACK":  # S25: 陣形：弱体蓄積
-            add_buff(enemy, kind="WEAK", power=1, turns=1, trigger="on_attack_calc")
-            logs.append(f"{actor.name} の弱体蓄積 → {enemy.name} に弱体+1")
+def _ts_form_wall(bm: Any, actor: Any, enemy: Any, b: Buff) -> None:
+    # S23: 陣形：堅壁（3T毎ターンBlock+3）
+    actor.block += b.power
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_BUFF_PROC, actor, b.power, None, b.kind, actor.block))
+
 
-        elif kind == "FORM_DRAW":  # S26: 陣形：散兵隊（2T毎ターンドロー+1）
-            if hasattr(bm, "draw_cards"):
-                bm.draw_cards(actor, power)
-                logs.append(f"{actor.name} の散兵隊 → カード+{power}枚")
+def _ts_form_weak_stack(bm: Any, actor: Any, enemy: Any, b: Buff) -> None:
+    # S25: 陣形：弱体蓄積（重ねがけ1つにつき弱体+1）
+    stacks = b.stacks
+    _buffs(enemy).add(WEAK, stacks, 1, ON_ATTACK_CALC)
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_BUFF_PROC, actor, stacks, None, b.kind, enemy))
 
-        elif kind == "FORM_COUNTER_STACK":  # S27: 陣形：反撃陣（3T毎ターン反撃+1）
-            add_buff(actor, kind="COUNTER", power=power, turns=1, trigger="on_hit")
-            logs.append(f"{actor.name} の反撃陣 → 反撃+{power}")
 
-    for line in logs:
-        bm.logger(line)
+def _ts_form_draw(bm: Any, actor: Any, enemy: Any, b: Buff) -> None:
+    # S26: 陣形：散兵隊（2T毎ターンドロー+1）
+    if hasattr(bm, "draw_cards"):
+        bm.draw_cards(actor, b.power)
+        ev = bm.events
+        if ev.on:
+            ev.emit((EV_BUFF_PROC, actor, b.power, None, b.kind, None))
+
+
+def _ts_form_counter_stack(bm: Any, actor: Any, enemy: Any, b: Buff) -> None:
+    # S27: 陣形：反撃陣（3T毎ターン反撃+1）
+    _buffs(actor).add(COUNTER, b.power, 1, ON_HIT)
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_BUFF_PROC, actor, b.power, None, b.kind, None))
+
+
+def _cp_counter_if(ctype_needed: Optional[str]) -> CardPlayHandler:
+    """カード種別が ctype_needed（None なら何でも）のとき反撃+power。"""
+    def handler(bm: Any, ctype: str, user: Any, b: Buff) -> None:
+        if ctype_needed is not None and ctype != ctype_needed:
+            return
+        _buffs(user).add(COUNTER, b.power, 1, ON_HIT)
+        ev = bm.events
+        if ev.on:
+            ev.emit((EV_BUFF_PROC, user, b.power, None, b.kind, None))
+    return handler
+
+
+def _cp_skill_draw(bm: Any, ctype: str, user: Any, b: Buff) -> None:
+    # S30: 一斉号令
+    if ctype == "skill" and hasattr(bm, "draw_cards"):
+        bm.draw_cards(user, b.power)
+        ev = bm.events
+        if ev.on:
+            ev.emit((EV_BUFF_PROC, user, b.power, None, b.kind, None))
+
+
+TURN_START_HANDLERS: List[Optional[TurnStartHandler]] = [None] * N_BUFF_KINDS
+TURN_START_HANDLERS[BuffKind.FORM_WALL] = _ts_form_wall
+TURN_START_HANDLERS[BuffKind.FORM_WEAK_STACK] = _ts_form_weak_stack
+TURN_START_HANDLERS[BuffKind.FORM_DRAW] = _ts_form_draw
+TURN_START_HANDLERS[BuffKind.FORM_COUNTER_STACK] = _ts_form_counter_stack
+
+CARD_PLAY_HANDLERS: List[Optional[CardPlayHandler]] = [None] * N_BUFF_KINDS
+CARD_PLAY_HANDLERS[BuffKind.TRIG_ATTACK_COUNTER] = _cp_counter_if("attack")   # S28: 反撃姿勢
+CARD_PLAY_HANDLERS[BuffKind.TRIG_DEF_COUNTER] = _cp_counter_if("defense")     # S29: 攻防一体
+CARD_PLAY_HANDLERS[BuffKind.TRIG_SKILL_DRAW] = _cp_skill_draw                 # S30: 一斉号令
+CARD_PLAY_HANDLERS[BuffKind.TRIG_ANY_COUNTER] = _cp_counter_if(None)          # S31: 士気高揚
+
+
+# --- トリガーバス（on_attack_calc / on_hit） ---
+#
+# on_attack_calc は「与ダメージの (倍率, 加算)」への寄与として kind ごとに書き、
+# 合成した結果を BuffStore.mods にキャッシュする（バフが増えた/切れたときだけ計算し直す）。
+# on_hit は被弾のたびに BuffStore.listeners（いま生きている kind だけ）を回し、
+# power は kind ごとの合計（totals）を渡す。リスナーがいなければ空の dict を1回見るだけ。
+
+AttackModifier = Callable[[int], Tuple[float, int]]
+HitHandler = Callable[[Any, Any, Any, int, int, int], None]
+
+NO_MODIFIERS: Tuple[float, int] = (1.0, 0)
+
+
+def _mod_weak(power: int) -> Tuple[float, int]:
+    # 弱体：持ち主の与ダメージを1段につき1減らす
+    return 1.0, -power
+
+
+def _hit_counter(bm: Any, owner: Any, source: Any, absorbed: int, dealt: int, power: int) -> None:
+    # 反撃：殴ってきた相手に power ダメージ（反撃の反撃はしないので source なしで当てる）
+    if source is None or source is owner:
+        return
+    dealt_back = source.take_damage(power)
+    if bm is not None:
+        ev = bm.events
+        if ev.on:
+            ev.emit((EV_BUFF_PROC, owner, dealt_back, None, COUNTER, source))
+
+
+def _hit_block_recover(bm: Any, owner: Any, source: Any, absorbed: int, dealt: int, power: int) -> None:
+    # S32: 節度ある陣形操作（Block で受けるたびに Block+power）
+    if absorbed <= 0:
+        return
+    owner.block += power
+    if bm is not None:
+        ev = bm.events
+        if ev.on:
+            ev.emit((EV_BUFF_PROC, owner, power, None, TRIG_BLOCK_RECOVER, owner.block))
+
+
+ATTACK_MODIFIERS: List[Optional[AttackModifier]] = [None] * N_BUFF_KINDS
+ATTACK_MODIFIERS[BuffKind.WEAK] = _mod_weak
+
+HIT_HANDLERS: List[Optional[HitHandler]] = [None] * N_BUFF_KINDS
+HIT_HANDLERS[BuffKind.COUNTER] = _hit_counter
+HIT_HANDLERS[BuffKind.TRIG_BLOCK_RECOVER] = _hit_block_recover
+
+
+def _compute_modifiers(store: BuffStore) -> Tuple[float, int]:
+    mult = 1.0
+    flat = 0
+    totals = store.totals
+    for kind in store.listeners[ON_ATTACK_CALC]:
+        m = ATTACK_MODIFIERS[kind]
+        if m is not None:
+            k, add = m(totals[kind])
+            mult *= k
+            flat += add
+    mods = store.mods = (mult, flat)
+    return mods
+
+
+def attack_modifiers(actor: Any) -> Tuple[float, int]:
+    """
+    actor の与ダメージ補正 (倍率, 加算)。ダメージは floor(基礎 × 倍率) + 加算（0 未満は 0）。
+    BuffStore.mods のキャッシュを返す（UI・AI のヒューリスティック用にもそのまま使える）。
+    """
+    store = _buffs(actor)
+    mods = store.mods
+    return mods if mods is not None else _compute_modifiers(store)
 
 
-def apply_buffs_on_card_play(bm: Any, card: CardInstance, user: Any, target: Any) -> None:
+def fire_on_hit(owner: Any, source: Any, absorbed: int, dealt: int) -> None:
     """
-    カード使用時に呼び出してほしいフック。
+    被弾時のフック（Actor.take_damage から、on_hit のリスナーがいるときだけ呼ばれる）。
+    倒れた Actor のバフは発動しない。
     """
-    _ensure_buffs_attr(user)
-    logs: List[str] = []
-    ctype = getattr(card, "card_type", None) or getattr(card, "type", None)
+    if owner.hp <= 0:
+        return
+    store = owner.buffs
+    totals = store.totals
+    bm = getattr(owner, "battle", None)
+    for kind in store.listeners[ON_HIT]:
+        h = HIT_HANDLERS[kind]
+        if h is not None:
+            h(bm, owner, source, absorbed, dealt, totals[kind])
 
-    for b in user.buffs:
-        if b["trigger"] != "on_card_play":
-            continue
-        kind = b["kind"]
-        power = b["power"]
 
-        if kind == "TRIG_ATTACK_COUNTER":  # S28: 反撃姿勢
-            if ctype == "attack":
-                add_buff(user, kind="COUNTER", power=power, turns=1, trigger="on_hit")
-                logs.append(f"{user.name} の反撃姿勢 → 反撃+{power}")
+set_on_hit_dispatcher(fire_on_hit)
 
-        elif kind == "TRIG_DEF_COUNTER":  # S29: 攻防一体
-            if ctype == "defense":
-                add_buff(user, kind="COUNTER", power=power, turns=1, trigger="on_hit")
-                logs.append(f"{user.name} の攻防一体 → 反撃+{power}")
 
-        elif kind == "TRIG_SKILL_DRAW":  # S30: 一斉号令
-            if ctype == "skill" and hasattr(bm, "draw_cards"):
-                bm.draw_cards(user, power)
-                logs.append(f"{user.name} の一斉号令 → カード+{power}枚")
+_KIND_NAMES: Tuple[str, ...] = tuple(k.name for k in BuffKind)
 
-        elif kind == "TRIG_ANY_COUNTER":  # S31: 士気高揚
-            add_buff(user, kind="COUNTER", power=power, turns=1, trigger="on_hit")
-            logs.append(f"{user.name} の士気高揚 → 反撃+{power}")
 
-        elif kind == "TRIG_BLOCK_RECOVER":  # S32: 節度ある陣形操作
-            # 実際の Block 消費検知は take_damage 側で対応予定（ここでは何もしない）
-            pass
+def _run_buffs_profiled(
+    label: str, handlers: List[Any], bucket: Dict[int, Buff], bm: Any, a: Any, c: Any,
+) -> None:
+    """計測有効時の apply_buffs_on_* 本体（kind ごとに時間を測る）。"""
+    add = PROFILER.add
+    for b in bucket.values():
+        h = handlers[b.kind]
+        if h is not None:
+            t0 = perf_counter()
+            h(bm, a, c, b)
+            add("buff", f"{label}:{_KIND_NAMES[b.kind]}", perf_counter() - t0)
 
-    for line in logs:
-        bm.logger(line)
+
+def apply_buffs_on_turn_start(bm: Any, actor: Any, enemy: Any) -> None:
+    """
+    ターン開始時に呼び出してほしいフック。
+    """
+    handlers = TURN_START_HANDLERS
+    bucket = _buffs(actor).by_trigger[TURN_START]
+    if PROFILER.on:
+        _run_buffs_profiled("turn_start", handlers, bucket, bm, actor, enemy)
+        return
+    # 同じ trigger のバフを追加するハンドラは無いので、走査中の辞書は変化しない
+    for b in bucket.values():
+        h = handlers[b.kind]
+        if h is not None:
+            h(bm, actor, enemy, b)
+
+
+def apply_buffs_on_card_play(bm: Any, card: CardInstance, user: Any, target: Any) -> None:
+    """
+    カード使用時に呼び出してほしいフック。
+    """
+    bucket = _buffs(user).by_trigger[ON_CARD_PLAY]
+    if not bucket:
+        return
+    handlers = CARD_PLAY_HANDLERS
+    ctype = getattr(card, "card_type", None) or getattr(card, "type", None)
+    if PROFILER.on:
+        _run_buffs_profiled("on_card_play", handlers, bucket, bm, ctype, user)
+        return
+    for b in bucket.values():
+        h = handlers[b.kind]
+        if h is not None:
+            h(bm, ctype, user, b)
 
 
 # =========================
@@ -130,47 +289,68 @@ def apply_buffs_on_card_play(bm: Any, card: CardInstance, user: Any, target: Any
 
 def calc_attack_damage(attacker: Any, defender: Any, base_damage: int) -> int:
     """
-    現時点では「弱体などはまだ未反映のプレーン計算」。
-    後で WEAK / VULN などのバフをここに反映させる。
+    攻撃1回ぶんのダメージ。攻撃側のキャッシュ済み補正（attack_modifiers）をかけるだけの O(1)。
+    カード・敵行動の攻撃はすべてここを通してから take_damage(dmg, attacker) に渡す。
     """
-    dmg = base_damage
-    # TODO: attacker/defender.buffs から WEAK / VULN などを見て倍率をかける
-    return max(int(dmg), 0)
+    store = _buffs(attacker)
+    mods = store.mods
+    if mods is None:
+        mods = _compute_modifiers(store)
+    mult, flat = mods
+    dmg = (base_damage if mult == 1.0 else int(base_damage * mult)) + flat
+    return dmg if dmg > 0 else 0
 
 
 # =========================
 # mini ops エンジン
 # =========================
+#
+# 各 op ハンドラは (value, bm, card, user, target) を受け取る。
+# 先頭の value はカードのコンパイル時に functools.partial で束縛しておき、
+# プレイ時は step(bm, card, user, target) と呼ぶだけにする。
+# ログは文字列を作らず bm.events にイベントタプルを流す（events.py）。
 
-def _log_name(card: CardInstance) -> str:
-    spec_id = getattr(card, "spec_id", "")
-    spec = CARD_SPECS.get(spec_id, {})
-    return spec.get("name", spec_id)
+Step = Callable[[Any, CardInstance, Any, Any], None]
+CardPlan = Tuple[Step, ...]
 
 
-def _op_attack(bm: Any, card: CardInstance, user: Any, target: Any, value: int, logs: List[str]) -> None:
+def _op_attack(value: int, bm: Any, card: CardInstance, user: Any, target: Any) -> None:
     dmg = calc_attack_damage(user, target, value)
-    dealt = target.take_damage(dmg)
-    name = _log_name(card)
-    logs.append(f"{user.name} の{name} → {target.name} に {dealt} ダメージ")
+    dealt = target.take_damage(dmg, user)
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_ATTACK, user, dealt, card.spec_id, target))
 
 
-def _op_gain_block(bm: Any, card: CardInstance, user: Any, target: Any, value: int, logs: List[str]) -> None:
+def _op_gain_block(value: int, bm: Any, card: CardInstance, user: Any, target: Any) -> None:
     user.block += value
-    name = _log_name(card)
-    logs.append(f"{user.name} の{name} → Block+{value}（合計 {user.block}）")
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_BLOCK, user, value, card.spec_id, user.block))
 
 
-def _op_add_weak(bm: Any, card: CardInstance, user: Any, target: Any, value: int, logs: List[str]) -> None:
+def _op_add_weak(value: int, bm: Any, card: CardInstance, user: Any, target: Any) -> None:
     """弱体を付与するシンプル版（value 段・2T 固定）。"""
-    add_buff(target, kind="WEAK", power=value, turns=2, trigger="on_attack_calc")
-    logs.append(f"{target.name} に弱体{value}（2T）")
+    _buffs(target).add(WEAK, value, 2, ON_ATTACK_CALC)
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_BUFF, target, value, card.spec_id, WEAK, 2))
 
 
-def _op_add_counter(bm: Any, card: CardInstance, user: Any, target: Any, value: int, logs: List[str]) -> None:
+def _op_add_counter(value: int, bm: Any, card: CardInstance, user: Any, target: Any) -> None:
     """反撃カウンタを付与するシンプル版（value・1T・on_hit 固定）。"""
-    add_buff(user, kind="COUNTER", power=value, turns=1, trigger="on_hit")
-    logs.append(f"{user.name} は反撃+{value}（1T）")
+    _buffs(user).add(COUNTER, value, 1, ON_HIT)
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_BUFF, user, value, card.spec_id, COUNTER, 1))
+
+
+def _op_unknown(op_name: str, bm: Any, card: CardInstance, user: Any, target: Any) -> None:
+    # 未実装 op は計測の on/off に関係なく数えておく（PROFILER.report に出る）
+    PROFILER.count("unknown_op", op_name)
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_UNKNOWN_OP, user, 0, card.spec_id, op_name))
 
 
 OPS_TABLE = {
@@ -181,135 +361,230 @@ OPS_TABLE = {
 }
 
 
-def _run_ops(
-    bm: Any,
-    card: CardInstance,
-    user: Any,
-    target: Any,
-    ops: List[Dict[str, Any]],
-) -> List[str]:
+def compile_ops(ops: List[Dict[str, Any]]) -> CardPlan:
     """
-    data.py の "ops" 配列を順に解決するミニエンジン。
+    data.py の "ops" 配列を、引数を束縛済みの step のタプルに変換する。
     STEP1 では timing は無視して「on_play 時に全部実行」で OK。
     """
-    logs: List[str] = []
+    steps: List[Step] = []
     for op_spec in ops:
         op_name = op_spec.get("op")
         if not op_name:
             continue
         handler = OPS_TABLE.get(op_name)
         if not handler:
-            logs.append(f"[DEBUG] 未実装の op: {op_name}")
+            steps.append(partial(_op_unknown, op_name))
             continue
-        value = int(op_spec.get("value", 0))
-        handler(bm, card, user, target, value, logs)
-    return logs
+        steps.append(partial(handler, int(op_spec.get("value", 0))))
+    return tuple(steps)
+
+
+def _run_ops(
+    bm: Any,
+    card: CardInstance,
+    user: Any,
+    target: Any,
+    ops: List[Dict[str, Any]],
+) -> None:
+    """ops 配列をその場でコンパイルして解決する（カード以外からの単発実行用）。"""
+    plan = compile_ops(ops)
+    if PROFILER.on:
+        _run_plan_profiled(plan, bm, card, user, target)
+        return
+    for step in plan:
+        step(bm, card, user, target)
 
 
 # =========================
-# カードごとの基本解決
+# 互換用：旧来ロジックの step
 # =========================
 
-def apply_card_effect(bm: Any, card: CardInstance, user: Any, target: Any) -> str:
-    """
-    バトル側から呼び出されるエントリポイント。
+def _step_use_skill(bm: Any, card: CardInstance, user: Any, target: Any) -> None:
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_SKILL, user, 0, card.spec_id))
 
-    方針：
-    - まず data 側に "ops" があれば mini ops エンジンで解決
-    - なければ旧来の「card_type と tags / spec_id」で処理する
-    """
-    spec_id = getattr(card, "spec_id", "")
-    spec = CARD_SPECS.get(spec_id, {})
-    ctype = spec.get("card_type", getattr(card, "card_type", "skill"))
-    tags = spec.get("tags", [])
-    name = _log_name(card)
 
-    # ===== 1) ops 優先 =====
-    ops = spec.get("ops")
-    if ops:
-        logs = _run_ops(bm, card, user, target, ops)
-        return " / ".join(logs)
+def _step_add_buff(
+    on_target: bool, kind: int, power: int, turns: int, trigger: int,
+    bm: Any, card: CardInstance, user: Any, target: Any,
+) -> None:
+    who = target if on_target else user
+    _buffs(who).add(kind, power, turns, trigger)
+    ev = bm.events
+    if ev.on:
+        ev.emit((EV_BUFF, who, power, card.spec_id, kind, turns))
+
+
+def _step_s18_counter(bm: Any, card: CardInstance, user: Any, target: Any) -> None:
+    # S18: 反撃2。Block>0なら反撃+1
+    _step_add_buff(False, COUNTER, 2, 1, ON_HIT, bm, card, user, target)
+    if user.block > 0:
+        _step_add_buff(False, COUNTER, 1, 1, ON_HIT, bm, card, user, target)
+
 
-    # ===== 2) 互換用：従来ロジック =====
-    logs: List[str] = []
+def _buff_step(on_target: bool, kind: str, power: int, turns: int, trigger: str) -> Step:
+    # 文字列表記はコンパイル時に整数IDへ解決しておく
+    return partial(_step_add_buff, on_target, buff_kind_id(kind), power, turns, trigger_id(trigger))
+
+
+def _compile_legacy(spec_id: str, spec: Dict[str, Any]) -> CardPlan:
+    """ops を持たないカードを「card_type と tags / spec_id」から step 列にする。"""
+    ctype = spec.get("card_type", "skill")
+    tags = spec.get("tags", [])
+    power = spec.get("power", 0)
+    steps: List[Step] = []
 
     # --- 基本攻撃・防御 ---
     if ctype == "attack":
-        base = getattr(card, "power", spec.get("power", 0))
-        dmg = calc_attack_damage(user, target, base)
-        dealt = target.take_damage(dmg)
-        logs.append(f"{user.name} の{name} → {target.name} に {dealt} ダメージ")
-
+        steps.append(partial(_op_attack, power))
     elif ctype == "defense":
-        gain = getattr(card, "power", spec.get("power", 0))
-        user.block += gain
-        logs.append(f"{user.name} の{name} → Block+{gain}（合計 {user.block}）")
-
+        steps.append(partial(_op_gain_block, power))
     else:  # skill
-        logs.append(f"{user.name} は{name}を使用した。")
+        steps.append(_step_use_skill)
 
     # --- 代表的な追加効果（タグ & spec_id ベース） ---
 
     # 弱体付与（シンプルなものだけ）
     if "weaken" in tags:
         if spec_id in ("S4", "S9"):
-            add_buff(target, kind="WEAK", power=1, turns=2, trigger="on_attack_calc")
-            logs.append(f"{target.name} に弱体1（2T）")
+            steps.append(_buff_step(True, "WEAK", 1, 2, "on_attack_calc"))
         elif spec_id == "S10":
-            add_buff(target, kind="WEAK", power=2, turns=2, trigger="on_attack_calc")
-            logs.append(f"{target.name} に弱体2（2T）")
+            steps.append(_buff_step(True, "WEAK", 2, 2, "on_attack_calc"))
         elif spec_id == "S12":
-            add_buff(target, kind="WEAK", power=2, turns=2, trigger="on_attack_calc")
-            logs.append(f"{target.name} に弱体2（2T）（崩落の槍）")
+            steps.append(_buff_step(True, "WEAK", 2, 2, "on_attack_calc"))
 
     # シンプルな反撃付与
     if "counter" in tags:
         if spec_id == "S16":  # Block6＋反撃1
-            add_buff(user, kind="COUNTER", power=1, turns=1, trigger="on_hit")
-            logs.append(f"{user.name} は反撃+1（1T）")
+            steps.append(_buff_step(False, "COUNTER", 1, 1, "on_hit"))
         elif spec_id == "S18":  # 4ダメ＋反撃2。Block>0なら反撃+1
-            add_buff(user, kind="COUNTER", power=2, turns=1, trigger="on_hit")
-            if user.block > 0:
-                add_buff(user, kind="COUNTER", power=1, turns=1, trigger="on_hit")
-            logs.append(f"{user.name} は反撃+2(+1) を得た")
+            steps.append(_step_s18_counter)
         elif spec_id == "S22":  # Block12＋反撃2。このターン反撃減少20%
-            add_buff(user, kind="COUNTER", power=2, turns=1, trigger="on_hit")
-            logs.append(f"{user.name} は反撃+2 を得た")
+            steps.append(_buff_step(False, "COUNTER", 2, 1, "on_hit"))
 
     # 陣形（turn_start 系バフ）
     if "formation" in tags:
         if spec_id == "S23":
-            add_buff(user, kind="FORM_WALL", power=3, turns=3, trigger="turn_start")
-            logs.append(f"{user.name} は陣形『堅壁』を展開（3T）")
+            steps.append(_buff_step(False, "FORM_WALL", 3, 3, "turn_start"))
         elif spec_id == "S24":
-            add_buff(user, kind="FORM_DEF_BOOST", power=3, turns=2, trigger="on_card_play")
-            logs.append(f"{user.name} は陣形『防御効率化』を展開（2T）")
+            steps.append(_buff_step(False, "FORM_DEF_BOOST", 3, 2, "on_card_play"))
         elif spec_id == "S25":
-            add_buff(user, kind="FORM_WEAK_STACK", power=1, turns=3, trigger="turn_start")
-            logs.append(f"{user.name} は陣形『弱体蓄積』を展開（3T）")
+            steps.append(_buff_step(False, "FORM_WEAK_STACK", 1, 3, "turn_start"))
         elif spec_id == "S26":
-            add_buff(user, kind="FORM_DRAW", power=1, turns=2, trigger="turn_start")
-            logs.append(f"{user.name} は陣形『散兵隊』を展開（2T）")
+            steps.append(_buff_step(False, "FORM_DRAW", 1, 2, "turn_start"))
         elif spec_id == "S27":
-            add_buff(user, kind="FORM_COUNTER_STACK", power=1, turns=3, trigger="turn_start")
-            logs.append(f"{user.name} は陣形『反撃陣』を展開（3T）")
+            steps.append(_buff_step(False, "FORM_COUNTER_STACK", 1, 3, "turn_start"))
 
     # トリガー系
     if "trigger" in tags:
         if spec_id == "S28":
-            add_buff(user, kind="TRIG_ATTACK_COUNTER", power=1, turns=1, trigger="on_card_play")
-            logs.append(f"{user.name} は反撃姿勢を取った（このターン攻撃で反撃+1）")
+            steps.append(_buff_step(False, "TRIG_ATTACK_COUNTER", 1, 1, "on_card_play"))
         elif spec_id == "S29":
-            add_buff(user, kind="TRIG_DEF_COUNTER", power=1, turns=1, trigger="on_card_play")
-            logs.append(f"{user.name} は攻防一体を発動（このターン防御で反撃+1）")
+            steps.append(_buff_step(False, "TRIG_DEF_COUNTER", 1, 1, "on_card_play"))
         elif spec_id == "S30":
-            add_buff(user, kind="TRIG_SKILL_DRAW", power=1, turns=1, trigger="on_card_play")
-            logs.append(f"{user.name} は一斉号令を発した（このターンスキルでドロー+1）")
+            steps.append(_buff_step(False, "TRIG_SKILL_DRAW", 1, 1, "on_card_play"))
         elif spec_id == "S31":
-            add_buff(user, kind="TRIG_ANY_COUNTER", power=1, turns=1, trigger="on_card_play")
-            logs.append(f"{user.name} は士気高揚した（このターンカード使用で反撃+1）")
+            steps.append(_buff_step(False, "TRIG_ANY_COUNTER", 1, 1, "on_card_play"))
         elif spec_id == "S32":
-            add_buff(user, kind="TRIG_BLOCK_RECOVER", power=1, turns=1, trigger="on_card_play")
-            logs.append(f"{user.name} は節度ある陣形操作を行った（このターンBlock消費毎にBlock+1）")
+            steps.append(_buff_step(False, "TRIG_BLOCK_RECOVER", 1, 1, "on_hit"))
+
+    return tuple(steps)
+
+
+# =========================
+# カード → 実行プラン
+# =========================
+
+def compile_card_plan(spec_id: str) -> CardPlan:
+    """
+    1枚ぶんの実行プランを作る。
+
+    方針：
+    - まず data 側に "ops" があれば mini ops をコンパイル
+    - なければ旧来の「card_type と tags / spec_id」から組み立てる
+    """
+    spec = CARD_SPECS.get(spec_id, {})
+    ops = spec.get("ops")
+    if ops:
+        return compile_ops(ops)
+    return _compile_legacy(spec_id, spec)
 
-    return " / ".join(logs)
+
+# spec_id -> CardPlan（import 時に全カードぶんコンパイル）
+CARD_PLANS: Dict[str, CardPlan] = {}
+
+
+def compile_all_plans() -> None:
+    """CARD_SPECS を書き換えたあとに呼べば全プランを作り直す。"""
+    CARD_PLANS.clear()
+    for sid in CARD_SPECS:
+        CARD_PLANS[sid] = compile_card_plan(sid)
+
+
+def get_card_plan(spec_id: str) -> CardPlan:
+    plan = CARD_PLANS.get(spec_id)
+    if plan is None:
+        plan = CARD_PLANS[spec_id] = compile_card_plan(spec_id)
+    return plan
+
+
+compile_all_plans()
+
+
+# =========================
+# カードごとの基本解決
+# =========================
+
+def apply_card_effect(bm: Any, card: CardInstance, user: Any, target: Any) -> None:
+    """
+    バトル側から呼び出されるエントリポイント。
+    デッキ構築時にカードへ載せたプラン（card.plan）を順に実行するだけ。
+    結果は bm.events に流れる。
+    """
+    plan = card.plan or get_card_plan(card.spec_id)
+    if PROFILER.on:
+        _run_plan_profiled(plan, bm, card, user, target)
+        return
+    for step in plan:
+        step(bm, card, user, target)
+
+
+# =========================
+# 計測（PROFILER.on のときだけ通る）
+# =========================
+
+_OP_NAMES: Dict[Any, str] = {fn: name for name, fn in OPS_TABLE.items()}
+_STEP_NAMES: Dict[Any, str] = {}
+
+
+def step_name(step: Step) -> str:
+    """
+    step の表示名（計測のキー）。
+    ops の step は op 名、旧タグ由来のバフ付与は "add_buff:KIND"、未実装 op は "unknown:名前"。
+    """
+    name = _STEP_NAMES.get(step)
+    if name is not None:
+        return name
+    fn = getattr(step, "func", step)
+    args = getattr(step, "args", ())
+    if fn in _OP_NAMES:
+        name = _OP_NAMES[fn]
+    elif fn is _op_unknown:
+        name = f"unknown:{args[0]}"
+    elif fn is _step_add_buff:
+        name = f"add_buff:{_KIND_NAMES[args[1]]}"
+    else:
+        name = getattr(fn, "__name__", repr(fn))
+        if name.startswith("_step_"):
+            name = name[len("_step_"):]
+    _STEP_NAMES[step] = name
+    return name
+
+
+def _run_plan_profiled(plan: CardPlan, bm: Any, card: CardInstance, user: Any, target: Any) -> None:
+    add = PROFILER.add
+    for step in plan:
+        t0 = perf_counter()
+        step(bm, card, user, target)
+        add("op", step_name(step), perf_counter() - t0)
@@ -0,0 +1,92 @@
+# card_table.py
+"""
+CARD_SPECS を「整数ID（card no）で引ける共有配列」に展開したテーブル。
+
+- SPEC_IDS[no] / COSTS[no] / POWERS[no] / CARD_TYPES[no] : spec ごとの値
+- CARDS[no] : spec ごとに1つだけ作る共有 CardInstance（フライウェイト）
+- SPEC_INDEX[spec_id] -> no
+
+戦闘ではカード実体を毎回生成せず CARDS の参照を並べるだけにする。
+山札/手札/捨て札は card no（小さい int）の配列としても扱える（to_nos / from_nos）。
+BattleDeck の山は普段は共有 CardInstance の参照のリスト（1枚 = ポインタ1つで int のリストと同じ大きさ）。
+draw / discard / reshuffle は中身を見ないので、to_nos の配列を渡せば int の山のままでも回る。
+"""
+
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterable, List
+
+from data import CARD_SPECS
+from model import CardInstance
+from card_effects import get_card_plan
+
+SPEC_IDS: List[str] = []
+SPEC_INDEX: Dict[str, int] = {}
+COSTS: List[int] = []
+POWERS: List[int] = []
+CARD_TYPES: List[str] = []
+CARDS: List[CardInstance] = []
+
+
+def rebuild() -> None:
+    """CARD_SPECS を書き換えたら（card_effects.compile_all_plans のあとに）呼ぶ。"""
+    for tbl in (SPEC_IDS, COSTS, POWERS, CARD_TYPES, CARDS):
+        tbl.clear()
+    SPEC_INDEX.clear()
+    for sid in CARD_SPECS:
+        _register(sid)
+
+
+def _register(spec_id: str) -> int:
+    spec = CARD_SPECS[spec_id]
+    no = len(SPEC_IDS)
+    SPEC_IDS.append(spec_id)
+    SPEC_INDEX[spec_id] = no
+    COSTS.append(spec["cost"])
+    POWERS.append(spec["power"])
+    CARD_TYPES.append(spec["card_type"])
+    CARDS.append(CardInstance(
+        spec_id=spec_id,
+        cost=spec["cost"],
+        power=spec["power"],
+        card_type=spec["card_type"],
+        tags=spec.get("tags", ()),
+        plan=get_card_plan(spec_id),
+        no=no,
+    ))
+    return no
+
+
+def card_no(spec_id: str) -> int:
+    no = SPEC_INDEX.get(spec_id)
+    if no is None:
+        # あとから CARD_SPECS に足されたカード
+        no = _register(spec_id)
+    return no
+
+
+def card_for(spec_id: str) -> CardInstance:
+    """spec_id の共有 CardInstance を返す。"""
+    return CARDS[card_no(spec_id)]
+
+
+# to_nos の配列の型（符号なし16bit）。card no がこれを超えるほどカードを登録したらエラーにする
+NO_TYPECODE = "H"
+MAX_CARD_NO = (1 << 16) - 1
+
+
+def to_nos(spec_ids: Iterable[str]) -> array:
+    """spec_id 列 → card no の配列（1要素2バイト）。"""
+    nos = [card_no(sid) for sid in spec_ids]
+    if nos and max(nos) > MAX_CARD_NO:
+        raise ValueError(f"card no が {MAX_CARD_NO} を超えました（カード数 {len(SPEC_IDS)}）")
+    return array(NO_TYPECODE, nos)
+
+
+def from_nos(nos: Iterable[int]) -> List[CardInstance]:
+    """card no 列 → 共有 CardInstance のリスト。"""
+    cards = CARDS
+    return [cards[n] for n in nos]
+
+
+rebuild()
@@ -84,3 +84,89 @@ CARD_SPECS = {
     "S31": {"name": "士気高揚", "card_type": "skill", "cost": 1, "power": 0, "rarity": "U", "tags": ["trigger","counter"], "desc": "このターンカード使用時反撃+1"},
     "S32": {"name": "節度ある陣形操作", "card_type": "skill", "cost": 1, "power": 0, "rarity": "U", "tags": ["trigger","formation"], "desc": "このターンBlock消費毎にBlock+1"},
 }
+
+
+# =========================
+# 敵の行動（enemy_ai.py でコンパイル）
+# =========================
+#
+# intents : {intent id: {"name", "weight", "ops"}}。ops はカードと同じ mini ops（user=敵, target=プレイヤー）
+# mode    : "weighted"（既定。weight の比で抽選）/ "pattern"（pattern を turn_index 順に繰り返す）
+#           / "deck"（deck の CARD_SPECS で山札を組み、毎ターン手札の先頭から plays 枚出す）
+# hp      : 既定の最大HP（simulate などは enemy_hp 引数が優先）
+
+ENEMY_SPECS = {
+    # 旧 enemy_act と同じ3択・等確率（乱数の引き方も同じ）
+    "DEFAULT": {
+        "name": "明智兵",
+        "hp": 35,
+        "intents": {
+            "attack": {"name": "攻撃", "weight": 1, "ops": [{"op": "attack", "value": 8}]},
+            "multi_attack": {"name": "連続攻撃", "weight": 1, "ops": [
+                {"op": "attack", "value": 4},
+                {"op": "attack", "value": 4},
+            ]},
+            "defense": {"name": "防御", "weight": 1, "ops": [{"op": "gain_block", "value": 6}]},
+        },
+    },
+
+    # 攻め寄り（攻撃3：連続1：防御1）
+    "ASHIGARU_RAIDER": {
+        "name": "足軽鉄砲隊",
+        "hp": 30,
+        "intents": {
+            "volley": {"name": "一斉射撃", "weight": 3, "ops": [{"op": "attack", "value": 7}]},
+            "rapid": {"name": "早合", "weight": 1, "ops": [
+                {"op": "attack", "value": 3},
+                {"op": "attack", "value": 3},
+                {"op": "attack", "value": 3},
+            ]},
+            "cover": {"name": "竹束", "weight": 1, "ops": [{"op": "gain_block", "value": 5}]},
+        },
+    },
+
+    # 決まった順に動く（構え → 突撃 → 突撃 → 大振り）
+    "SAMURAI_SCRIPTED": {
+        "name": "侍大将",
+        "hp": 50,
+        "mode": "pattern",
+        "pattern": ["guard", "charge", "charge", "cleave"],
+        "intents": {
+            "guard": {"name": "構え", "ops": [{"op": "gain_block", "value": 10}]},
+            "charge": {"name": "突撃", "ops": [{"op": "attack", "value": 6}]},
+            "cleave": {"name": "大振り", "ops": [{"op": "attack", "value": 14}]},
+        },
+    },
+
+    # プレイヤーと同じカードで戦う
+    "RIVAL_DECK": {
+        "name": "柴田隊",
+        "hp": 40,
+        "mode": "deck",
+        "plays": 2,
+        "deck": ["S1", "S1", "S4", "S4", "S9", "S9", "S16", "S3"],
+    },
+}
+
+
+# =========================
+# 連戦（encounter.py）
+# =========================
+#
+# fights  : 順に戦う戦闘の列。1戦 = {"enemies": [ENEMY_SPECS のキー, ...], "reward": [勝ったら MasterDeck に足すカード]}
+#           同じ敵を複数並べてもよい（表示名に A, B, ... が付く）
+# heal    : 勝つたびに回復する HP（最大HPまで）。HP・MasterDeck は戦闘をまたいで持ち越す
+
+RUN_SPECS = {
+    "FIRST_CAMPAIGN": {
+        "name": "初陣",
+        "heal": 8,
+        "fights": [
+            {"enemies": ["ASHIGARU_RAIDER"], "reward": ["S9"]},
+            {"enemies": ["DEFAULT", "ASHIGARU_RAIDER"], "reward": ["S16"]},
+            {"enemies": ["SAMURAI_SCRIPTED"], "reward": ["S12"]},
+            {"enemies": ["ASHIGARU_RAIDER", "ASHIGARU_RAIDER"], "reward": ["S23"]},
+            {"enemies": ["RIVAL_DECK", "DEFAULT"]},
+        ],
+    },
+}
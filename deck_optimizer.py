@@ -0,0 +1,281 @@
+# deck_optimizer.py
+"""
+デッキ構築の自動探索（MasterDeck の add_card / remove_card をどう積むか）
+
+- 探索：山登り＋近傍のランダム標本（1世代 = いまのデッキ＋近傍 population 個の勝ち抜き戦）
+    近傍 = 1枚追加 / 1枚削除 / 1枚入れ替え（CARD_SPECS から。枚数・レア度の上限つき）
+- 評価：parallel_sim.run_jobs でワーカープロセスに戦闘をまとめて投げる
+- 早期打ち切り：successive halving
+    全候補を min_games 戦 → 上位 1/eta だけ eta 倍の戦数に増やす → … を1つに絞るまで
+    見込みのないデッキに多くの戦闘を使わない
+- 適応度キャッシュ：デッキを spec_id の多重集合（ソート済みタプル）に正規化して SimStats を持つ
+    同じデッキを別の世代・別の並び順で見ても戦闘をやり直さず、足りない戦数だけ続きから回す
+    （seed は通し番号から決まるので、続きから足しても最初からまとめて回しても同じ結果）
+    キャッシュは最初に回したときの対戦条件（sim_params）に固定。違う条件で使うと ValueError
+
+    for gen in optimize(ids, generations=10):
+        print(gen.index, gen.best, gen.stats.win_rate)
+"""
+
+from __future__ import annotations
+import inspect
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from data import CARD_SPECS
+from master_deck import MasterDeck
+from parallel_sim import SimJob, SimStats, run_jobs
+from simulate import _play_out, greedy_policy, policy_key
+
+DeckKey = Tuple[str, ...]
+
+
+def canonical(card_ids: Iterable[str]) -> DeckKey:
+    """デッキの正規形（spec_id の多重集合＝ソート済みタプル）。"""
+    return tuple(sorted(card_ids))
+
+
+def fitness(stats: SimStats) -> float:
+    """勝率が主、同率なら短いターンで勝つ方を上にする。"""
+    return stats.win_rate - 1e-3 * stats.avg_turns
+
+
+# =========================
+# 制約
+# =========================
+
+@dataclass(frozen=True)
+class DeckLimits:
+    """デッキの枚数・同名カード・レア度ごとの上限。"""
+    min_size: int = 8
+    max_size: int = 20
+    max_copies: int = 3
+    max_rarity: Dict[str, int] = field(default_factory=lambda: {"R": 2, "U": 6})
+
+    def allows(self, card_ids: Sequence[str]) -> bool:
+        if not self.min_size <= len(card_ids) <= self.max_size:
+            return False
+        copies: Dict[str, int] = {}
+        rarity: Dict[str, int] = {}
+        for sid in card_ids:
+            copies[sid] = copies.get(sid, 0) + 1
+            if copies[sid] > self.max_copies:
+                return False
+            r = CARD_SPECS[sid].get("rarity", "C")
+            rarity[r] = rarity.get(r, 0) + 1
+            if rarity[r] > self.max_rarity.get(r, len(card_ids)):
+                return False
+        return True
+
+
+def neighbours(key: DeckKey, pool: Sequence[str], limits: DeckLimits) -> List[DeckKey]:
+    """1枚の追加・削除・入れ替えで作れる、制約を満たすデッキ（正規形・重複なし）。"""
+    out: Dict[DeckKey, None] = {}
+
+    def consider(md: MasterDeck) -> None:
+        k = canonical(md.card_ids)
+        if k != key and k not in out and limits.allows(k):
+            out[k] = None
+
+    present = sorted(set(key))
+    for sid in pool:
+        md = MasterDeck(key)
+        md.add_card(sid)
+        consider(md)
+    for old in present:
+        md = MasterDeck(key)
+        md.remove_card(old)
+        consider(md)
+        for sid in pool:
+            if sid != old:
+                swapped = MasterDeck(md.card_ids)
+                swapped.add_card(sid)
+                consider(swapped)
+    return list(out)
+
+
+# =========================
+# 適応度キャッシュ
+# =========================
+
+# run_jobs の引数のうち結果に効かないもの
+_NO_EFFECT = frozenset({"workers", "chunk_size"})
+
+
+def sim_params(sim_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """run_jobs に渡す対戦条件を既定値で埋めた比較用の辞書（policy は policy_key）。"""
+    params: Dict[str, Any] = {
+        name: p.default for name, p in inspect.signature(_play_out).parameters.items()
+        if p.kind is p.KEYWORD_ONLY and name not in ("card_stats", "actions")
+    }
+    params.update(master_seed=0, policy=greedy_policy, rng_kind="mt", track_cards=False)
+    params.update((k, v) for k, v in sim_kwargs.items() if k not in _NO_EFFECT)
+    params["policy"] = policy_key(params["policy"])
+    return params
+
+
+class FitnessCache:
+    """
+    正規化したデッキ → これまでに回した分の SimStats（通し番号 0..games-1）。
+    最初の evaluate の対戦条件を sim_params に覚え、別の条件で呼ばれたら ValueError。
+    """
+
+    def __init__(self):
+        self._stats: Dict[DeckKey, SimStats] = {}
+        self.sim_params: Optional[Dict[str, Any]] = None
+
+    def get(self, key: DeckKey) -> SimStats:
+        s = self._stats.get(key)
+        if s is None:
+            s = self._stats[key] = SimStats()
+        return s
+
+    def games(self, key: DeckKey) -> int:
+        s = self._stats.get(key)
+        return s.games if s is not None else 0
+
+    def __contains__(self, key: DeckKey) -> bool:
+        return key in self._stats
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    @property
+    def total_games(self) -> int:
+        return sum(s.games for s in self._stats.values())
+
+    def evaluate(self, keys: Iterable[DeckKey], n_games: int, **sim_kwargs) -> int:
+        """
+        各デッキが少なくとも n_games 戦ぶんの統計を持つように、足りない分だけ回す。
+        sim_kwargs は run_jobs にそのまま渡す（master_seed / workers / policy / 戦闘パラメータ）。
+        戻り値は今回回した戦闘数。
+        """
+        params = sim_params(sim_kwargs)
+        if self.sim_params is None:
+            self.sim_params = params
+        elif params != self.sim_params:
+            diff = sorted(k for k in params.keys() | self.sim_params.keys()
+                          if params.get(k) != self.sim_params.get(k))
+            raise ValueError(f"FitnessCache は別の対戦条件で作られています（{', '.join(diff)}）")
+        jobs = []
+        for i, key in enumerate(dict.fromkeys(keys)):
+            have = self.games(key)
+            if have < n_games:
+                jobs.append(SimJob(str(i), key, n_games - have, first=have))
+        if not jobs:
+            return 0
+        by_label = {job.label: job.card_ids for job in jobs}
+        fresh: Dict[str, SimStats] = {}
+        for label, stats in run_jobs(jobs, **sim_kwargs):
+            fresh[label] = stats
+        for label, stats in fresh.items():
+            self.get(by_label[label]).merge(stats)
+        return sum(job.n_games for job in jobs)
+
+
+# =========================
+# successive halving
+# =========================
+
+def successive_halving(
+    candidates: Sequence[DeckKey],
+    cache: FitnessCache,
+    *,
+    min_games: int = 200,
+    eta: int = 3,
+    max_games: int = 5400,
+    score: Callable[[SimStats], float] = fitness,
+    **sim_kwargs,
+) -> List[Tuple[DeckKey, SimStats]]:
+    """
+    候補を min_games 戦ずつ回し、上位 1/eta を残して戦数を eta 倍…を繰り返す。
+    1つに絞れるか max_games に達したら終わり。
+    戻り値は最後まで残った候補を score の高い順に並べたもの。
+    """
+    alive = list(dict.fromkeys(candidates))
+    n = min_games
+    while True:
+        cache.evaluate(alive, n, **sim_kwargs)
+        alive.sort(key=lambda k: score(cache.get(k)), reverse=True)
+        if len(alive) <= 1 or n >= max_games:
+            break
+        alive = alive[:max(1, math.ceil(len(alive) / eta))]
+        n = min(n * eta, max_games)
+    return [(k, cache.get(k)) for k in alive]
+
+
+# =========================
+# 探索
+# =========================
+
+@dataclass
+class Generation:
+    """1世代ぶんの結果。best はこの世代終了時点の採用デッキ。"""
+    index: int
+    best: DeckKey
+    stats: SimStats
+    improved: bool
+    candidates: int
+    battles: int
+
+
+def optimize(
+    start_ids: Sequence[str],
+    *,
+    pool: Optional[Sequence[str]] = None,
+    limits: DeckLimits = DeckLimits(),
+    generations: int = 20,
+    population: int = 24,
+    patience: int = 3,
+    min_games: int = 200,
+    eta: int = 3,
+    max_games: int = 5400,
+    seed: int = 0,
+    cache: Optional[FitnessCache] = None,
+    score: Callable[[SimStats], float] = fitness,
+    **sim_kwargs,
+) -> Iterator[Generation]:
+    """
+    start_ids から山登りでデッキを改善し、世代ごとに Generation を返す。
+    - 各世代：いまのデッキ＋近傍から population 個を標本 → successive halving で1つに絞る
+    - いまのデッキが勝ち残った世代が patience 回続いたら打ち切り
+    - pool は候補カード（既定は CARD_SPECS 全部）
+    sim_kwargs は run_jobs へ（master_seed / workers / chunk_size / policy / player_hp など）。
+    """
+    pool = list(pool) if pool is not None else list(CARD_SPECS)
+    cache = cache if cache is not None else FitnessCache()
+    rng = random.Random(seed)
+    current = canonical(start_ids)
+    stalled = 0
+
+    for gen in range(generations):
+        near = neighbours(current, pool, limits)
+        sample = rng.sample(near, min(population, len(near)))
+        before = cache.total_games
+        ranked = successive_halving(
+            [current] + sample, cache,
+            min_games=min_games, eta=eta, max_games=max_games, score=score, **sim_kwargs,
+        )
+        best, stats = ranked[0]
+        improved = best != current
+        current = best
+        stalled = 0 if improved else stalled + 1
+        yield Generation(gen, current, stats, improved, len(sample) + 1, cache.total_games - before)
+        if stalled >= patience:
+            return
+
+
+if __name__ == "__main__":
+    import time
+    from starter_decks import make_starter_deck
+
+    ids = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    t0 = time.perf_counter()
+    for g in optimize(ids, generations=5, population=16, min_games=100, max_games=2700,
+                      master_seed=1234, enemy_hp=110):
+        mark = "*" if g.improved else " "
+        print(f"gen {g.index:2d}{mark} win {g.stats.win_rate:6.1%}  turns {g.stats.avg_turns:5.2f}"
+              f"  ({g.stats.games} games, {g.battles} battles this gen)  {' '.join(g.best)}")
+    print(f"{time.perf_counter() - t0:.1f}s")
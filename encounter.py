@@ -0,0 +1,303 @@
+# encounter.py
+"""
+複数の敵との戦闘と連戦（ラン）
+
+- 1戦 = 敵IDの列（N体）。BattleManager に敵と BattleDeck の列を渡す（actors[aid] で管理）
+- 1ラン = data.RUN_SPECS の fights を順に戦う
+    MasterDeck とプレイヤーの HP は戦闘をまたいで持ち越す（バフ・Block・手札は戦闘ごとにリセット）
+    勝つたびに heal だけ回復し、reward のカードを MasterDeck に足す。負けたらそこで終わり
+- 乱数はラン全体で1本（seed で決まる）。各戦の山札はプレイヤー → 敵（aid 順）の順にシャッフル
+- RunStats は「何戦目まで到達したか・そこで何割が勝ったか・残りHP」（難易度曲線）の累積
+    run_runs_parallel で多数のランをプロセスプールで回す（seed は parallel_sim.derive_seed）
+
+    stats = run_runs_parallel(ids, 5000, run="FIRST_CAMPAIGN", policy=greedy_policy)
+    print(format_curve(stats))
+"""
+
+from __future__ import annotations
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from battle import BattleManager
+from battle_deck import BattleDeck
+from data import ENEMY_SPECS, RUN_SPECS
+from enemy_ai import make_enemy
+from master_deck import MasterDeck
+from model import CardInstance, Enemy, Player
+from parallel_sim import derive_seed
+from rng import BattleRNG, make_rng
+from simulate import GameResult, Policy, greedy_policy, play_battle
+
+DEFAULT_RUN = "FIRST_CAMPAIGN"
+
+
+# =========================
+# 1戦（N体）
+# =========================
+
+def make_enemies(
+    enemy_ids: Sequence[str],
+    rng: Optional[BattleRNG] = None,
+    *,
+    hp: Optional[int] = None,
+) -> Tuple[List[Enemy], List[BattleDeck]]:
+    """敵の列とその BattleDeck の列。同じ種類が複数いるときは表示名に A, B, ... を付ける。"""
+    dup = Counter(enemy_ids)
+    seen: Dict[str, int] = {}
+    enemies: List[Enemy] = []
+    decks: List[BattleDeck] = []
+    for eid in enemy_ids:
+        name = None
+        if dup[eid] > 1:
+            k = seen[eid] = seen.get(eid, 0) + 1
+            name = ENEMY_SPECS[eid].get("name", eid) + chr(ord("A") + k - 1)
+        e, d = make_enemy(eid, rng, hp=hp, name=name)
+        enemies.append(e)
+        decks.append(d)
+    return enemies, decks
+
+
+def make_battle(
+    player: Player,
+    cards: List[CardInstance],
+    enemy_ids: Sequence[str],
+    rng: BattleRNG,
+    *,
+    max_energy: int = 3,
+    hand_size: int = 5,
+) -> BattleManager:
+    """プレイヤー（HP はそのまま）と敵 N 体の BattleManager。プレイヤーの山札を先にシャッフルする。"""
+    pdeck = BattleDeck(cards, rng)
+    enemies, edecks = make_enemies(enemy_ids, rng)
+    return BattleManager(player, enemies, pdeck, edecks,
+                         max_energy=max_energy, hand_size=hand_size, rng=rng)
+
+
+# =========================
+# 連戦
+# =========================
+
+class RunResult(NamedTuple):
+    """1ランぶんの結果。fights は戦った戦闘だけ（負けた戦闘が最後）。"""
+    seed: int
+    cleared: bool
+    fights: Tuple[GameResult, ...]
+    hp_before: Tuple[int, ...]      # 各戦の開始時のHP
+    player_hp: int
+    card_ids: Tuple[str, ...]       # 終了時の MasterDeck
+
+    @property
+    def fights_won(self) -> int:
+        return sum(1 for r in self.fights if r.winner == "player")
+
+
+def run_encounter(
+    card_ids: Sequence[str],
+    seed: int,
+    policy: Policy = greedy_policy,
+    rng: Optional[BattleRNG] = None,
+    *,
+    run: str = DEFAULT_RUN,
+    player_hp: int = 40,
+    max_energy: int = 3,
+    hand_size: int = 5,
+    max_turns: int = 100,
+    rng_kind: str = "mt",
+) -> RunResult:
+    """
+    RUN_SPECS[run] を最初から最後まで（負けるまで）回す。ログなし。
+    rng を渡すと seed で張り直して使い回す（run_batch_runs 用）。
+    """
+    spec = RUN_SPECS[run]
+    if rng is None:
+        rng = make_rng(seed, rng_kind)
+    else:
+        rng.seed(seed)
+    master = MasterDeck(card_ids)
+    player = Player("player", max_hp=player_hp)
+    heal = spec.get("heal", 0)
+    fights: List[GameResult] = []
+    hp_before: List[int] = []
+    for fight in spec["fights"]:
+        player.block = 0
+        player.buffs.clear()
+        hp_before.append(player.hp)
+        bm = make_battle(player, master.instantiate(), fight["enemies"], rng,
+                         max_energy=max_energy, hand_size=hand_size)
+        bm.logger = None
+        r = play_battle(bm, seed, policy, max_turns=max_turns)
+        fights.append(r)
+        if r.winner != "player":
+            break
+        player.hp = min(player.max_hp, player.hp + heal)
+        for sid in fight.get("reward", ()):
+            master.add_card(sid)
+    cleared = len(fights) == len(spec["fights"]) and fights[-1].winner == "player"
+    return RunResult(seed, cleared, tuple(fights), tuple(hp_before), player.hp, tuple(master.card_ids))
+
+
+def run_batch_runs(
+    card_ids: Sequence[str],
+    seeds: Iterable[int],
+    policy: Policy = greedy_policy,
+    *,
+    rng_kind: str = "mt",
+    **kwargs,
+) -> Iterator[RunResult]:
+    """seed ごとに1ランずつ回して結果を順に返す。"""
+    rng = make_rng(0, rng_kind)
+    for seed in seeds:
+        yield run_encounter(card_ids, seed, policy, rng, **kwargs)
+
+
+# =========================
+# 難易度曲線
+# =========================
+
+@dataclass
+class RunStats:
+    """
+    ランの累積。fight ごとの配列は「i 戦目」で引く（merge は足し算だけなので順序に依存しない）。
+        reached[i]  : i 戦目に到達したラン数
+        wins[i]     : i 戦目に勝ったラン数
+        turns[i]    : i 戦目のターン数の合計
+        hp_in[i]    : i 戦目の開始時HPの合計
+        hp_out[i]   : i 戦目に勝ったときの残りHPの合計
+    """
+    run: str = DEFAULT_RUN
+    runs: int = 0
+    clears: int = 0
+    reached: List[int] = field(default_factory=list)
+    wins: List[int] = field(default_factory=list)
+    turns: List[int] = field(default_factory=list)
+    hp_in: List[int] = field(default_factory=list)
+    hp_out: List[int] = field(default_factory=list)
+
+    def _grow(self, n: int) -> None:
+        for arr in (self.reached, self.wins, self.turns, self.hp_in, self.hp_out):
+            if len(arr) < n:
+                arr.extend([0] * (n - len(arr)))
+
+    def add(self, r: RunResult) -> None:
+        self.runs += 1
+        self.clears += r.cleared
+        self._grow(len(r.fights))
+        for i, (g, hp0) in enumerate(zip(r.fights, r.hp_before)):
+            self.reached[i] += 1
+            self.turns[i] += g.turns
+            self.hp_in[i] += hp0
+            if g.winner == "player":
+                self.wins[i] += 1
+                self.hp_out[i] += g.player_hp
+
+    def merge(self, other: "RunStats") -> None:
+        self.runs += other.runs
+        self.clears += other.clears
+        self._grow(len(other.reached))
+        for mine, theirs in ((self.reached, other.reached), (self.wins, other.wins),
+                             (self.turns, other.turns), (self.hp_in, other.hp_in),
+                             (self.hp_out, other.hp_out)):
+            for i, v in enumerate(theirs):
+                mine[i] += v
+
+    @property
+    def clear_rate(self) -> float:
+        return self.clears / self.runs if self.runs else 0.0
+
+    def curve(self) -> List[Dict[str, float]]:
+        """戦闘ごとの 到達率・（到達した中での）勝率・平均ターン・開始時/勝利時の平均HP。"""
+        rows = []
+        for i, n in enumerate(self.reached):
+            w = self.wins[i]
+            rows.append({
+                "fight": i + 1,
+                "reach_rate": n / self.runs if self.runs else 0.0,
+                "win_rate": w / n if n else 0.0,
+                "avg_turns": self.turns[i] / n if n else 0.0,
+                "avg_hp_in": self.hp_in[i] / n if n else 0.0,
+                "avg_hp_out": self.hp_out[i] / w if w else 0.0,
+            })
+        return rows
+
+
+def format_curve(stats: RunStats) -> str:
+    fights = RUN_SPECS[stats.run]["fights"]
+    lines = [
+        f"{RUN_SPECS[stats.run].get('name', stats.run)}: clear {stats.clear_rate:6.1%}  ({stats.runs} runs)",
+        f"{'#':>2} {'reach':>7} {'win':>7} {'turns':>6} {'HP in':>6} {'HP out':>7}  enemies",
+    ]
+    for row, fight in zip(stats.curve(), fights):
+        lines.append(
+            f"{row['fight']:>2} {row['reach_rate']:7.1%} {row['win_rate']:7.1%} {row['avg_turns']:6.2f} "
+            f"{row['avg_hp_in']:6.1f} {row['avg_hp_out']:7.1f}  {', '.join(fight['enemies'])}"
+        )
+    return "\n".join(lines)
+
+
+# =========================
+# 並列実行
+# =========================
+
+def _run_runs_chunk(
+    card_ids: Tuple[str, ...],
+    master_seed: int,
+    start: int,
+    count: int,
+    policy: Policy,
+    rng_kind: str,
+    run_kwargs: Dict,
+) -> RunStats:
+    rng = make_rng(0, rng_kind)
+    stats = RunStats(run_kwargs.get("run", DEFAULT_RUN))
+    for i in range(start, start + count):
+        stats.add(run_encounter(card_ids, derive_seed(master_seed, i), policy, rng, **run_kwargs))
+    return stats
+
+
+def run_runs_parallel(
+    card_ids: Sequence[str],
+    n_runs: int,
+    *,
+    master_seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = 500,
+    policy: Policy = greedy_policy,
+    rng_kind: str = "mt",
+    **run_kwargs,
+) -> RunStats:
+    """
+    n_runs ランをチャンクに分けてプロセスプールで回す。run_kwargs は run_encounter へ（run / player_hp など）。
+    seed は通し番号から決めるので、ワーカー数に関係なく結果は同じ。
+    """
+    ids = tuple(card_ids)
+    total = RunStats(run_kwargs.get("run", DEFAULT_RUN))
+    chunks = [(s, min(chunk_size, n_runs - s)) for s in range(0, n_runs, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for start, count in chunks:
+            total.merge(_run_runs_chunk(ids, master_seed, start, count, policy, rng_kind, run_kwargs))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(_run_runs_chunk, ids, master_seed, start, count, policy, rng_kind, run_kwargs)
+                   for start, count in chunks]
+        for fut in as_completed(futures):
+            total.merge(fut.result())
+    return total
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from starter_decks import make_starter_deck
+
+    ids = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    run = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_RUN
+    n = 2000
+    t0 = time.perf_counter()
+    stats = run_runs_parallel(ids, n, run=run, master_seed=1234)
+    dt = time.perf_counter() - t0
+    print(format_curve(stats))
+    print(f"{n} runs in {dt:.2f}s")
@@ -0,0 +1,172 @@
+# enemy_ai.py
+"""
+敵の行動（data.ENEMY_SPECS → コンパイル済みの行動表）
+
+- intent 1つを「カード1枚」と同じ形（CardInstance + compile_ops のプラン）にしておき、
+  BattleManager.enemy_act は apply_card_effect で実行するだけ（カードを出すのと同じコスト）
+- weighted : 累積重みの表 cum と合計 total を持ち、rng.randrange(total) 1回 + bisect で選ぶ
+             重みがすべて1なら旧 enemy_act の rng.choice と同じ乱数の引き方になる
+- pattern  : Enemy.turn_index で pattern を順に（末尾まで行ったら先頭へ）。乱数は使わない
+- deck     : 敵の BattleDeck（edeck）の手札の先頭から plays 枚出して、引き直す
+コンパイルは import 時に1回（ENEMY_PLANS）。ENEMY_SPECS を書き換えたら compile_all_enemies()。
+
+    enemy, edeck = make_enemy("SAMURAI_SCRIPTED", rng)
+    bm = BattleManager(player, enemy, pdeck, edeck, rng=rng)
+"""
+
+from __future__ import annotations
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from battle_deck import BattleDeck
+from card_effects import _op_attack, compile_ops
+from data import ENEMY_SPECS
+from master_deck import MasterDeck
+from model import CardInstance, Enemy
+from rng import BattleRNG
+
+DEFAULT_ENEMY = "DEFAULT"
+
+MODE_WEIGHTED = "weighted"
+MODE_PATTERN = "pattern"
+MODE_DECK = "deck"
+MODES: Tuple[str, ...] = (MODE_WEIGHTED, MODE_PATTERN, MODE_DECK)
+
+
+class EnemyPlan:
+    """1種類の敵のコンパイル済み行動表。"""
+
+    __slots__ = ("enemy_id", "name", "hp", "mode", "intents", "cum", "total", "pattern", "deck", "plays")
+
+    def __init__(self, enemy_id: str, spec: Dict[str, Any]):
+        mode = spec.get("mode", MODE_WEIGHTED)
+        if mode not in MODES:
+            raise ValueError(f"{enemy_id}: 未知の mode {mode!r}")
+        self.enemy_id = enemy_id
+        self.name: str = spec.get("name", enemy_id)
+        self.hp: int = spec.get("hp", 35)
+        self.mode = mode
+
+        ids = list(spec.get("intents", {}))
+        intents: List[CardInstance] = []
+        cum: List[int] = []
+        total = 0
+        for iid in ids:
+            ispec = spec["intents"][iid]
+            intents.append(CardInstance(
+                intent_spec_id(enemy_id, iid), 0, 0, "intent", plan=compile_ops(ispec.get("ops", [])),
+            ))
+            total += int(ispec.get("weight", 1))
+            cum.append(total)
+        self.intents: Tuple[CardInstance, ...] = tuple(intents)
+        self.cum: Tuple[int, ...] = tuple(cum)
+        self.total = total
+        self.pattern: Tuple[int, ...] = tuple(ids.index(iid) for iid in spec.get("pattern", ()))
+        self.deck: Tuple[str, ...] = tuple(spec.get("deck", ()))
+        self.plays: int = spec.get("plays", 1)
+
+        if mode == MODE_WEIGHTED and total <= 0:
+            raise ValueError(f"{enemy_id}: weighted には重み付きの intents が必要です")
+        if mode == MODE_PATTERN and not self.pattern:
+            raise ValueError(f"{enemy_id}: pattern が空です")
+        if mode == MODE_DECK and not self.deck:
+            raise ValueError(f"{enemy_id}: deck が空です")
+
+    def choose(self, enemy: Any, rng: BattleRNG) -> CardInstance:
+        """weighted / pattern の次の行動。"""
+        if self.mode == MODE_PATTERN:
+            return self.intents[self.pattern[enemy.turn_index % len(self.pattern)]]
+        return self.intents[bisect_right(self.cum, rng.randrange(self.total))]
+
+    def weights(self) -> Tuple[int, ...]:
+        prev = 0
+        out = []
+        for c in self.cum:
+            out.append(c - prev)
+            prev = c
+        return tuple(out)
+
+    def __repr__(self) -> str:
+        return f"EnemyPlan({self.enemy_id!r}, mode={self.mode}, intents={len(self.intents)})"
+
+
+def intent_spec_id(enemy_id: str, intent_id: str) -> str:
+    """intent の CardInstance に付ける spec_id（events の表示名の引き先にもなる）。"""
+    return f"{enemy_id}.{intent_id}"
+
+
+# enemy_id -> EnemyPlan（import 時に全種類コンパイル）
+ENEMY_PLANS: Dict[str, EnemyPlan] = {}
+
+
+def compile_all_enemies() -> None:
+    ENEMY_PLANS.clear()
+    for eid, spec in ENEMY_SPECS.items():
+        ENEMY_PLANS[eid] = EnemyPlan(eid, spec)
+
+
+def get_enemy_plan(enemy_id: str) -> EnemyPlan:
+    plan = ENEMY_PLANS.get(enemy_id)
+    if plan is None:
+        plan = ENEMY_PLANS[enemy_id] = EnemyPlan(enemy_id, ENEMY_SPECS[enemy_id])
+    return plan
+
+
+compile_all_enemies()
+
+
+def make_enemy(
+    enemy_id: str = DEFAULT_ENEMY,
+    rng: Optional[BattleRNG] = None,
+    *,
+    hp: Optional[int] = None,
+    name: Optional[str] = None,
+) -> Tuple[Enemy, BattleDeck]:
+    """
+    敵とその BattleDeck を作る。deck 型以外の敵の山札は空。
+    hp / name を省略すると spec の値。rng は BattleManager と共有するもの
+    （プレイヤーの BattleDeck を作ったあとに呼ぶこと。deck 型はここでシャッフルする）。
+    """
+    plan = get_enemy_plan(enemy_id)
+    enemy = Enemy(name if name is not None else plan.name,
+                  max_hp=hp if hp is not None else plan.hp, spec_id=enemy_id)
+    cards = MasterDeck(plan.deck).instantiate() if plan.deck else []
+    return enemy, BattleDeck(cards, rng)
+
+
+# =========================
+# AI・ソルバー向けの見積もり
+# =========================
+
+def attack_hits(card: CardInstance) -> Tuple[int, ...]:
+    """プランの attack の素のダメージ列（補正前）。"""
+    return tuple(int(step.args[0]) for step in card.plan if getattr(step, "func", None) is _op_attack)
+
+
+def enemy_threats(plan: EnemyPlan, enemy: Any, deck: Optional[BattleDeck] = None) -> Tuple[Tuple[Tuple[int, ...], int], ...]:
+    """
+    敵1体の次の行動候補 ((ダメージ列), 重み) の一覧。
+    pattern は次の1つだけ、deck は手札の先頭から plays 枚を1つにまとめたもの。
+    """
+    if plan.mode == MODE_PATTERN:
+        return ((attack_hits(plan.choose(enemy, None)), 1),)
+    if plan.mode == MODE_DECK:
+        hits: Tuple[int, ...] = ()
+        for c in (deck.hand[:plan.plays] if deck is not None else ()):
+            hits += attack_hits(c)
+        return ((hits, 1),)
+    return tuple((attack_hits(c), w) for c, w in zip(plan.intents, plan.weights()))
+
+
+def next_threats(bm: Any) -> Tuple[Tuple[Tuple[int, ...], int], ...]:
+    """
+    敵の次のターンの行動候補 ((ダメージ列), 重み) の一覧。
+    生きている敵が複数いるときは aid 順に連結した組み合わせ（重みは積）。
+    """
+    out: Tuple[Tuple[Tuple[int, ...], int], ...] = (((), 1),)
+    for e in bm.enemies:
+        if e.hp <= 0:
+            continue
+        mine = enemy_threats(bm.plans[e.aid], e, bm.decks[e.aid])
+        out = tuple((hits + h, w * v) for hits, w in out for h, v in mine)
+    return out
@@ -0,0 +1,244 @@
+# events.py
+"""
+戦闘イベントの構造化ストリーム
+
+エンジン側は文字列を作らず、小さなタプルを emit するだけ：
+    (イベント種別, actor, 量, spec_id, ...種別ごとの追加情報)
+
+- 誰も購読していない（記録なし・sink なし・text なし）ときは bm.events.on が False。
+  エンジン側は `if ev.on:` で囲むので、タプル生成も文字列整形もしない。
+- record=True で events リストに溜める（リプレイ・解析用）
+- subscribe(sink) で構造化イベントをそのまま受け取る
+- text_sink（BattleManager.logger）を設定したときだけ render_event で日本語ログに整形
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from data import CARD_SPECS, ENEMY_SPECS
+from model import BuffKind
+
+Event = Tuple[Any, ...]
+EventSink = Callable[[Event], None]
+
+# ---- イベント種別 ----
+EV_BATTLE_START = 1     # (_, player, 0, None, enemy)
+EV_TURN_START = 2       # (_, None, turn, None)
+EV_TURN_END = 3         # (_, None, turn, None)
+EV_ATTACK = 4           # (_, user, dealt, spec_id, target)
+EV_BLOCK = 5            # (_, user, gain, spec_id, block_total)
+EV_SKILL = 6            # (_, user, 0, spec_id)
+EV_BUFF = 7             # (_, 付与先, power, spec_id, kind(BuffKind), turns)
+EV_BUFF_PROC = 8        # (_, バフ持ち主, power, None, kind(BuffKind), 追加情報)
+EV_TEMP_BUFF = 9        # (_, actor, value, None, name, duration)
+EV_TEMP_BUFF_END = 10   # (_, actor, 0, None, name)
+EV_ENEMY_ATTACK = 11    # (_, enemy, dealt, None, target)       ※旧 enemy_act（記録済みログの表示用）
+EV_ENEMY_MULTI = 12     # (_, enemy, total, None, target)       ※同上
+EV_ENEMY_DEFEND = 13    # (_, enemy, gain, None, block_total)   ※同上
+EV_UNKNOWN_OP = 14      # (_, user, 0, spec_id, op_name)
+EV_ENEMY_INTENT = 15    # (_, enemy, turn_index, intent/カードの spec_id)
+
+
+class EventLog:
+    """1戦ぶんのイベントの出口。"""
+
+    __slots__ = ("on", "record", "events", "sinks", "text_sink", "_span")
+
+    def __init__(self, record: bool = False):
+        self.record = record
+        self.events: List[Event] = []
+        self.sinks: List[EventSink] = []
+        self.text_sink: Optional[Callable[[str], Any]] = None
+        self._span: Optional[List[Event]] = None
+        self.on = False
+        self._update()
+
+    def _update(self) -> None:
+        self.on = self.record or bool(self.sinks) or self.text_sink is not None
+
+    # ---- 設定 ----
+    def set_record(self, record: bool) -> None:
+        self.record = record
+        self._update()
+
+    def set_text_sink(self, sink: Optional[Callable[[str], Any]]) -> None:
+        self.text_sink = sink
+        self._update()
+
+    def subscribe(self, sink: EventSink) -> None:
+        self.sinks.append(sink)
+        self._update()
+
+    def unsubscribe(self, sink: EventSink) -> None:
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+        self._update()
+
+    # ---- 発行 ----
+    def emit(self, ev: Event) -> None:
+        if self.record:
+            self.events.append(ev)
+        if self._span is not None:
+            self._span.append(ev)
+        elif self.text_sink is not None:
+            self.text_sink(render_event(ev))
+        for sink in self.sinks:
+            sink(ev)
+
+    # ---- 行動単位のまとめ ----
+    # カード使用・敵行動のイベントは text_sink に流さず、終了時に " / " 連結して呼び出し元に返す
+    def begin_span(self) -> None:
+        if self.text_sink is not None:
+            self._span = []
+
+    def end_span(self) -> str:
+        span = self._span
+        if span is None:
+            return ""
+        self._span = None
+        return " / ".join(render_event(ev) for ev in span)
+
+
+# =========================
+# テキスト整形（購読されたときだけ呼ばれる）
+# =========================
+
+def _name(x: Any) -> str:
+    return getattr(x, "name", str(x))
+
+
+def _card_name(spec_id: Optional[str]) -> str:
+    if spec_id is None:
+        return ""
+    spec = CARD_SPECS.get(spec_id)
+    if spec is None and "." in spec_id:
+        # 敵の intent（"敵ID.intentID"）
+        eid, iid = spec_id.split(".", 1)
+        spec = ENEMY_SPECS.get(eid, {}).get("intents", {}).get(iid)
+    return (spec or {}).get("name", spec_id)
+
+
+# バフ付与（EV_BUFF）の文言。{actor}=付与先 {power} {turns}
+BUFF_TEXT: Dict[int, str] = {
+    BuffKind.WEAK: "{actor} に弱体{power}（{turns}T）",
+    BuffKind.COUNTER: "{actor} は反撃+{power}（{turns}T）",
+    BuffKind.FORM_WALL: "{actor} は陣形『堅壁』を展開（{turns}T）",
+    BuffKind.FORM_DEF_BOOST: "{actor} は陣形『防御効率化』を展開（{turns}T）",
+    BuffKind.FORM_WEAK_STACK: "{actor} は陣形『弱体蓄積』を展開（{turns}T）",
+    BuffKind.FORM_DRAW: "{actor} は陣形『散兵隊』を展開（{turns}T）",
+    BuffKind.FORM_COUNTER_STACK: "{actor} は陣形『反撃陣』を展開（{turns}T）",
+    BuffKind.TRIG_ATTACK_COUNTER: "{actor} は反撃姿勢を取った（このターン攻撃で反撃+{power}）",
+    BuffKind.TRIG_DEF_COUNTER: "{actor} は攻防一体を発動（このターン防御で反撃+{power}）",
+    BuffKind.TRIG_SKILL_DRAW: "{actor} は一斉号令を発した（このターンスキルでドロー+{power}）",
+    BuffKind.TRIG_ANY_COUNTER: "{actor} は士気高揚した（このターンカード使用で反撃+{power}）",
+    BuffKind.TRIG_BLOCK_RECOVER: "{actor} は節度ある陣形操作を行った（このターンBlock消費毎にBlock+{power}）",
+}
+
+# バフ発動（EV_BUFF_PROC）の文言。{actor}=持ち主 {power} {extra}=種別ごとの追加情報
+BUFF_PROC_TEXT: Dict[int, str] = {
+    BuffKind.FORM_WALL: "{actor} の堅壁 → Block+{power}（合計 {extra}）",
+    BuffKind.FORM_WEAK_STACK: "{actor} の弱体蓄積 → {extra} に弱体+{power}",
+    BuffKind.FORM_DRAW: "{actor} の散兵隊 → カード+{power}枚",
+    BuffKind.FORM_COUNTER_STACK: "{actor} の反撃陣 → 反撃+{power}",
+    BuffKind.TRIG_ATTACK_COUNTER: "{actor} の反撃姿勢 → 反撃+{power}",
+    BuffKind.TRIG_DEF_COUNTER: "{actor} の攻防一体 → 反撃+{power}",
+    BuffKind.TRIG_SKILL_DRAW: "{actor} の一斉号令 → カード+{power}枚",
+    BuffKind.TRIG_ANY_COUNTER: "{actor} の士気高揚 → 反撃+{power}",
+    BuffKind.COUNTER: "{actor} の反撃 → {extra} に {power} ダメージ",
+    BuffKind.TRIG_BLOCK_RECOVER: "{actor} の節度ある陣形操作 → Block+{power}（合計 {extra}）",
+}
+
+
+def _r_battle_start(ev: Event) -> str:
+    return f"=== ⚔️  戦闘開始: {_name(ev[1])} vs {_name(ev[4])} ==="
+
+
+def _r_turn_start(ev: Event) -> str:
+    return f"\n=== 🧭 ターン {ev[2]} 開始 ==="
+
+
+def _r_turn_end(ev: Event) -> str:
+    return f"=== 🔚 ターン {ev[2]} 終了 ==="
+
+
+def _r_attack(ev: Event) -> str:
+    return f"{_name(ev[1])} の{_card_name(ev[3])} → {_name(ev[4])} に {ev[2]} ダメージ"
+
+
+def _r_block(ev: Event) -> str:
+    return f"{_name(ev[1])} の{_card_name(ev[3])} → Block+{ev[2]}（合計 {ev[4]}）"
+
+
+def _r_skill(ev: Event) -> str:
+    return f"{_name(ev[1])} は{_card_name(ev[3])}を使用した。"
+
+
+def _kind_name(kind: int) -> str:
+    try:
+        return BuffKind(kind).name
+    except ValueError:
+        return str(kind)
+
+
+def _r_buff(ev: Event) -> str:
+    kind = ev[4]
+    tmpl = BUFF_TEXT.get(kind, "{actor} に{kind}+{power}（{turns}T）")
+    return tmpl.format(actor=_name(ev[1]), power=ev[2], turns=ev[5], kind=_kind_name(kind))
+
+
+def _r_buff_proc(ev: Event) -> str:
+    kind = ev[4]
+    tmpl = BUFF_PROC_TEXT.get(kind, "{actor} の{kind} → {power}")
+    return tmpl.format(actor=_name(ev[1]), power=ev[2], extra=_name(ev[5]), kind=_kind_name(kind))
+
+
+def _r_temp_buff(ev: Event) -> str:
+    return f"🟢 {_name(ev[1])} に {ev[4]}+{ev[2]}（{ev[5]}T）"
+
+
+def _r_temp_buff_end(ev: Event) -> str:
+    return f"⚪️ {_name(ev[1])} の {ev[4]} が切れた"
+
+
+def _r_enemy_attack(ev: Event) -> str:
+    return f"▶ {_name(ev[1])} の攻撃 → {_name(ev[4])} に {ev[2]} ダメージ"
+
+
+def _r_enemy_multi(ev: Event) -> str:
+    return f"▶ {_name(ev[1])} の連続攻撃 → {_name(ev[4])} に 合計 {ev[2]} ダメージ"
+
+
+def _r_enemy_defend(ev: Event) -> str:
+    return f"▶ {_name(ev[1])} は防御を固めた → Block+{ev[2]}（合計 {ev[4]}）"
+
+
+def _r_enemy_intent(ev: Event) -> str:
+    return f"▶ {_name(ev[1])}: {_card_name(ev[3])}"
+
+
+def _r_unknown_op(ev: Event) -> str:
+    return f"[DEBUG] 未実装の op: {ev[4]}"
+
+
+RENDERERS: Dict[int, Callable[[Event], str]] = {
+    EV_BATTLE_START: _r_battle_start,
+    EV_TURN_START: _r_turn_start,
+    EV_TURN_END: _r_turn_end,
+    EV_ATTACK: _r_attack,
+    EV_BLOCK: _r_block,
+    EV_SKILL: _r_skill,
+    EV_BUFF: _r_buff,
+    EV_BUFF_PROC: _r_buff_proc,
+    EV_TEMP_BUFF: _r_temp_buff,
+    EV_TEMP_BUFF_END: _r_temp_buff_end,
+    EV_ENEMY_ATTACK: _r_enemy_attack,
+    EV_ENEMY_MULTI: _r_enemy_multi,
+    EV_ENEMY_DEFEND: _r_enemy_defend,
+    EV_UNKNOWN_OP: _r_unknown_op,
+    EV_ENEMY_INTENT: _r_enemy_intent,
+}
+
+
+def render_event(ev: Event) -> str:
+    r = RENDERERS.get(ev[0])
+    return r(ev) if r is not None else repr(ev)
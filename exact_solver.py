@@ -0,0 +1,425 @@
+# exact_solver.py
+"""
+厳密な勝率ソルバー（小さいデッキ用）
+
+プレイヤーが最善を尽くしたときの勝率を、シャッフルと enemy_act の乱数について
+期待値をとって厳密に求める（expectimax）。
+
+- 局面は正規化して扱う：手札・山札・捨て札は spec_id の多重集合（枚数ベクトル）
+  → 山札の並びはプレイヤーから見えないので、「山札から1枚引く」は残り枚数に比例した確率分岐になる
+- プレイヤーの手番：出せるカードを spec_id 単位で1回ずつ試すか、ターン終了（max）
+- ターン終了後：敵の行動（weighted 型は intent ごとに重みの確率で分岐、pattern 型は1通り）
+  → start_turn → 手札補充の引き方（多変量超幾何分布）
+- カード効果・バフ・敵の行動そのものは BattleManager をそのまま使う（snapshot/restore で行き来）
+- 値は転置表（LRU・メモリ上限つき）にメモ化する。キーは bm から直接作り、
+  表に無かったときだけ snapshot を取る
+- カードを出す手から先に調べ、勝ち確定（1.0）が見つかればターン終了側は展開しない
+- max_turns を超えたら負け扱い（タイムアウト）
+
+ターン中にカードを引く効果（散兵隊・一斉号令）はプレイ中の引き方まで分岐させないと
+厳密にならないので対象外（ValueError）。山札を持つ deck 型の敵も同じ理由で対象外。
+敵の intent は mini ops（OPS_TABLE の op。乱数もドローも使わない）だけでできたものに限る。
+
+    solver = ExactSolver(ids)
+    p = solver.solve()
+    print(p, solver.report())
+"""
+
+from __future__ import annotations
+import sys
+from collections import OrderedDict
+from functools import lru_cache
+from math import comb
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from battle import BattleManager
+from battle_deck import BattleDeck
+from battle_state import BattleState, _buff_key
+from card_effects import OPS_TABLE, _step_add_buff
+from card_table import card_for
+from enemy_ai import DEFAULT_ENEMY, MODE_DECK, MODE_PATTERN, get_enemy_plan, make_enemy
+from events import EventLog
+from model import BuffKind, CardInstance, Player
+
+# ターン中にカードを引くバフ（これを付けるカードは扱わない）
+DRAW_KINDS = frozenset({int(BuffKind.FORM_DRAW), int(BuffKind.TRIG_SKILL_DRAW)})
+
+Counts = Tuple[int, ...]
+StateKey = Tuple
+
+
+# =========================
+# 転置表（LRU・メモリ上限）
+# =========================
+
+def _approx_size(key: StateKey) -> int:
+    """転置表1エントリぶんのおおよそのバイト数（キーのタプル＋中身のタプル＋辞書の枠）。"""
+    n = sys.getsizeof(key) + 120
+    for x in key:
+        if x.__class__ is tuple:
+            n += sys.getsizeof(x)
+    return n
+
+
+class LRUTable:
+    """局面キー → 値。max_bytes を超えたら最も古く使われたものから捨てる。"""
+
+    __slots__ = ("max_bytes", "bytes", "_data", "hits", "misses", "evictions")
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data: "OrderedDict[StateKey, Tuple[float, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: StateKey) -> Optional[float]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return item[0]
+
+    def put(self, key: StateKey, value: float) -> None:
+        size = _approx_size(key)
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._data[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self._data:
+            _, (_, s) = self._data.popitem(last=False)
+            self.bytes -= s
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# =========================
+# 引き方の分岐
+# =========================
+
+@lru_cache(maxsize=None)
+def _subsets(pile: Counts, k: int) -> Tuple[Tuple[float, Counts], ...]:
+    """枚数ベクトル pile から k 枚引く引き方と確率（多変量超幾何分布）。"""
+    total = comb(sum(pile), k)
+    out: List[Tuple[float, Counts]] = []
+
+    def rec(i: int, left: int, acc: List[int], ways: int) -> None:
+        if i == len(pile):
+            if left == 0:
+                out.append((ways / total, tuple(acc)))
+            return
+        for x in range(min(pile[i], left) + 1):
+            acc.append(x)
+            rec(i + 1, left - x, acc, ways * comb(pile[i], x))
+            acc.pop()
+
+    rec(0, k, [], 1)
+    return tuple(out)
+
+
+def _sub(a: Counts, b: Counts) -> Counts:
+    return tuple(x - y for x, y in zip(a, b))
+
+
+def _add(a: Counts, b: Counts) -> Counts:
+    return tuple(x + y for x, y in zip(a, b))
+
+
+@lru_cache(maxsize=None)
+def draw_outcomes(draw: Counts, disc: Counts, k: int) -> Tuple[Tuple[float, Counts, Counts, Counts], ...]:
+    """
+    k 枚引いたときの (確率, 引いた枚数ベクトル, 残りの山札, 残りの捨て札) の一覧。
+    BattleDeck.draw と同じく、山札が尽きたら捨て札を山札に戻してから続きを引く。
+    """
+    m = sum(draw)
+    if k <= m:
+        return tuple((p, x, _sub(draw, x), disc) for p, x in _subsets(draw, k))
+    # 山札は全部引き、残りを捨て札（を混ぜ直した山札）から引く
+    rest = min(k - m, sum(disc))
+    empty = tuple(0 for _ in draw)
+    return tuple(
+        (p, _add(draw, x), _sub(disc, x), empty) for p, x in _subsets(disc, rest)
+    )
+
+
+# =========================
+# 本体
+# =========================
+
+class _FixedChoice:
+    """enemy_act の抽選（rng.randrange(重み合計)）を指定の値に固定する（分岐を列挙するため）。"""
+    __slots__ = ("index",)
+
+    def __init__(self, index: int = 0):
+        self.index = index
+
+    def randrange(self, n: int) -> int:
+        return self.index
+
+    def choice(self, seq):
+        return seq[self.index]
+
+
+# 敵の intent に使ってよい op（どれも乱数・ドローを使わない）
+SOLVABLE_OPS = frozenset(OPS_TABLE.values())
+
+
+def solvable_enemy(enemy_id: str) -> bool:
+    """weighted / pattern 型で、intent が SOLVABLE_OPS だけでできていれば True。"""
+    plan = get_enemy_plan(enemy_id)
+    if plan.mode == MODE_DECK:
+        return False
+    return all(getattr(step, "func", None) in SOLVABLE_OPS
+               for intent in plan.intents for step in intent.plan)
+
+
+def solvable(card_ids: Sequence[str]) -> bool:
+    """ターン中にカードを引く効果を含まなければ True。"""
+    for sid in set(card_ids):
+        for step in card_for(sid).plan:
+            if getattr(step, "func", None) is _step_add_buff and step.args[1] in DRAW_KINDS:
+                return False
+    return True
+
+
+class ExactSolver:
+    """
+    1デッキぶんの厳密勝率。同じソルバーで solve() を何度呼んでも転置表を使い回す。
+
+    - max_turns : これを超えたら負け（タイムアウト）
+    - max_mb    : 転置表のメモリ上限（おおよそ）
+    """
+
+    def __init__(
+        self,
+        card_ids: Sequence[str],
+        *,
+        player_hp: int = 40,
+        enemy_hp: int = 35,
+        max_energy: int = 3,
+        hand_size: int = 5,
+        max_turns: int = 30,
+        enemy: str = DEFAULT_ENEMY,
+        max_mb: float = 256.0,
+    ):
+        if not solvable(card_ids):
+            raise ValueError("ターン中にカードを引く効果を含むデッキは厳密解の対象外です")
+        self.card_ids = list(card_ids)
+        self.specs: List[str] = sorted(set(card_ids), key=self.card_ids.index)
+        self.index: Dict[str, int] = {sid: i for i, sid in enumerate(self.specs)}
+        self.cards: List[CardInstance] = [card_for(sid) for sid in self.specs]
+        self.player_hp = player_hp
+        self.enemy_hp = enemy_hp
+        self.max_energy = max_energy
+        self.hand_size = hand_size
+        self.max_turns = max_turns
+        self.table = LRUTable(int(max_mb * 1024 * 1024))
+        self.nodes = 0
+
+        plan = get_enemy_plan(enemy)
+        if not solvable_enemy(enemy):
+            raise ValueError(f"{enemy}: deck 型・未知の op を含む敵は厳密解の対象外です")
+        self._enemy_rng = _FixedChoice()
+        foe, edeck = make_enemy(enemy, hp=enemy_hp, name="enemy")   # 山札は空
+        self.bm = BattleManager(
+            Player("player", max_hp=player_hp), foe,
+            BattleDeck([]), edeck,
+            max_energy=max_energy, hand_size=hand_size, rng=self._enemy_rng,  # type: ignore[arg-type]
+        )
+        self.bm.logger = None
+        self.bm.events = EventLog()
+        # 戦闘開始前のまっさらな局面（solve のたびにここへ戻す。HP・Block・バフ・turn_index・一時バフすべて）
+        self._pristine = self.bm.snapshot(include_rng=False)
+        # 敵の行動の分岐：(確率, 抽選で返す値)。intent i は累積重み cum[i] - 1 を引いたときに選ばれる
+        if plan.mode == MODE_PATTERN:
+            self.enemy_branches: Tuple[Tuple[float, int], ...] = ((1.0, 0),)
+        else:
+            self.enemy_branches = tuple(
+                (w / plan.total, c - 1) for w, c in zip(plan.weights(), plan.cum) if w > 0
+            )
+
+    # ---- 公開 API ----
+    def solve(self) -> float:
+        """最善手での勝率（初手の手札の引き方について期待値）。"""
+        bm = self.bm
+        full = self._counts(self.card_ids)
+        empty = tuple(0 for _ in self.specs)
+        # start_battle → start_turn（初期手札は山札から hand_size 枚）
+        bm.restore(self._pristine)
+        bm.start_battle()
+        bm.start_turn()
+        base = bm.snapshot(include_rng=False)
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 20_000))
+        try:
+            live = self._live_key()
+            head, hand = live[:-self._PILES], live[-self._PILES]
+            value = 0.0
+            for p, drawn, draw, disc in draw_outcomes(full, empty, self.hand_size):
+                value += p * self._value(
+                    head + (_add(hand, drawn), draw, disc),
+                    lambda: self._with_piles(base, drawn, draw, disc))
+            return value
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def report(self) -> str:
+        t = self.table
+        return (f"nodes={self.nodes} table={len(t)} ({t.bytes / 1e6:.1f}MB) "
+                f"hits={t.hits} misses={t.misses} evictions={t.evictions}")
+
+    # ---- 局面 ----
+    # キーの並び：(turn, 自分hp, block, energy, バフ, 敵hp, block, バフ, 敵の行動回数, 一時バフ, 手札, 山札, 捨て札)
+    # 枚数ベクトルを末尾に置き、手札補充の分岐では先頭部分を使い回して子のキーを作る
+    _PILES = 3
+
+    def _counts(self, spec_ids: Sequence[str]) -> Counts:
+        v = [0] * len(self.specs)
+        for sid in spec_ids:
+            v[self.index[sid]] += 1
+        return tuple(v)
+
+    def _pile(self, cards: Sequence[CardInstance]) -> Counts:
+        return self._counts([c.spec_id for c in cards])
+
+    def _cards(self, counts: Counts) -> List[CardInstance]:
+        out: List[CardInstance] = []
+        for card, n in zip(self.cards, counts):
+            out.extend([card] * n)
+        return out
+
+    def _with_piles(self, state: BattleState, hand_add: Counts, draw: Counts, disc: Counts) -> BattleState:
+        """state の手札に hand_add を足し、山札・捨て札を差し替えた局面。"""
+        bm = self.bm
+        bm.restore(state)
+        bm.pdeck.hand.extend(self._cards(hand_add))
+        bm.pdeck.draw_pile[:] = self._cards(draw)
+        bm.pdeck.discard_pile[:] = self._cards(disc)
+        return bm.snapshot(include_rng=False)
+
+    def _snapshot(self) -> BattleState:
+        return self.bm.snapshot(include_rng=False)
+
+    def _live_key(self) -> StateKey:
+        """いまの bm の局面キー（スナップショットを作らずに直接読む）。"""
+        bm = self.bm
+        p, e, deck = bm.player, bm.enemy, bm.pdeck
+        return (
+            bm.turn,
+            p.hp, p.block, p.energy, _buff_key(p.buffs),
+            e.hp, e.block, _buff_key(e.buffs), e.turn_index,
+            tuple(sorted((k, tuple(sorted((n, i["value"], i["duration"]) for n, i in b.items())))
+                         for k, b in enumerate(bm.temp_buffs) if b)),
+            self._pile(deck.hand), self._pile(deck.draw_pile), self._pile(deck.discard_pile),
+        )
+
+    # ---- expectimax ----
+    def _value(self, key: StateKey, make_state: Callable[[], BattleState]) -> float:
+        """
+        プレイヤーの手番の局面の勝率（最善手）。
+        転置表に当たれば局面は作らない（make_state は表に無かったときだけ呼ぶ）。
+        """
+        v = self.table.get(key)
+        if v is not None:
+            return v
+        state = make_state()
+        self.nodes += 1
+        bm = self.bm
+
+        bm.restore(state)
+        energy = bm.player.energy
+        # 同じ spec_id のカードはどれを出しても同じ局面になるので1枚ずつ
+        plays: Dict[str, int] = {}
+        for i, c in enumerate(bm.pdeck.hand):
+            if c.spec_id not in plays and bm._effective_cost(bm.player, c) <= energy:
+                plays[c.spec_id] = i
+        # カードを出す手から試す（勝ち確定が見つかればターン終了の分岐は展開しない）
+        best = 0.0
+        for i in plays.values():
+            bm.restore(state)
+            bm.play_player_card(i)
+            p, e = bm.player, bm.enemy
+            if p.hp <= 0 or e.hp <= 0:
+                v = 1.0 if p.hp > 0 else 0.0
+            else:
+                v = self._value(self._live_key(), self._snapshot)
+            if v > best:
+                best = v
+                if best >= 1.0:
+                    break
+        if best < 1.0:
+            best = max(best, self._end_turn_value(state))
+        self.table.put(key, best)
+        return best
+
+    def _end_turn_value(self, state: BattleState) -> float:
+        """ここでターン終了したときの勝率（enemy_act と手札補充について期待値）。"""
+        bm = self.bm
+        total = 0.0
+        for weight, a in self.enemy_branches:
+            bm.restore(state)
+            bm.end_turn()
+            self._enemy_rng.index = a
+            bm.enemy_act()
+            p, e = bm.player, bm.enemy
+            if p.hp <= 0 or e.hp <= 0:
+                total += weight if p.hp > 0 else 0.0
+                continue
+            if bm.turn > self.max_turns:
+                continue
+            # 手札補充は自前で分岐させるので、start_turn の間だけ山札・捨て札を空にしておく
+            draw = self._pile(bm.pdeck.draw_pile)
+            disc = self._pile(bm.pdeck.discard_pile)
+            bm.pdeck.draw_pile[:] = []
+            bm.pdeck.discard_pile[:] = []
+            bm.start_turn()
+            need = max(0, self.hand_size - len(bm.pdeck.hand))
+            live = self._live_key()
+            head, hand = live[:-self._PILES], live[-self._PILES]
+            after = self._snapshot()
+            sub = 0.0
+            for prob, drawn, rest, rest_disc in draw_outcomes(draw, disc, need):
+                key = head + (_add(hand, drawn), rest, rest_disc)
+                sub += prob * self._value(
+                    key, lambda: self._with_piles(after, drawn, rest, rest_disc))
+            total += weight * sub
+        return total
+
+
+def card_values(
+    base_ids: Sequence[str],
+    spec_ids: Sequence[str],
+    **kwargs,
+) -> Iterator[Tuple[str, float]]:
+    """ベースデッキに各カードを1枚足したときの厳密勝率の差（ベースは "BASE"）。"""
+    base = ExactSolver(base_ids, **kwargs).solve()
+    yield "BASE", base
+    for sid in spec_ids:
+        ids = list(base_ids) + [sid]
+        if not solvable(ids):
+            continue
+        yield sid, ExactSolver(ids, **kwargs).solve() - base
+
+
+if __name__ == "__main__":
+    # python exact_solver.py S1 S1 S2 S2 S3 S4 S9
+    # 状態数はデッキの種類数・HP・max_turns で急に増えるので、既定は小さいデッキ・短い上限にしておく
+    import time
+
+    ids = sys.argv[1:] or ["S1", "S1", "S2", "S2", "S3", "S4", "S9"]
+    t0 = time.perf_counter()
+    solver = ExactSolver(ids, player_hp=8, enemy_hp=50, max_turns=4)
+    p = solver.solve()
+    print(f"{' '.join(ids)}: win probability {p:.6f}  ({time.perf_counter() - t0:.2f}s)")
+    print(solver.report())
@@ -5,6 +5,7 @@ from battle import BattleManager
 from battle_deck import BattleDeck
 from master_deck import MasterDeck
 from starter_decks import make_starter_deck
+from rng import make_rng
 
 
 def show_state(bm: BattleManager) -> None:
@@ -29,10 +30,11 @@ def main() -> None:
     # とりあえず HIDEYOSHI スターターを流用（中身は適宜 S1〜S32 に差し替えてOK）
     starter_ids = make_starter_deck("HIDEYOSHI")
 
-    pdeck = BattleDeck(starter_ids)
-    edeck = BattleDeck(starter_ids)  # テスト用に同じデッキを敵にも
+    rng = make_rng(None)
+    pdeck = BattleDeck(starter_ids, rng)
+    edeck = BattleDeck(starter_ids, rng)  # テスト用に同じデッキを敵にも
 
-    bm = BattleManager(player, enemy, pdeck, edeck, max_energy=3, hand_size=5)
+    bm = BattleManager(player, enemy, pdeck, edeck, max_energy=3, hand_size=5, rng=rng)
     bm.start_battle()
 
     # --- メインループ ---
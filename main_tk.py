@@ -1,24 +1,192 @@
 # main_tk.py
+import itertools
+import queue
+import threading
 import tkinter as tk
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import ttk
-import random
 
+from typing import Callable, Deque, Dict, List, Optional, TextIO, Tuple
+
+from data import CARD_SPECS
 from model import Player, Enemy
 from battle import BattleManager
 from battle_deck import BattleDeck
 from master_deck import MasterDeck
 from starter_decks import make_starter_deck
+from rng import make_rng
+from card_effects import NO_MODIFIERS, attack_modifiers
+from parallel_sim import SimStats
+from search_ai import TurnSearchPolicy
+from simulate import GameResult, Policy, greedy_policy, run_batch, _result
+
+# 自動プレイの policy（名前 → 毎回新しく作る関数。探索AIは木を持つので共有しない）
+POLICIES: Dict[str, Callable[[], Policy]] = {
+    "greedy": lambda: greedy_policy,
+    "search": lambda: TurnSearchPolicy(node_budget=200),
+}
+
+# 速度 1..len(STEP_DELAYS) は1手ごとの待ち時間（ms）。その上の AUTO_MAX_SPEED は描画なしの全力
+STEP_DELAYS: Tuple[int, ...] = (800, 400, 200, 100, 50, 20, 5, 1)
+AUTO_MAX_SPEED = len(STEP_DELAYS) + 1
+AUTO_MAX_TURNS = 100
+POLL_MS = 15           # ワーカーの思考結果を見に行く間隔
+PANEL_MS = 100         # 全力モードで勝率パネルを更新する間隔
+
+
+# =========================
+# 差分描画用の小さなビュー
+# =========================
+
+class LabelView:
+    """ラベル1つ。前回と同じ文字列なら configure しない。"""
+
+    __slots__ = ("widget", "text")
+
+    def __init__(self, widget: ttk.Label):
+        self.widget = widget
+        self.text: Optional[str] = None
+
+    def set(self, text: str) -> None:
+        if text != self.text:
+            self.text = text
+            self.widget.configure(text=text)
+
+
+class HandView:
+    """
+    手札ボタンのプール。ボタンは枠 i ごとに1つ作って使い回し、
+    枠 i に出すカードの表示内容が前回と変わったときだけ configure する。
+    手札が減った枠は grid_remove で隠すだけ（破棄しない）。
+    """
+
+    COLUMNS = 3
+
+    def __init__(self, parent: ttk.Frame, on_click: Callable[[int], None]):
+        self.parent = parent
+        self.on_click = on_click
+        self.buttons: List[ttk.Button] = []
+        self.shown: List[Optional[Tuple]] = []   # 枠ごとの表示中の内容（None = 非表示）
+        for col in range(self.COLUMNS):
+            parent.grid_columnconfigure(col, weight=1)
+
+    def _button(self, i: int) -> ttk.Button:
+        while len(self.buttons) <= i:
+            j = len(self.buttons)
+            btn = ttk.Button(self.parent, command=lambda idx=j: self.on_click(idx))
+            btn.grid(row=j // self.COLUMNS, column=j % self.COLUMNS, padx=3, pady=3, sticky="ew")
+            btn.grid_remove()
+            self.buttons.append(btn)
+            self.shown.append(None)
+        return self.buttons[i]
+
+    def update(self, hand) -> None:
+        for i, c in enumerate(hand):
+            key = (c.spec_id, c.cost, c.power, c.card_type)
+            if i < len(self.shown) and self.shown[i] == key:
+                continue
+            btn = self._button(i)
+            btn.configure(text=_card_label(c))
+            if self.shown[i] is None:
+                btn.grid()
+            self.shown[i] = key
+        self.clear(len(hand))
+
+    def clear(self, start: int = 0) -> None:
+        for i in range(start, len(self.buttons)):
+            if self.shown[i] is not None:
+                self.buttons[i].grid_remove()
+                self.shown[i] = None
+
+
+class LogView:
+    """
+    バトルログ（tk.Text）への出力をまとめるシンク。
+    - write() は行をためるだけ。Tk のイベントループが空いたとき（after_idle）に1回でまとめて流す
+    - 画面には直近 max_lines 行だけ残す（lines が最新 max_lines 行のリングバッファ）
+    - 全履歴は path のファイルに flush のたびに追記する（path=None なら書かない）
+    """
+
+    def __init__(self, widget: tk.Text, max_lines: int = 500, path: Optional[str] = None):
+        self.widget = widget
+        self.max_lines = max(1, max_lines)
+        self.lines: Deque[str] = deque(maxlen=self.max_lines)
+        self.pending: List[str] = []
+        self.shown = 0                  # いま widget にある行数
+        self.file: Optional[TextIO] = open(path, "a", encoding="utf-8") if path else None
+        self._scheduled = False
+
+    def write(self, text: str) -> None:
+        self.pending.extend(text.split("\n"))
+        if not self._scheduled:
+            self._scheduled = True
+            self.widget.after_idle(self.flush)
+
+    def flush(self) -> None:
+        self._scheduled = False
+        new = self.pending
+        if not new:
+            return
+        self.pending = []
+        if self.file is not None:
+            self.file.write("\n".join(new) + "\n")
+            self.file.flush()
+        self.lines.extend(new)
+
+        w = self.widget
+        w.configure(state="normal")
+        if len(new) >= self.max_lines:
+            # 1回で画面ぶん以上たまったら丸ごと差し替え
+            w.delete("1.0", tk.END)
+            w.insert(tk.END, "\n".join(self.lines) + "\n")
+            self.shown = len(self.lines)
+        else:
+            w.insert(tk.END, "\n".join(new) + "\n")
+            self.shown += len(new)
+            excess = self.shown - self.max_lines
+            if excess > 0:
+                w.delete("1.0", f"{excess + 1}.0")
+                self.shown -= excess
+        w.see(tk.END)
+        w.configure(state="disabled")
+
+    def close(self) -> None:
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def _card_label(c) -> str:
+    card_name = CARD_SPECS[c.spec_id]["name"]
+    return f"🔸{c.cost} {card_name} ({c.card_type} {c.power})"
 
 
 class BattleApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, log_path: Optional[str] = "battle_ui.log", log_lines: int = 500):
         super().__init__()
         self.title("プロトタイプUI")
-        self.geometry("720x480")
+        self.geometry("720x560")
+        self.log_path = log_path
+        self.log_lines = log_lines
 
         self.bm: BattleManager | None = None
         self.game_over = False
-        self.hand_buttons = []
+        self.seed = 42
+        self.played = 0
+        self.result: Optional[GameResult] = None
+
+        # 自動プレイ
+        self.auto = False
+        self.auto_stats = SimStats()
+        self._auto_gen = 0                      # 開始/停止のたびに増やす（古いコールバックを捨てる）
+        self._policy: Optional[Policy] = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: Optional[Future] = None
+        self._fast_stop: Optional[threading.Event] = None
+        self._fast_results: "queue.Queue[GameResult]" = queue.Queue()
+
         self._create_widgets()
         self._setup_game()
 
@@ -28,14 +196,17 @@ class BattleApp(tk.Tk):
         status_frame = ttk.Frame(self)
         status_frame.pack(side=tk.TOP, fill=tk.X, padx=8, pady=4)
 
-        self.turn_label = ttk.Label(status_frame, text="ターン: 1")
-        self.turn_label.grid(row=0, column=0, sticky="w")
+        turn_label = ttk.Label(status_frame, text="ターン: 1")
+        turn_label.grid(row=0, column=0, sticky="w")
+        self.turn_view = LabelView(turn_label)
 
-        self.player_label = ttk.Label(status_frame, text="")
-        self.player_label.grid(row=1, column=0, sticky="w")
+        player_label = ttk.Label(status_frame, text="")
+        player_label.grid(row=1, column=0, sticky="w")
+        self.player_view = LabelView(player_label)
 
-        self.enemy_label = ttk.Label(status_frame, text="")
-        self.enemy_label.grid(row=2, column=0, sticky="w")
+        enemy_label = ttk.Label(status_frame, text="")
+        enemy_label.grid(row=2, column=0, sticky="w")
+        self.enemy_view = LabelView(enemy_label)
 
         # バトルログ
         log_frame = ttk.LabelFrame(self, text="バトルログ")
@@ -43,12 +214,41 @@ class BattleApp(tk.Tk):
 
         self.log_text = tk.Text(log_frame, height=12, state="disabled")
         self.log_text.pack(fill=tk.BOTH, expand=True)
+        self.log_view = LogView(self.log_text, self.log_lines, self.log_path)
 
         # 手札ボタン置き場
         hand_frame = ttk.LabelFrame(self, text="手札")
         hand_frame.pack(side=tk.TOP, fill=tk.X, padx=8, pady=4)
 
         self.hand_frame = hand_frame
+        self.hand_view = HandView(hand_frame, self.on_play_card)
+
+        # 自動プレイ（観戦モード）
+        auto_frame = ttk.LabelFrame(self, text="自動プレイ")
+        auto_frame.pack(side=tk.TOP, fill=tk.X, padx=8, pady=4)
+
+        self.auto_btn = ttk.Button(auto_frame, text="▶ 開始", command=self.on_toggle_auto)
+        self.auto_btn.grid(row=0, column=0, padx=3)
+
+        ttk.Label(auto_frame, text="AI").grid(row=0, column=1, padx=(8, 2))
+        self.policy_var = tk.StringVar(value="greedy")
+        ttk.Combobox(
+            auto_frame, textvariable=self.policy_var, values=list(POLICIES),
+            state="readonly", width=8,
+        ).grid(row=0, column=2)
+
+        ttk.Label(auto_frame, text="速度").grid(row=0, column=3, padx=(8, 2))
+        self.speed_var = tk.IntVar(value=4)
+        tk.Scale(
+            auto_frame, from_=1, to=AUTO_MAX_SPEED, orient=tk.HORIZONTAL, showvalue=True,
+            variable=self.speed_var, command=self.on_speed,
+        ).grid(row=0, column=4, sticky="ew")
+        auto_frame.grid_columnconfigure(4, weight=1)
+
+        stats_label = ttk.Label(auto_frame, text="")
+        stats_label.grid(row=1, column=0, columnspan=5, sticky="w")
+        self.stats_view = LabelView(stats_label)
+        self._update_stats()
 
         # 下部操作ボタン
         ctrl_frame = ttk.Frame(self)
@@ -60,35 +260,41 @@ class BattleApp(tk.Tk):
         self.end_turn_btn.pack(side=tk.RIGHT)
 
     # ===== ゲーム初期化 =====
+    def _deck_ids(self) -> List[str]:
+        return [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+
     def _setup_game(self):
-        random.seed(42)
+        rng = make_rng(self.seed)
 
-        starter_cards = make_starter_deck("HIDEYOSHI")
-        starter_ids = [c.spec_id for c in starter_cards]
-        master = MasterDeck(starter_ids)
+        master = MasterDeck(self._deck_ids())
 
         player = Player("羽柴隊", max_hp=40)
         enemy = Enemy("明智兵", max_hp=35)
-        pdeck = BattleDeck(master.instantiate())
-        edeck = BattleDeck([])  # v1.10は敵デッキなしAI
+        pdeck = BattleDeck(master.instantiate(), rng)
+        edeck = BattleDeck([], rng)  # v1.10は敵デッキなしAI
 
-        bm = BattleManager(player, enemy, pdeck, edeck, max_energy=3, hand_size=5)
+        bm = BattleManager(player, enemy, pdeck, edeck, max_energy=3, hand_size=5, rng=rng)
         bm.logger = self.log  # コンソールprintの代わりにUIログへ
         self.bm = bm
+        self.game_over = False
+        self.played = 0
+        self.result = None
 
-        self.log("=== UIバトル開始 ===")
+        self.log(f"=== UIバトル開始 (seed {self.seed}) ===")
         bm.start_battle()
         bm.start_turn()
         self.refresh_ui()
 
     # ===== ログ出力 =====
     def log(self, *msgs):
-        text = " ".join(str(m) for m in msgs)
-        self.log_text.configure(state="normal")
-        self.log_text.insert(tk.END, text + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state="disabled")
-        # print(text)  # デバッグしたければ残してOK
+        # 画面への反映は LogView がイベントループの空きにまとめて行う
+        self.log_view.write(" ".join(str(m) for m in msgs))
+
+    def destroy(self):
+        self._stop_auto()
+        self._executor.shutdown(wait=False)
+        self.log_view.close()
+        super().destroy()
 
     # ===== 画面更新 =====
     def refresh_ui(self):
@@ -98,63 +304,72 @@ class BattleApp(tk.Tk):
 
         p, e = bm.player, bm.enemy
 
-        self.turn_label.config(text=f"ターン: {bm.turn}")
-        self.player_label.config(
-            text=f"👤 {p.name} HP {p.hp}/{p.max_hp} | Block {p.block} | Energy {p.energy}"
-        )
-        self.enemy_label.config(
-            text=f"💀 {e.name} HP {e.hp}/{e.max_hp} | Block {e.block}"
+        self.turn_view.set(f"ターン: {bm.turn}")
+        self.player_view.set(
+            f"👤 {p.name} HP {p.hp}/{p.max_hp} | Block {p.block} | Energy {p.energy}{self._mods_text(p)}"
         )
+        self.enemy_view.set(f"💀 {e.name} HP {e.hp}/{e.max_hp} | Block {e.block}{self._mods_text(e)}")
 
-        # 既存の手札ボタンを削除
-        for b in self.hand_buttons:
-            b.destroy()
-        self.hand_buttons.clear()
-
-        # ゲーム終了ならボタン貼り直さない
+        # ゲーム終了なら手札を隠す。それ以外は変わった枠だけ描き直す
         if self.game_over:
+            self.hand_view.clear()
             return
-
-        # 手札1枚ごとにボタンを生成
-        for i, c in enumerate(bm.pdeck.hand):
-            # カード名を取得
-            from data import CARD_SPECS
-            card_name = CARD_SPECS[c.spec_id]["name"]
-            cost_icon = f"🔸{c.cost}"
-            label = f"{cost_icon} {card_name} ({c.card_type} {c.power})"
-
-            btn = ttk.Button(
-                self.hand_frame,
-                text=label,
-                command=lambda idx=i: self.on_play_card(idx),
-                )
-            # 2行×4列にグリッド配置
-            row = i // 3  # 0〜3 → 1行目 / 4〜7 → 2行目
-            col = i % 3
-            btn.grid(row=row, column=col, padx=3, pady=3, sticky="ew")
-            self.hand_buttons.append(btn)
-        # 列幅を均等に広げる（見た目整える用）
-        for col in range(4):
-            self.hand_frame.grid_columnconfigure(col, weight=1)
+        self.hand_view.update(bm.pdeck.hand)
+
+    @staticmethod
+    def _mods_text(actor) -> str:
+        # 与ダメージ補正（キャッシュ済み）。補正なしなら何も出さない
+        mods = attack_modifiers(actor)
+        if mods == NO_MODIFIERS:
+            return ""
+        mult, flat = mods
+        parts = []
+        if mult != 1.0:
+            parts.append(f"×{mult:g}")
+        if flat:
+            parts.append(f"{flat:+d}")
+        return " | 与ダメ " + " ".join(parts)
+
+    def _update_stats(self):
+        st = self.auto_stats
+        self.stats_view.set(
+            f"{st.games} 戦  勝率 {st.win_rate:6.1%}  "
+            f"(勝 {st.wins} / 負 {st.losses} / 相打ち {st.draws} / 時間切れ {st.timeouts})  "
+            f"平均 {st.avg_turns:.1f} ターン"
+        )
 
     # ===== カードプレイ処理 =====
+    def _busy(self) -> bool:
+        # 自動プレイ中・ワーカーが局面を読んでいる間は手動操作を受け付けない
+        return self.auto or (self._pending is not None and not self._pending.done())
+
     def on_play_card(self, idx: int):
-        if self.game_over or self.bm is None:
+        if self._busy():
             return
+        self._play_card(idx)
+
+    def _play_card(self, idx: int) -> bool:
+        """カードを出す。出せたなら True。"""
+        if self.game_over or self.bm is None:
+            return False
 
         bm = self.bm
         log = bm.play_player_card(idx)
         self.log(log)
+        played = bm.last_play_ok
+        if played:
+            self.played += 1
+        self._check_over()
         self.refresh_ui()
-
-        over, msg = bm.is_battle_over()
-        if over:
-            self.game_over = True
-            self.log(msg)
-            return
+        return played
 
     # ===== ターン終了→敵ターン→次ターン開始 =====
     def on_end_turn(self):
+        if self._busy():
+            return
+        self._end_turn()
+
+    def _end_turn(self):
         if self.game_over or self.bm is None:
             return
 
@@ -166,19 +381,154 @@ class BattleApp(tk.Tk):
         # 敵行動
         enemy_log = bm.enemy_act()
         self.log(enemy_log)
+
+        if not self._check_over():
+            if self.auto and bm.turn > AUTO_MAX_TURNS:
+                # 自動プレイは simulate と同じくターン上限で打ち切る
+                self.game_over = True
+                self.result = GameResult(self.seed, "timeout", bm.turn - 1,
+                                         bm.player.hp, bm.enemy_hp_total(), self.played)
+                self.log("時間切れ")
+            else:
+                # 次ターン開始
+                bm.start_turn()
         self.refresh_ui()
 
-        over, msg = bm.is_battle_over()
+    def _check_over(self) -> bool:
+        over, msg = self.bm.is_battle_over()
         if over:
             self.game_over = True
+            self.result = _result(self.seed, self.bm, self.played)
             self.log(msg)
+        return over
+
+    # ===== 自動プレイ =====
+    #
+    # 速度 < AUTO_MAX_SPEED : 画面の戦闘を after() で1手ずつ進める。
+    #   どの手を出すかはワーカースレッドで考え（探索AIでも Tk は止まらない）、
+    #   POLL_MS ごとに結果を見に行って反映する。考えている間 bm には誰も触らない。
+    # 速度 = AUTO_MAX_SPEED : 描画なし。ワーカースレッドが simulate.run_batch で
+    #   次々に戦い、結果をキューに入れる。画面は PANEL_MS ごとに勝率パネルだけ更新する。
+
+    def on_toggle_auto(self):
+        if self.auto:
+            self._stop_auto()
+            self.auto_btn.configure(text="▶ 開始")
+            self._next_game()
+        else:
+            self.auto = True
+            self.auto_btn.configure(text="■ 停止")
+            self._start_auto()
+
+    def on_speed(self, _value=None):
+        # 全力モードとの切り替えだけは走らせ直す（それ以外は次の1手から新しい待ち時間）
+        if not self.auto:
             return
+        fast = self.speed_var.get() >= AUTO_MAX_SPEED
+        if fast != (self._fast_stop is not None):
+            self._stop_auto()
+            self.auto = True
+            self._next_game()
+            self._start_auto()
+
+    def _start_auto(self):
+        self._auto_gen += 1
+        gen = self._auto_gen
+        self._policy = POLICIES[self.policy_var.get()]()
+        if self.speed_var.get() >= AUTO_MAX_SPEED:
+            self._start_fast(gen)
+        else:
+            self.after(0, self._auto_step, gen)
+
+    def _stop_auto(self):
+        self.auto = False
+        self._auto_gen += 1
+        if self._fast_stop is not None:
+            self._fast_stop.set()
+            self._fast_stop = None
+            self._drain_fast()
+
+    def _next_game(self):
+        self.seed += 1
+        self._setup_game()
 
-        # 次ターン開始
-        bm.start_turn()
-        self.refresh_ui()
+    def _finish_game(self):
+        if self.result is not None:
+            self.auto_stats.add(self.result)
+            self._update_stats()
+        self._next_game()
+        reset = getattr(self._policy, "reset", None)
+        if reset is not None:
+            reset()
+
+    def _delay(self) -> int:
+        return STEP_DELAYS[min(self.speed_var.get(), len(STEP_DELAYS)) - 1]
+
+    def _auto_step(self, gen: int):
+        if gen != self._auto_gen:
+            return
+        if self.game_over:
+            self._finish_game()
+            self.after(self._delay(), self._auto_step, gen)
+            return
+        fut = self._pending = self._executor.submit(self._policy, self.bm)
+        self.after(1, self._auto_poll, gen, fut)
+
+    def _auto_poll(self, gen: int, fut: Future):
+        # 自分が投げた fut だけを見る（止めて再開したあとの新しい _pending には触らない）
+        if not fut.done():
+            self.after(POLL_MS, self._auto_poll, gen, fut)
+            return
+        if self._pending is fut:
+            self._pending = None
+        if gen != self._auto_gen:
+            return      # 考えている間に止められた
+        idx = fut.result()
+        if idx is None or not self._play_card(idx):
+            # ターン終了（出せなかったときも simulate と同じくターン終了）
+            self._end_turn()
+        self.after(self._delay(), self._auto_step, gen)
+
+    # ---- 全力モード ----
+    def _start_fast(self, gen: int):
+        stop = threading.Event()
+        self._fast_stop = stop
+        ids = self._deck_ids()
+        policy = self._policy
+        first = self.seed
+        # 止めたあとにワーカーが入れた分が次の回に混ざらないよう、キューは回ごとに作る
+        out = self._fast_results = queue.Queue()
+
+        def work():
+            for r in run_batch(ids, itertools.count(first), policy, max_turns=AUTO_MAX_TURNS):
+                out.put(r)
+                if stop.is_set():
+                    return
+
+        threading.Thread(target=work, daemon=True).start()
+        self.log(f"--- 全力モード（描画なし, seed {first}〜）---")
+        self.after(PANEL_MS, self._fast_poll, gen)
+
+    def _drain_fast(self):
+        last = None
+        while True:
+            try:
+                r = self._fast_results.get_nowait()
+            except queue.Empty:
+                break
+            self.auto_stats.add(r)
+            last = r
+        if last is not None:
+            self.seed = max(self.seed, last.seed)
+        self._update_stats()
+
+    def _fast_poll(self, gen: int):
+        if gen != self._auto_gen:
+            return
+        self._drain_fast()
+        self.after(PANEL_MS, self._fast_poll, gen)
 
 
 if __name__ == "__main__":
     app = BattleApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
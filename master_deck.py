@@ -1,7 +1,7 @@
 # master_deck.py
 from typing import List
 from model import CardInstance
-from data import CARD_SPECS
+from card_table import card_for
 
 class MasterDeck:
     """恒久デッキ：報酬/強化/削除などの恒久変化を保持。"""
@@ -18,15 +18,5 @@ class MasterDeck:
         return False
 
     def instantiate(self) -> List[CardInstance]:
-        """戦闘開始時に実体化して返す。"""
-        out: List[CardInstance] = []
-        for sid in self.card_ids:
-            spec = CARD_SPECS[sid]
-            out.append(CardInstance(
-                spec_id=sid,
-                cost=spec["cost"],
-                power=spec["power"],
-                card_type=spec["card_type"],
-                tags=list(spec.get("tags", [])),
-            ))
-        return out
+        """戦闘開始時に実体化して返す（中身は card_table の共有インスタンス）。"""
+        return [card_for(sid) for sid in self.card_ids]
@@ -2,30 +2,68 @@
 #Dataclass
 #Actor/Player/Enemy/CardInstance
 
+import sys
 from dataclasses import dataclass, field
-from typing import List, Literal
+from enum import IntEnum
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+
+def _new_buff_store():
+    # buff_store は Buff（このモジュール）を使うので遅延 import
+    from buff_store import BuffStore
+    return BuffStore()
+
+
+def _fire_on_hit_lazy(owner: "Actor", source: Optional["Actor"], absorbed: int, dealt: int) -> None:
+    # card_effects がまだ読み込まれていないときだけ通る（import 時に set_on_hit_dispatcher で差し替わる）
+    from card_effects import fire_on_hit
+    fire_on_hit(owner, source, absorbed, dealt)
+
+
+# 被弾時の on_hit ディスパッチャ（card_effects.fire_on_hit）。take_damage はこれを呼ぶだけ
+_on_hit = _fire_on_hit_lazy
+
+
+def set_on_hit_dispatcher(fn) -> None:
+    """take_damage から呼ぶ on_hit のディスパッチャを登録する（card_effects が import 時に1回）。"""
+    global _on_hit
+    _on_hit = fn
+
 
 @dataclass
 class Actor:
-    def __init__(self, name: str, max_hp: int):
-        self.name = name
-        self.max_hp = max_hp
-        self.hp = max_hp
-        self.block = 0
-        self.buffs: List[Buff] = []
-
+    name: str
+    max_hp: int
+    hp: Optional[int] = None
+    block: int = 0
     energy: int = 3
+    buffs: "BuffStore" = field(default_factory=_new_buff_store)
+    aid: int = 0              # 戦闘中の添字（BattleManager.actors[aid]。0 = プレイヤー）
 
     def __post_init__(self):
         if self.hp is None:
             self.hp = self.max_hp
 
     # v1.10 は簡単のため、被ダメ計算はここに残してOK
-    def take_damage(self, dmg: int) -> int:
-        absorb = min(self.block, dmg)
-        self.block -= absorb
-        dealt = dmg - absorb
-        self.hp = max(0, self.hp - dealt)
+    def take_damage(self, dmg: int, source: Optional["Actor"] = None) -> int:
+        """
+        dmg を受ける（Block で吸収した残りが HP に入る）。戻り値は HP に入った量。
+        source は攻撃してきた Actor（反撃の宛先。None ならカード外のダメージ）。
+        on_hit のバフ（反撃・Block 回復など）があるときだけトリガーバスに流す。
+        """
+        block = self.block
+        if block:
+            absorb = block if block < dmg else dmg
+            self.block = block - absorb
+            dealt = dmg - absorb
+        else:
+            absorb = 0
+            dealt = dmg
+        hp = self.hp - dealt
+        self.hp = hp if hp > 0 else 0
+        listeners = getattr(self.buffs, "listeners", None)
+        if listeners is not None and listeners[_ON_HIT]:
+            _on_hit(self, source, absorb, dealt)
         return dealt
 
     def reset_turn(self, energy_cap: int = 3):
@@ -38,16 +76,67 @@ class Player(Actor):
 
 @dataclass
 class Enemy(Actor):
-    # 旧コードの turn_index / intent() は battle 側で扱う予定なら外してOK
+    # turn_index は敵が行動した回数（pattern 型の敵の何番目の行動か）
     turn_index: int = 0
+    spec_id: str = "DEFAULT"     # data.ENEMY_SPECS のキー（行動表は enemy_ai で引く）
 
-@dataclass
 class CardInstance:
-    spec_id: str                       # "ASHIGARU_STRIKE" など
-    cost: int
-    power: int
-    card_type: str                     # "attack" / "block"
-    tags: List[str] = field(default_factory=list)
+    """
+    戦闘で使うカード1枚。
+    同じ spec のカードは card_table の共有インスタンス（フライウェイト）を使い回すので、
+    生成後は書き換え不可。tags は intern 済み文字列のタプル。
+    """
+    __slots__ = ("spec_id", "cost", "power", "card_type", "tags", "plan", "no")
+
+    def __init__(
+        self,
+        spec_id: str,                  # "ASHIGARU_STRIKE" など
+        cost: int,
+        power: int,
+        card_type: str,                # "attack" / "block"
+        tags: Sequence[str] = (),
+        plan: Tuple[Any, ...] = (),    # card_effects でコンパイル済みの実行プラン
+        no: int = -1,                  # card_table 上の整数ID（-1 = 未登録）
+    ):
+        _set = object.__setattr__
+        _set(self, "spec_id", spec_id)
+        _set(self, "cost", cost)
+        _set(self, "power", power)
+        _set(self, "card_type", card_type)
+        _set(self, "tags", tuple(sys.intern(t) for t in tags))
+        _set(self, "plan", plan)
+        _set(self, "no", no)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"CardInstance is immutable (tried to set {name!r})")
+
+    # 不変なのでコピーは自分自身でよい（deepcopy / pickle でも __setattr__ を通らないように）
+    def __copy__(self) -> "CardInstance":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "CardInstance":
+        return self
+
+    def __reduce__(self):
+        return (CardInstance, (self.spec_id, self.cost, self.power, self.card_type,
+                               self.tags, self.plan, self.no))
+
+    def __repr__(self) -> str:
+        return (f"CardInstance(spec_id={self.spec_id!r}, cost={self.cost}, power={self.power}, "
+                f"card_type={self.card_type!r}, tags={self.tags!r})")
+
+    def _key(self) -> Tuple[Any, ...]:
+        return (self.spec_id, self.cost, self.power, self.card_type, self.tags)
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, CardInstance):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
 
     def play_text(self) -> str:
         return f"{self.card_type}:{self.power}"
@@ -56,16 +145,74 @@ class CardInstance:
 BuffTrigger = Literal["turn_start", "turn_end", "on_card_play", "on_attack_calc", "on_hit"]
 
 
-@dataclass
+class Trigger(IntEnum):
+    """バフを評価するタイミング（BuffStore のインデックス）。"""
+    TURN_START = 0
+    TURN_END = 1
+    ON_CARD_PLAY = 2
+    ON_ATTACK_CALC = 3
+    ON_HIT = 4
+
+
+class BuffKind(IntEnum):
+    """バフID。card_effects の kind→ハンドラ表の添字にもなる。"""
+    WEAK = 0
+    COUNTER = 1
+    FORM_WALL = 2
+    FORM_DEF_BOOST = 3
+    FORM_WEAK_STACK = 4
+    FORM_DRAW = 5
+    FORM_COUNTER_STACK = 6
+    TRIG_ATTACK_COUNTER = 7
+    TRIG_DEF_COUNTER = 8
+    TRIG_SKILL_DRAW = 9
+    TRIG_ANY_COUNTER = 10
+    TRIG_BLOCK_RECOVER = 11
+
+
+N_TRIGGERS = len(Trigger)
+_ON_HIT = int(Trigger.ON_HIT)
+N_BUFF_KINDS = len(BuffKind)
+
+# 文字列表記（data / 旧コード）→ 整数ID
+TRIGGER_IDS: Dict[str, int] = {t.name.lower(): int(t) for t in Trigger}
+BUFF_KIND_IDS: Dict[str, int] = {k.name: int(k) for k in BuffKind}
+
+
+def trigger_id(trigger: Union[str, int]) -> int:
+    return TRIGGER_IDS[trigger] if isinstance(trigger, str) else int(trigger)
+
+
+def buff_kind_id(kind: Union[str, int]) -> int:
+    return BUFF_KIND_IDS[kind] if isinstance(kind, str) else int(kind)
+
+
 class Buff:
     """
     すべてのバフ/デバフ/陣形を一元管理するためのモデル。
-    - kind   : バフID（"WEAK" / "COUNTER" / "FORM_SHIELDWALL" など）
-    - power  : 効果の強さ（Block量・反撃量・弱体段数など）
-    - turns  : 残りターン数（0以下になったら消滅）
-    - trigger: どのタイミングで評価するか
+    - kind   : バフID（BuffKind の値）
+    - power  : 効果の強さ（Block量・反撃量・弱体段数など）。重ねがけ分は合算
+    - stacks : まとめられた重ねがけの数
+    - trigger: どのタイミングで評価するか（Trigger の値）
+    - expires: 消滅する時刻（持ち主の BuffStore.now がこの値になったら消える）
     """
-    kind: str
-    power: int
-    turns: int
-    trigger: BuffTrigger
+    __slots__ = ("kind", "power", "stacks", "trigger", "expires")
+
+    def __init__(self, kind: int, power: int, trigger: int, expires: int, stacks: int = 1):
+        self.kind = kind
+        self.power = power
+        self.stacks = stacks
+        self.trigger = trigger
+        self.expires = expires
+
+    def copy(self) -> "Buff":
+        return Buff(self.kind, self.power, self.trigger, self.expires, self.stacks)
+
+    @property
+    def kind_name(self) -> str:
+        return BuffKind(self.kind).name
+
+    def __repr__(self) -> str:
+        return (f"Buff({self.kind_name}, power={self.power}, stacks={self.stacks}, "
+                f"trigger={Trigger(self.trigger).name.lower()}, expires={self.expires})")
+
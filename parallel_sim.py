@@ -0,0 +1,261 @@
+# parallel_sim.py
+"""
+マルチコア Monte Carlo ランナー
+
+- N 戦をチャンクに分けてプロセスプールで並列実行
+- 各戦の seed はマスター seed と「通し番号」から決める
+  → ワーカー数やチャンクの完了順に関係なく、集計結果は同じになる
+- 集計（勝率・ターン数）はチャンクが終わるたびに逐次返す
+"""
+
+from __future__ import annotations
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from data import CARD_SPECS, ENEMY_SPECS
+from master_deck import MasterDeck
+from rng import BattleRNG, make_rng, mix64
+from simulate import BattleRunner, CardStats, GameResult, Policy, greedy_policy
+
+_MASK64 = (1 << 64) - 1
+
+
+def derive_seed(master_seed: int, index: int) -> int:
+    """マスター seed と通し番号から各戦の seed を作る（splitmix64）。"""
+    return mix64((master_seed * 0x9E3779B97F4A7C15 + (index + 1) * 0xBF58476D1CE4E5B9) & _MASK64)
+
+
+# =========================
+# 集計
+# =========================
+
+@dataclass
+class SimStats:
+    """
+    勝敗とターン数の累積。merge は足し算だけなので順序に依存しない。
+    card_stats は track_cards=True のときだけ埋まる（simulate.CardStats）。
+    """
+    games: int = 0
+    wins: int = 0
+    losses: int = 0
+    draws: int = 0
+    timeouts: int = 0
+    turns_sum: int = 0
+    turns_sq_sum: int = 0
+    hp_left_sum: int = 0
+    cards_played: int = 0
+    card_stats: CardStats = field(default_factory=dict)
+
+    def add(self, r: GameResult) -> None:
+        self.games += 1
+        self.turns_sum += r.turns
+        self.turns_sq_sum += r.turns * r.turns
+        self.cards_played += r.cards_played
+        if r.winner == "player":
+            self.wins += 1
+            self.hp_left_sum += r.player_hp
+        elif r.winner == "enemy":
+            self.losses += 1
+        elif r.winner == "draw":
+            self.draws += 1
+        else:
+            self.timeouts += 1
+
+    def merge(self, other: "SimStats") -> None:
+        self.games += other.games
+        self.wins += other.wins
+        self.losses += other.losses
+        self.draws += other.draws
+        self.timeouts += other.timeouts
+        self.turns_sum += other.turns_sum
+        self.turns_sq_sum += other.turns_sq_sum
+        self.hp_left_sum += other.hp_left_sum
+        self.cards_played += other.cards_played
+        for sid, (n, energy, dmg) in other.card_stats.items():
+            cs = self.card_stats.get(sid)
+            if cs is None:
+                self.card_stats[sid] = [n, energy, dmg]
+            else:
+                cs[0] += n
+                cs[1] += energy
+                cs[2] += dmg
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+    @property
+    def avg_turns(self) -> float:
+        return self.turns_sum / self.games if self.games else 0.0
+
+    @property
+    def turns_stddev(self) -> float:
+        if self.games < 2:
+            return 0.0
+        mean = self.avg_turns
+        var = self.turns_sq_sum / self.games - mean * mean
+        return math.sqrt(max(var, 0.0))
+
+    @property
+    def avg_hp_left(self) -> float:
+        return self.hp_left_sum / self.wins if self.wins else 0.0
+
+
+# =========================
+# ワーカー側
+# =========================
+
+# ワーカープロセスごとに1本だけ持つ乱数ストリーム（毎戦 seed で張り直す）
+_WORKER_RNG: Optional[BattleRNG] = None
+
+
+def _worker_init(rng_kind: str = "mt") -> None:
+    global _WORKER_RNG
+    _WORKER_RNG = make_rng(0, rng_kind)
+
+
+def _run_chunk(
+    label: str,
+    card_ids: Tuple[str, ...],
+    master_seed: int,
+    start: int,
+    count: int,
+    policy: Policy,
+    battle_kwargs: Dict,
+    track_cards: bool = False,
+    enemy: Optional[str] = None,
+) -> Tuple[str, SimStats]:
+    rng = _WORKER_RNG if _WORKER_RNG is not None else make_rng(0)
+    if enemy is not None:
+        battle_kwargs = dict(battle_kwargs, enemy=enemy)
+    runner = BattleRunner(MasterDeck(card_ids).instantiate(), rng, **battle_kwargs)
+    stats = SimStats()
+    card_stats = stats.card_stats if track_cards else None
+    for i in range(start, start + count):
+        stats.add(runner.play(derive_seed(master_seed, i), policy, card_stats=card_stats))
+    return label, stats
+
+
+# =========================
+# 親プロセス側
+# =========================
+
+@dataclass(frozen=True)
+class SimJob:
+    """
+    1つの対戦条件（ラベル付き）で n_games 戦回す指定。
+    first は通し番号の開始位置（すでに回した分の続きから足すとき用）。
+    enemy は敵の種類（data.ENEMY_SPECS のキー。None なら battle_kwargs / 既定の敵）。
+    """
+    label: str
+    card_ids: Tuple[str, ...]
+    n_games: int
+    first: int = 0
+    enemy: Optional[str] = None
+
+
+def _chunks(jobs: Sequence[SimJob], master_seed: int, chunk_size: int):
+    # 通し番号はジョブ内で 0 始まり。ジョブ間で同じ seed 列を共有する（共通乱数法）
+    for job in jobs:
+        end = job.first + job.n_games
+        for start in range(job.first, end, chunk_size):
+            count = min(chunk_size, end - start)
+            yield job.label, job.card_ids, master_seed, start, count, job.enemy
+
+
+def run_jobs(
+    jobs: Sequence[SimJob],
+    *,
+    master_seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    policy: Policy = greedy_policy,
+    rng_kind: str = "mt",
+    track_cards: bool = False,
+    **battle_kwargs,
+) -> Iterator[Tuple[str, SimStats]]:
+    """
+    複数ジョブをプロセスプールで回し、チャンクが終わるたびに
+    (label, そのラベルの累積 SimStats) を返す。
+    policy はプロセス間で渡すのでモジュールレベルの関数にすること。
+    track_cards=True で SimStats.card_stats（カード別の使用回数・エナジー・ダメージ）も集める。
+    """
+    totals: Dict[str, SimStats] = {job.label: SimStats() for job in jobs}
+    chunks = list(_chunks(jobs, master_seed, chunk_size))
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1:
+        _worker_init(rng_kind)
+        for label, ids, seed, start, count, enemy in chunks:
+            _, stats = _run_chunk(label, ids, seed, start, count, policy, battle_kwargs, track_cards, enemy)
+            totals[label].merge(stats)
+            yield label, totals[label]
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_worker_init, initargs=(rng_kind,)
+    ) as ex:
+        futures = [
+            ex.submit(_run_chunk, label, ids, seed, start, count, policy, battle_kwargs, track_cards, enemy)
+            for label, ids, seed, start, count, enemy in chunks
+        ]
+        for fut in as_completed(futures):
+            label, stats = fut.result()
+            totals[label].merge(stats)
+            yield label, totals[label]
+
+
+def run_parallel(
+    card_ids: Sequence[str],
+    n_games: int,
+    **kwargs,
+) -> Iterator[SimStats]:
+    """1デッキで n_games 戦。途中経過の SimStats を逐次返す。"""
+    job = SimJob("deck", tuple(card_ids), n_games)
+    for _, stats in run_jobs([job], **kwargs):
+        yield stats
+
+
+def card_sweep_jobs(
+    base_ids: Sequence[str],
+    n_games: int,
+    spec_ids: Optional[Iterable[str]] = None,
+) -> List[SimJob]:
+    """ベースデッキ単体 ＋「ベースデッキ＋各カード1枚」のジョブ一覧を作る。"""
+    base = tuple(base_ids)
+    jobs = [SimJob("BASE", base, n_games)]
+    for sid in (spec_ids if spec_ids is not None else CARD_SPECS):
+        jobs.append(SimJob(sid, base + (sid,), n_games))
+    return jobs
+
+
+def enemy_sweep_jobs(
+    card_ids: Sequence[str],
+    n_games: int,
+    enemy_ids: Optional[Iterable[str]] = None,
+) -> List[SimJob]:
+    """1デッキで敵の種類ごとのジョブ一覧を作る（ラベルは敵ID）。"""
+    ids = tuple(card_ids)
+    return [SimJob(eid, ids, n_games, enemy=eid)
+            for eid in (enemy_ids if enemy_ids is not None else ENEMY_SPECS)]
+
+
+if __name__ == "__main__":
+    import time
+    from starter_decks import make_starter_deck
+
+    ids = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    t0 = time.perf_counter()
+    final: Dict[str, SimStats] = {}
+    for label, stats in run_jobs(card_sweep_jobs(ids, 2000), master_seed=1234):
+        final[label] = stats
+    dt = time.perf_counter() - t0
+    base = final["BASE"]
+    for label, s in sorted(final.items(), key=lambda kv: kv[1].avg_turns):
+        print(f"{label:>5}: win {s.win_rate:6.1%}  turns {s.avg_turns:5.2f}±{s.turns_stddev:4.2f}"
+              f"  (Δturns {s.avg_turns - base.avg_turns:+.2f})")
+    games = sum(s.games for s in final.values())
+    print(f"{games} battles in {dt:.2f}s")
@@ -0,0 +1,161 @@
+# profiling.py
+"""
+ホットパスの計測フック（opt-in）
+
+どの op / バフ / 戦闘フェーズが重いかを、呼び出し回数と累積時間で数える。
+
+    from profiling import PROFILER
+    with PROFILER:                    # enable() / disable()
+        list(run_batch(ids, range(2000)))
+    print(PROFILER.report())
+
+- section ごとに名前別の [回数, 累積秒] を持つ
+    op      : カードプランの step（"attack", "add_buff:FORM_WALL" など）
+    buff    : apply_buffs_on_* のハンドラ（"turn_start:FORM_WALL" など）
+    phase   : BattleManager のターン進行（start_turn / play_player_card / enemy_act ...）
+    unknown_op : 未実装の op（回数のみ。計測の on/off に関係なく常に数える）
+- 無効時のコスト：
+    card_effects 側は events と同じく `if PROFILER.on:` 1回の分岐だけ
+    BattleManager のフェーズは enable() のときだけメソッドを計測版に差し替える
+- ワーカープロセス（parallel_sim）の計測は各プロセスに閉じる（as_dict / merge で集約できる）
+"""
+
+from __future__ import annotations
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+perf_counter = time.perf_counter
+
+# 計測版に差し替える BattleManager のメソッド
+PHASES: Tuple[str, ...] = (
+    "start_battle", "start_turn", "play_player_card", "enemy_act", "end_turn",
+)
+
+StatKey = Tuple[str, str]   # (section, name)
+
+
+class Profiler:
+    """計測値の置き場。モジュールに1つ（PROFILER）だけ置いて共有する。"""
+
+    __slots__ = ("on", "stats", "_originals")
+
+    def __init__(self):
+        self.on = False
+        self.stats: Dict[StatKey, List[float]] = {}   # -> [回数, 累積秒]
+        self._originals: Dict[str, Callable[..., Any]] = {}
+
+    # ---- on / off ----
+    def enable(self) -> None:
+        if self.on:
+            return
+        self.on = True
+        self._install_phases()
+
+    def disable(self) -> None:
+        if not self.on:
+            return
+        self.on = False
+        self._uninstall_phases()
+
+    def __enter__(self) -> "Profiler":
+        self.enable()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.disable()
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    # ---- 記録 ----
+    def add(self, section: str, name: str, dt: float) -> None:
+        s = self.stats.get((section, name))
+        if s is None:
+            self.stats[(section, name)] = [1, dt]
+        else:
+            s[0] += 1
+            s[1] += dt
+
+    def count(self, section: str, name: str, n: int = 1) -> None:
+        """時間を持たない回数だけのカウンタ。"""
+        s = self.stats.get((section, name))
+        if s is None:
+            self.stats[(section, name)] = [n, 0.0]
+        else:
+            s[0] += n
+
+    # ---- 集計 ----
+    def as_dict(self) -> Dict[StatKey, Tuple[int, float]]:
+        return {k: (int(v[0]), v[1]) for k, v in self.stats.items()}
+
+    def merge(self, other: Dict[StatKey, Tuple[int, float]]) -> None:
+        """別プロセスの as_dict() を足し込む。"""
+        for k, (n, t) in other.items():
+            s = self.stats.get(k)
+            if s is None:
+                self.stats[k] = [n, t]
+            else:
+                s[0] += n
+                s[1] += t
+
+    def report(self, sort: str = "time", limit: Optional[int] = None) -> str:
+        """
+        計測結果の表。sort は "time"（累積時間）/ "calls"（回数）/ "name"。
+        section ごとにまとめ、各 section 内を sort 順に並べる。
+        """
+        if sort == "calls":
+            order = lambda kv: (-kv[1][0], kv[0][1])
+        elif sort == "name":
+            order = lambda kv: kv[0][1]
+        else:
+            order = lambda kv: (-kv[1][1], kv[0][1])
+
+        lines = [f"{'section':<11} {'name':<32} {'calls':>10} {'total ms':>10} {'us/call':>9}"]
+        for section in _sections(self.stats):
+            rows = sorted(((k, v) for k, v in self.stats.items() if k[0] == section), key=order)
+            if limit is not None:
+                rows = rows[:limit]
+            for (_, name), (n, t) in rows:
+                per = t / n * 1e6 if n and t else 0.0
+                lines.append(f"{section:<11} {name:<32} {int(n):>10,} {t * 1e3:>10.2f} {per:>9.2f}")
+        return "\n".join(lines)
+
+    # ---- BattleManager のフェーズ ----
+    def _install_phases(self) -> None:
+        from battle import BattleManager
+        for name in PHASES:
+            orig = BattleManager.__dict__[name]
+            self._originals[name] = orig
+            setattr(BattleManager, name, _timed_phase(self, name, orig))
+
+    def _uninstall_phases(self) -> None:
+        from battle import BattleManager
+        for name, orig in self._originals.items():
+            setattr(BattleManager, name, orig)
+        self._originals.clear()
+
+
+def _sections(stats: Dict[StatKey, Any]) -> List[str]:
+    seen: List[str] = []
+    for section in ("phase", "op", "buff", "unknown_op"):
+        if any(k[0] == section for k in stats):
+            seen.append(section)
+    for section, _ in stats:
+        if section not in seen:
+            seen.append(section)
+    return seen
+
+
+def _timed_phase(prof: Profiler, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        t0 = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            prof.add("phase", name, perf_counter() - t0)
+    return wrapper
+
+
+PROFILER = Profiler()
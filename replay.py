@@ -0,0 +1,321 @@
+# replay.py
+"""
+戦闘のリプレイ（記録と決定的な再生）
+
+戦闘は seed・デッキ・戦闘パラメータ・プレイヤーの選択だけで決まるので、
+記録するのは「出した手札 index」と「ターン終了」の列だけでよい（1行動 = 1バイト）。
+
+- Replay      : seed / MasterDeck の card_ids / 敵ID / rng の種類 / 戦闘パラメータ / 行動列
+    to_bytes() は 数十バイトのヘッダ＋行動数バイト
+- 記録        : simulate.BattleRunner.play(actions=bytearray) が行動を追記する（bytearray.append だけ）
+    run_batch_recorded で run_batch と同じ戦闘を回しながら (GameResult, Replay) を返す
+    ReplayLog でファイルに追記していけば、大量実行でも常時記録できる
+- ReplayPlayer: BattleManager で行動列を再実行する
+    seek(turn) は一定ターンごとのチェックポイント（snapshot）から進め直す
+
+    for r, rep in run_batch_recorded(ids, range(10_000)):
+        if r.winner == "enemy":
+            bad = rep
+    player = ReplayPlayer(bad, logger=print)
+    player.seek(5)
+    player.run()
+"""
+
+from __future__ import annotations
+import struct
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from battle import BattleManager
+from battle_deck import BattleDeck
+from battle_state import BattleState
+from enemy_ai import DEFAULT_ENEMY, make_enemy
+from master_deck import MasterDeck
+from model import Player
+from rng import RNG_KINDS, make_rng
+from simulate import END_TURN, BattleRunner, GameResult, Policy, greedy_policy, _result
+
+MAGIC = b"CBRP"
+VERSION = 2     # 2: 敵ID（data.ENEMY_SPECS のキー）を追加
+
+# 戦闘パラメータ（simulate._play_out と同じ既定値）
+PARAMS: Tuple[Tuple[str, int], ...] = (
+    ("player_hp", 40), ("enemy_hp", 35), ("max_energy", 3), ("hand_size", 5), ("max_turns", 100),
+)
+
+_HEAD = struct.Struct("<4sBBQ5HHB")  # magic, version, rng kind, seed, params, card_ids の長さ, 敵IDの長さ
+_HEAD_V1 = struct.Struct("<4sBBQ5HH")  # version 1（敵IDなし = 既定の敵）
+
+
+class Replay:
+    """1戦ぶんのリプレイ。actions は bytes（手札 index / END_TURN）。"""
+
+    __slots__ = ("seed", "card_ids", "enemy", "rng_kind", "params", "actions")
+
+    def __init__(
+        self,
+        seed: int,
+        card_ids: Sequence[str],
+        actions: bytes = b"",
+        *,
+        enemy: str = DEFAULT_ENEMY,
+        rng_kind: str = "mt",
+        **params: int,
+    ):
+        self.seed = seed
+        self.card_ids = list(card_ids)
+        self.enemy = enemy
+        self.rng_kind = rng_kind
+        self.params: Dict[str, int] = {name: params.get(name, default) for name, default in PARAMS}
+        self.actions = bytes(actions)
+
+    @property
+    def turns(self) -> int:
+        return self.actions.count(END_TURN) + 1
+
+    # ---- バイト列 ----
+    def to_bytes(self) -> bytes:
+        ids = ",".join(self.card_ids).encode("ascii")
+        enemy = self.enemy.encode("ascii")
+        head = _HEAD.pack(
+            MAGIC, VERSION, RNG_KINDS.index(self.rng_kind), self.seed & 0xFFFFFFFFFFFFFFFF,
+            *(self.params[name] for name, _ in PARAMS), len(ids), len(enemy),
+        )
+        return head + ids + enemy + self.actions
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        magic, version = data[:4], data[4] if len(data) > 4 else None
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError("リプレイの形式が違います")
+        if version == 1:
+            _, _, kind, seed, *values, n_ids = _HEAD_V1.unpack_from(data)
+            n_enemy = 0
+            start = _HEAD_V1.size
+        else:
+            _, _, kind, seed, *values, n_ids, n_enemy = _HEAD.unpack_from(data)
+            start = _HEAD.size
+        ids = data[start:start + n_ids].decode("ascii")
+        start += n_ids
+        enemy = data[start:start + n_enemy].decode("ascii") or DEFAULT_ENEMY
+        params = {name: v for (name, _), v in zip(PARAMS, values)}
+        return cls(seed, ids.split(",") if ids else [], data[start + n_enemy:],
+                   enemy=enemy, rng_kind=RNG_KINDS[kind], **params)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Replay) and self.to_bytes() == other.to_bytes()
+
+    def __repr__(self) -> str:
+        return (f"Replay(seed={self.seed}, cards={len(self.card_ids)}, enemy={self.enemy!r}, "
+                f"actions={len(self.actions)})")
+
+
+# =========================
+# 記録
+# =========================
+
+def run_batch_recorded(
+    card_ids: Sequence[str],
+    seeds: Iterable[int],
+    policy: Policy = greedy_policy,
+    *,
+    enemy: str = DEFAULT_ENEMY,
+    rng_kind: str = "mt",
+    **kwargs,
+) -> Iterator[Tuple[GameResult, Replay]]:
+    """simulate.run_batch と同じ戦闘を回し、結果とリプレイの組を順に返す。"""
+    runner = BattleRunner(MasterDeck(card_ids).instantiate(), make_rng(0, rng_kind), enemy=enemy, **kwargs)
+    ids = list(card_ids)
+    for seed in seeds:
+        actions = bytearray()
+        r = runner.play(seed, policy, actions=actions)
+        yield r, Replay(seed, ids, actions, enemy=enemy, rng_kind=rng_kind, **kwargs)
+
+
+class ReplayLog:
+    """リプレイを「長さ(uint32) + to_bytes()」で1ファイルに追記していく。"""
+
+    _LEN = struct.Struct("<I")
+
+    def __init__(self, path: str, mode: str = "ab"):
+        self.path = path
+        self._f: BinaryIO = open(path, mode)
+        self.count = 0
+
+    def write(self, replay: Replay) -> None:
+        data = replay.to_bytes()
+        self._f.write(self._LEN.pack(len(data)) + data)
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "ReplayLog":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @classmethod
+    def read(cls, path: str) -> Iterator[Replay]:
+        size = cls._LEN.size
+        with open(path, "rb") as f:
+            while True:
+                head = f.read(size)
+                if len(head) < size:
+                    return
+                (n,) = cls._LEN.unpack(head)
+                data = f.read(n)
+                if len(data) < n:
+                    return
+                yield Replay.from_bytes(data)
+
+
+# =========================
+# 再生
+# =========================
+
+class ReplayPlayer:
+    """
+    Replay を BattleManager で再実行する。進み方は simulate._play_out と同じ：
+        start_battle → start_turn → (カード* → END_TURN: end_turn → enemy_act → start_turn)*
+    プレイヤーのターン開始ごとに、checkpoint_every ターンおきに snapshot を取っておく。
+    """
+
+    def __init__(
+        self,
+        replay: Replay,
+        *,
+        checkpoint_every: int = 5,
+        logger: Optional[Callable[[str], Any]] = None,
+    ):
+        self.replay = replay
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.logger = logger
+        p = replay.params
+        rng = make_rng(replay.seed, replay.rng_kind)
+        cards = MasterDeck(replay.card_ids).instantiate()
+        pdeck = BattleDeck(cards, rng)
+        enemy, edeck = make_enemy(replay.enemy, rng, hp=p["enemy_hp"], name="enemy")
+        self.bm = BattleManager(
+            Player("player", max_hp=p["player_hp"]), enemy, pdeck, edeck,
+            max_energy=p["max_energy"], hand_size=p["hand_size"], rng=rng,
+        )
+        self.bm.logger = logger
+        self.pos = 0            # 次に実行する actions の位置
+        self.played = 0
+        self.done = False
+        self.winner: Optional[str] = None
+        # turn -> (pos, played, state)
+        self.checkpoints: Dict[int, Tuple[int, int, BattleState]] = {}
+        self.bm.start_battle()
+        self.bm.start_turn()
+        self._checkpoint()
+
+    @property
+    def turn(self) -> int:
+        return self.bm.turn
+
+    def _checkpoint(self) -> None:
+        t = self.bm.turn
+        if (t == 1 or t % self.checkpoint_every == 0) and t not in self.checkpoints:
+            self.checkpoints[t] = (self.pos, self.played, self.bm.snapshot(include_rng=True))
+
+    def _log(self, text: str) -> None:
+        if text and self.logger is not None:
+            self.logger(text)
+
+    # ---- 1行動ずつ ----
+    def step(self) -> bool:
+        """行動を1つ実行する。もう進めないなら False。"""
+        if self.done or self.pos >= len(self.replay.actions):
+            return False
+        bm = self.bm
+        p = bm.player
+        a = self.replay.actions[self.pos]
+        self.pos += 1
+        if a != END_TURN:
+            self._log(bm.play_player_card(a))
+            if bm.last_play_ok:
+                self.played += 1
+            if p.hp <= 0 or bm.enemies_down():
+                self.done = True
+            return True
+
+        bm.end_turn()
+        self._log(bm.enemy_act())
+        if p.hp <= 0 or bm.enemies_down():
+            self.done = True
+        elif bm.turn > self.replay.params["max_turns"]:
+            self.done = True
+            self.winner = "timeout"
+        else:
+            bm.start_turn()
+            self._checkpoint()
+        return True
+
+    def run(self) -> GameResult:
+        """最後まで再生して結果を返す。"""
+        while self.step():
+            pass
+        return self.result()
+
+    def result(self) -> GameResult:
+        """いまの局面の結果（途中なら winner は現在の HP から決まる暫定値）。"""
+        bm = self.bm
+        if self.winner == "timeout":
+            return GameResult(self.replay.seed, "timeout", bm.turn - 1, bm.player.hp, bm.enemy_hp_total(), self.played)
+        return _result(self.replay.seed, bm, self.played)
+
+    # ---- シーク ----
+    def seek(self, turn: int) -> None:
+        """
+        プレイヤーのターン turn の開始時点（カードを出す前）まで進める／戻る。
+        turn 以前で最も近いチェックポイントから再実行する。戦闘がそれより前に終わっていれば終了時点で止まる。
+        """
+        t0 = max((t for t in self.checkpoints if t <= turn), default=1)
+        cur = self.bm.turn
+        if self.done or cur > turn or t0 > cur or (cur == turn and not self._at_turn_start()):
+            self._restore(t0)
+        # END_TURN の直後はいつも次のターンの開始時点
+        while not self.done and self.bm.turn < turn:
+            if not self.step():
+                break
+
+    def _restore(self, turn: int) -> None:
+        pos, played, state = self.checkpoints[turn]
+        self.bm.restore(state)
+        self.pos = pos
+        self.played = played
+        self.done = False
+        self.winner = None
+
+    def _at_turn_start(self) -> bool:
+        return self.pos == 0 or self.replay.actions[self.pos - 1] == END_TURN
+
+
+def replay_battle(replay: Replay) -> GameResult:
+    """記録した戦闘をログなしで再実行した結果（記録時の GameResult と一致するはず）。"""
+    return ReplayPlayer(replay, checkpoint_every=1 << 30).run()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from starter_decks import make_starter_deck
+
+    ids = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    n = 5000
+    t0 = time.perf_counter()
+    pairs = list(run_batch_recorded(ids, range(n), enemy_hp=80))
+    dt = time.perf_counter() - t0
+    size = sum(len(rep.to_bytes()) for _, rep in pairs)
+    acts = sum(len(rep.actions) for _, rep in pairs)
+    print(f"recorded {n} battles in {dt:.2f}s: {acts:,} actions, {size:,} bytes "
+          f"({size / n:.0f} B/battle)")
+
+    t0 = time.perf_counter()
+    bad = [r for r, rep in pairs if replay_battle(rep) != r]
+    print(f"replayed in {time.perf_counter() - t0:.2f}s, mismatches: {len(bad)}")
+    if "-v" in sys.argv:
+        _, rep = max(pairs, key=lambda p: p[0].turns)
+        ReplayPlayer(rep, logger=print).run()
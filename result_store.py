@@ -0,0 +1,443 @@
+# result_store.py
+"""
+戦闘結果の列指向ファイル（大規模スイープ用）
+
+1戦 = 1レコード（固定長の NumPy 構造化配列）をチャンク単位でファイルに追記していく。
+Python のリストに溜めないので、何百万戦でもメモリは chunk 1つぶんで済む。
+
+ファイルの中身（1ファイル = 1回の書き出し）：
+    MAGIC(8) | ヘッダ長(uint32) | ヘッダ JSON（dtype / カード一覧）| 0埋め（64バイト境界まで）
+    | レコード × n
+    | フッタ JSON（deck hash → spec_id 列）| フッタ長(uint64) | END_MAGIC(8)
+
+- レコード：seed, deck（デッキの多重集合＋敵IDの 64bit ハッシュ。既定の敵なら敵IDは混ぜない）, winner（WINNERS の添字）,
+  turns, player_hp, enemy_hp, cards_played, plays[カード数]（spec_id ごとの使用回数）
+- レコード部分は np.memmap でそのまま開ける（フッタが無い＝書きかけのファイルも読める）
+  with の中で例外が出たときはフッタを書かずに閉じる（ResultFile.complete が False になる。
+  ResultReader は書けたところまでのレコードだけ読む。strict=True なら読まずにエラー）
+- ResultReader は複数ファイルを chunk ごとに memmap で読んで集計する（全体は読み込まない）
+
+    with ResultWriter("sweep.cbr") as w:
+        write_batch(w, ids, range(100_000))
+    print(ResultReader(["sweep.cbr"]).aggregate())
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from card_table import SPEC_IDS
+from enemy_ai import DEFAULT_ENEMY
+from master_deck import MasterDeck
+from parallel_sim import SimJob, _worker_init, derive_seed
+from simulate import BattleRunner, CardStats, GameResult, Policy, greedy_policy
+from vector_sim import WINNERS
+
+MAGIC = b"CBRSLT1\0"
+END_MAGIC = b"CBREND1\0"
+ALIGN = 64
+CHUNK = 65_536
+
+_WINNER_INDEX = {w: i for i, w in enumerate(WINNERS)}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("result_store には numpy が必要です")
+
+
+def record_dtype(n_cards: int) -> "np.dtype":
+    _require_numpy()
+    return np.dtype([
+        ("seed", "<u8"),
+        ("deck", "<u8"),
+        ("winner", "i1"),
+        ("turns", "<u2"),
+        ("player_hp", "<i2"),
+        ("enemy_hp", "<i2"),
+        ("cards_played", "<u2"),
+        ("plays", "<u2", (n_cards,)),
+    ])
+
+
+def deck_hash(card_ids: Iterable[str], enemy: str = DEFAULT_ENEMY) -> int:
+    """
+    デッキ（spec_id の多重集合）の 64bit ハッシュ。並び順は無視する。
+    敵が既定以外なら敵IDも混ぜる（同じデッキでも敵ごとに別の集計になる）。
+    """
+    key = "\0".join(sorted(card_ids))
+    if enemy != DEFAULT_ENEMY:
+        key += "\0@" + enemy
+    h = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(h[:8], "little")
+
+
+# =========================
+# 書き出し
+# =========================
+
+class ResultWriter:
+    """
+    レコードを chunk 件ずつバッファしてファイルに追記する。
+    カード列は開いた時点の card_table.SPEC_IDS（spec_ids で指定も可）。
+    """
+
+    def __init__(self, path: str, spec_ids: Optional[Sequence[str]] = None, chunk: int = CHUNK):
+        _require_numpy()
+        self.path = path
+        self.spec_ids: List[str] = list(spec_ids if spec_ids is not None else SPEC_IDS)
+        self.col: Dict[str, int] = {sid: i for i, sid in enumerate(self.spec_ids)}
+        self.dtype = record_dtype(len(self.spec_ids))
+        self.decks: Dict[int, List[str]] = {}
+        self.enemies: Dict[int, str] = {}     # deck hash -> 敵ID（既定の敵以外だけ）
+        self.count = 0
+        self._buf = np.zeros(chunk, self.dtype)
+        self._n = 0
+        self._f = open(path, "wb")
+        header = json.dumps({
+            "version": 1,
+            "dtype": self.dtype.descr,
+            "spec_ids": self.spec_ids,
+            "winners": list(WINNERS),
+        }).encode("utf-8")
+        head = MAGIC + struct.pack("<I", len(header)) + header
+        self._f.write(head + b"\0" * (-len(head) % ALIGN))
+
+    # ---- 1件ずつ ----
+    def add(
+        self,
+        deck: int,
+        result: GameResult,
+        plays: Optional[CardStats] = None,
+    ) -> None:
+        """deck は register_deck() の戻り値。plays は simulate.CardStats（使用回数だけ使う）。"""
+        if self._n == len(self._buf):
+            self.flush()
+        rec = self._buf[self._n]
+        rec["seed"] = result.seed & 0xFFFFFFFFFFFFFFFF
+        rec["deck"] = deck
+        rec["winner"] = _WINNER_INDEX[result.winner]
+        rec["turns"] = result.turns
+        rec["player_hp"] = result.player_hp
+        rec["enemy_hp"] = result.enemy_hp
+        rec["cards_played"] = result.cards_played
+        row = rec["plays"]
+        row[:] = 0
+        if plays:
+            col = self.col
+            for sid, cs in plays.items():
+                row[col[sid]] = cs[0]
+        self._n += 1
+
+    # ---- 配列でまとめて ----
+    def add_records(self, recs: "np.ndarray") -> None:
+        """同じ dtype のレコード配列をそのまま書く（ワーカーが作ったチャンクなど）。"""
+        self.flush()
+        self._f.write(np.ascontiguousarray(recs, self.dtype).tobytes())
+        self.count += len(recs)
+
+    def add_arrays(self, card_ids: Sequence[str], out: Dict[str, "np.ndarray"],
+                   enemy: str = DEFAULT_ENEMY) -> None:
+        """vector_sim.simulate_arrays の結果を書く（カード別の使用回数は持たないので 0）。"""
+        deck = self.register_deck(card_ids, enemy)
+        recs = np.zeros(len(out["seed"]), self.dtype)
+        recs["seed"] = out["seed"]
+        recs["deck"] = deck
+        for name in ("winner", "turns", "player_hp", "enemy_hp", "cards_played"):
+            recs[name] = out[name]
+        self.add_records(recs)
+
+    def register_deck(self, card_ids: Sequence[str], enemy: str = DEFAULT_ENEMY) -> int:
+        h = deck_hash(card_ids, enemy)
+        if h not in self.decks:
+            self.decks[h] = sorted(card_ids)
+            if enemy != DEFAULT_ENEMY:
+                self.enemies[h] = enemy
+        return h
+
+    def flush(self) -> None:
+        if self._n:
+            self._f.write(self._buf[:self._n].tobytes())
+            self.count += self._n
+            self._n = 0
+
+    def close(self, complete: bool = True) -> None:
+        """
+        バッファを書き出して閉じる。complete=False ならフッタを書かない
+        （途中で失敗したファイルを完全なものに見せないため）。
+        """
+        if self._f.closed:
+            return
+        self.flush()
+        if not complete:
+            self._f.close()
+            return
+        footer = json.dumps({"decks": {str(h): ids for h, ids in self.decks.items()},
+                             "enemies": {str(h): e for h, e in self.enemies.items()},
+                             "count": self.count}).encode("utf-8")
+        self._f.write(footer + struct.pack("<Q", len(footer)) + END_MAGIC)
+        self._f.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close(complete=exc[0] is None)
+
+
+# =========================
+# ランナー
+# =========================
+
+def write_batch(
+    writer: ResultWriter,
+    card_ids: Sequence[str],
+    seeds: Iterable[int],
+    policy: Policy = greedy_policy,
+    *,
+    rng_kind: str = "mt",
+    **kwargs,
+) -> None:
+    """simulate.run_batch と同じ戦闘を回し、1戦ずつ writer に流す。"""
+    from rng import make_rng
+    runner = BattleRunner(MasterDeck(card_ids).instantiate(), make_rng(0, rng_kind), **kwargs)
+    deck = writer.register_deck(card_ids, kwargs.get("enemy", DEFAULT_ENEMY))
+    for seed in seeds:
+        plays: CardStats = {}
+        writer.add(deck, runner.play(seed, policy, card_stats=plays), plays)
+
+
+def _record_chunk(
+    card_ids: Tuple[str, ...],
+    spec_ids: Tuple[str, ...],
+    master_seed: int,
+    start: int,
+    count: int,
+    policy: Policy,
+    battle_kwargs: Dict,
+) -> "np.ndarray":
+    """ワーカー側：count 戦ぶんのレコード配列を作って返す（親へはこの配列だけ送る）。"""
+    from parallel_sim import _WORKER_RNG
+    from rng import make_rng
+    rng = _WORKER_RNG if _WORKER_RNG is not None else make_rng(0)
+    runner = BattleRunner(MasterDeck(card_ids).instantiate(), rng, **battle_kwargs)
+    col = {sid: i for i, sid in enumerate(spec_ids)}
+    recs = np.zeros(count, record_dtype(len(spec_ids)))
+    recs["deck"] = deck_hash(card_ids, battle_kwargs.get("enemy", DEFAULT_ENEMY))
+    seed_col, win_col, turns_col = recs["seed"], recs["winner"], recs["turns"]
+    php_col, ehp_col, played_col, plays_col = (
+        recs["player_hp"], recs["enemy_hp"], recs["cards_played"], recs["plays"])
+    for j in range(count):
+        plays: CardStats = {}
+        r = runner.play(derive_seed(master_seed, start + j), policy, card_stats=plays)
+        seed_col[j] = r.seed
+        win_col[j] = _WINNER_INDEX[r.winner]
+        turns_col[j] = r.turns
+        php_col[j] = r.player_hp
+        ehp_col[j] = r.enemy_hp
+        played_col[j] = r.cards_played
+        row = plays_col[j]
+        for sid, cs in plays.items():
+            row[col[sid]] = cs[0]
+    return recs
+
+
+def write_jobs(
+    writer: ResultWriter,
+    jobs: Sequence[SimJob],
+    *,
+    master_seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    policy: Policy = greedy_policy,
+    rng_kind: str = "mt",
+    **battle_kwargs,
+) -> Iterator[int]:
+    """
+    parallel_sim.run_jobs と同じ seed 割り当てで回し、ワーカーが作ったレコードを
+    チャンクが返るたびに writer へ書く。書いた累計件数を逐次返す。
+    SimJob.enemy があれば battle_kwargs の enemy より優先する（parallel_sim._run_chunk と同じ）。
+    """
+    spec_ids = tuple(writer.spec_ids)
+    chunks = []
+    for job in jobs:
+        kwargs = battle_kwargs if job.enemy is None else dict(battle_kwargs, enemy=job.enemy)
+        writer.register_deck(job.card_ids, kwargs.get("enemy", DEFAULT_ENEMY))
+        end = job.first + job.n_games
+        for start in range(job.first, end, chunk_size):
+            chunks.append((tuple(job.card_ids), spec_ids, master_seed, start,
+                           min(chunk_size, end - start), policy, kwargs))
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1:
+        _worker_init(rng_kind)
+        for args in chunks:
+            writer.add_records(_record_chunk(*args))
+            yield writer.count
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init, initargs=(rng_kind,)) as ex:
+        # 先に投げすぎると結果がメモリに溜まるので、ワーカー数の数倍ずつ順に回す
+        window = workers * 4
+        pending = []
+        for args in chunks:
+            pending.append(ex.submit(_record_chunk, *args))
+            if len(pending) >= window:
+                writer.add_records(pending.pop(0).result())
+                yield writer.count
+        for fut in pending:
+            writer.add_records(fut.result())
+            yield writer.count
+
+
+# =========================
+# 読み出し
+# =========================
+
+class ResultFile:
+    """1ファイルのヘッダ・フッタと、レコード部分の memmap。"""
+
+    def __init__(self, path: str):
+        _require_numpy()
+        self.path = path
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: 結果ファイルではありません")
+            (hlen,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(hlen))
+            head = len(MAGIC) + 4 + hlen
+            self.offset = head + (-head % ALIGN)
+            self.spec_ids: List[str] = header["spec_ids"]
+            self.dtype = np.dtype([tuple(d) if len(d) == 2 else (d[0], d[1], tuple(d[2]))
+                                   for d in header["dtype"]])
+            self.decks: Dict[int, List[str]] = {}
+            self.enemies: Dict[int, str] = {}
+            self.complete = False     # フッタまで書き切ったファイルか
+            end = size
+            f.seek(max(0, size - 16))
+            tail = f.read(16)
+            if len(tail) == 16 and tail[8:] == END_MAGIC:
+                (flen,) = struct.unpack("<Q", tail[:8])
+                end = size - 16 - flen
+                f.seek(end)
+                footer = json.loads(f.read(flen))
+                self.decks = {int(h): ids for h, ids in footer["decks"].items()}
+                self.enemies = {int(h): e for h, e in footer.get("enemies", {}).items()}
+                self.complete = True
+        self.count = max(0, end - self.offset) // self.dtype.itemsize
+
+    def records(self) -> "np.ndarray":
+        if self.count == 0:
+            return np.zeros(0, self.dtype)
+        return np.memmap(self.path, self.dtype, mode="r", offset=self.offset, shape=(self.count,))
+
+
+class ResultReader:
+    """
+    複数の結果ファイルをまとめて読む。カード列の並びが違うファイルも混ぜてよい。
+    フッタの無い（書きかけ・途中で失敗した）ファイルは書けたレコードだけ読む。strict=True なら ValueError。
+    """
+
+    def __init__(self, paths: Iterable[str], strict: bool = False):
+        self.files = [ResultFile(p) for p in paths]
+        if strict:
+            bad = [rf.path for rf in self.files if not rf.complete]
+            if bad:
+                raise ValueError(f"フッタの無い結果ファイル: {', '.join(bad)}")
+        self.decks: Dict[int, List[str]] = {}
+        self.enemies: Dict[int, str] = {}
+        for rf in self.files:
+            self.decks.update(rf.decks)
+            self.enemies.update(rf.enemies)
+
+    def __len__(self) -> int:
+        return sum(rf.count for rf in self.files)
+
+    def chunks(self, rows: int = 1 << 20) -> Iterator[Tuple[ResultFile, "np.ndarray"]]:
+        """(ファイル, レコードの一部) を rows 件ずつ。中身は memmap の窓なので必要な分だけ読む。"""
+        for rf in self.files:
+            recs = rf.records()
+            for s in range(0, rf.count, rows):
+                yield rf, recs[s:s + rows]
+
+    def aggregate(self, rows: int = 1 << 20) -> Dict[int, dict]:
+        """
+        デッキ（deck hash）ごとの集計：
+            games, wins, losses, draws, timeouts, win_rate, avg_turns, avg_hp_left,
+            plays_per_game（spec_id → 1戦あたり使用回数）, cards（spec_id 列。わかる場合）, enemy（敵ID）
+        """
+        acc: Dict[int, dict] = {}
+        for rf, part in self.chunks(rows):
+            decks, inv = np.unique(part["deck"], return_inverse=True)
+            k = len(decks)
+            games = np.bincount(inv, minlength=k)
+            winner = part["winner"].astype(np.int64)
+            by_winner = np.bincount(inv * len(WINNERS) + winner, minlength=k * len(WINNERS))
+            by_winner = by_winner.reshape(k, len(WINNERS))
+            turns = np.bincount(inv, weights=part["turns"], minlength=k)
+            won = winner == _WINNER_INDEX["player"]
+            hp = np.bincount(inv[won], weights=part["player_hp"][won], minlength=k)
+            plays = np.zeros((k, len(rf.spec_ids)), np.int64)
+            np.add.at(plays, inv, part["plays"])
+            for i, h in enumerate(decks.tolist()):
+                a = acc.get(h)
+                if a is None:
+                    a = acc[h] = {"games": 0, "by_winner": [0] * len(WINNERS),
+                                  "turns": 0, "hp": 0, "plays": {}}
+                a["games"] += int(games[i])
+                for w in range(len(WINNERS)):
+                    a["by_winner"][w] += int(by_winner[i, w])
+                a["turns"] += int(turns[i])
+                a["hp"] += int(hp[i])
+                for j in np.flatnonzero(plays[i]).tolist():
+                    sid = rf.spec_ids[j]
+                    a["plays"][sid] = a["plays"].get(sid, 0) + int(plays[i, j])
+
+        out: Dict[int, dict] = {}
+        for h, a in acc.items():
+            n = a["games"]
+            wins, losses, draws, timeouts = a["by_winner"]
+            out[h] = {
+                "cards": self.decks.get(h),
+                "enemy": self.enemies.get(h, DEFAULT_ENEMY),
+                "games": n,
+                "wins": wins,
+                "losses": losses,
+                "draws": draws,
+                "timeouts": timeouts,
+                "win_rate": wins / n if n else 0.0,
+                "avg_turns": a["turns"] / n if n else 0.0,
+                "avg_hp_left": a["hp"] / wins if wins else 0.0,
+                "plays_per_game": {sid: c / n for sid, c in sorted(a["plays"].items())},
+            }
+        return out
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+    from parallel_sim import card_sweep_jobs
+    from starter_decks import make_starter_deck
+
+    ids = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "sweep.cbr")
+    t0 = time.perf_counter()
+    with ResultWriter(path) as w:
+        for n in write_jobs(w, card_sweep_jobs(ids, 2000, ["S9", "S12", "S25"]), master_seed=1234):
+            pass
+    print(f"wrote {n} records to {path} ({os.path.getsize(path):,} bytes, {time.perf_counter() - t0:.2f}s)")
+    t0 = time.perf_counter()
+    for h, s in ResultReader([path]).aggregate().items():
+        print(f"{h:016x}  win {s['win_rate']:6.1%}  turns {s['avg_turns']:5.2f}  {' '.join(s['cards'] or [])}")
+    print(f"aggregated in {time.perf_counter() - t0:.3f}s")
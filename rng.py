@@ -0,0 +1,116 @@
+# rng.py
+"""
+戦闘ごとの乱数オブジェクト
+
+- BattleDeck / BattleManager / card_effects はモジュールグローバルの random を使わず、
+  戦闘ごとに1つの rng を受け取って使い回す（bm.rng）
+- 必要なメソッドは random.Random と同じ: seed / random / randrange / choice / shuffle
+- CounterRNG は「(key, counter) → 64bit 値」の純関数で乱数を作るカウンタ型。
+  状態が整数2つだけなので、大量の戦闘を並べて交互に進めても互いに干渉せず、
+  コピー・保存も安い
+"""
+
+from __future__ import annotations
+import random
+from typing import Any, List, MutableSequence, Optional, Sequence, Tuple, Union
+
+_MASK64 = (1 << 64) - 1
+_GAMMA = 0x9E3779B97F4A7C15
+
+
+def mix64(z: int) -> int:
+    """splitmix64 の最終化関数。"""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+class CounterRNG:
+    """
+    カウンタ型の軽量 RNG（splitmix64）。
+    i 番目の乱数 = mix64(key + (i+1) * GAMMA)。
+
+    randbelow(n) は上位32bitに n を掛けて32bit右シフトする方式
+    （NumPy でも uint64 のまま同じ値を再現できるようにするため）。
+    n は 2**32 未満を想定。
+    """
+
+    __slots__ = ("key", "counter")
+
+    def __init__(self, seed: int = 0):
+        self.key = 0
+        self.counter = 0
+        self.seed(seed)
+
+    def seed(self, seed: int = 0) -> None:
+        self.key = mix64(int(seed) & _MASK64)
+        self.counter = 0
+
+    def spawn(self, stream: int) -> "CounterRNG":
+        """同じ key から独立したサブストリームを作る（stream 番号ごとに別系列）。"""
+        child = CounterRNG.__new__(CounterRNG)
+        child.key = mix64((self.key ^ mix64(stream + 1)) & _MASK64)
+        child.counter = 0
+        return child
+
+    # ---- 生成 ----
+    def next64(self) -> int:
+        self.counter += 1
+        return mix64((self.key + self.counter * _GAMMA) & _MASK64)
+
+    def randbelow(self, n: int) -> int:
+        self.counter += 1
+        z = (self.key + self.counter * _GAMMA) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        z ^= z >> 31
+        return ((z >> 32) * n) >> 32
+
+    def random(self) -> float:
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+    def randrange(self, start: int, stop: int = None) -> int:
+        if stop is None:
+            start, stop = 0, start
+        if stop <= start:
+            raise ValueError("empty range for randrange()")
+        return start + self.randbelow(stop - start)
+
+    def choice(self, seq: Sequence[Any]) -> Any:
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[self.randbelow(len(seq))]
+
+    def shuffle(self, x: MutableSequence[Any]) -> None:
+        """Fisher-Yates（random.shuffle と同じ走査順）。"""
+        randbelow = self.randbelow
+        for i in range(len(x) - 1, 0, -1):
+            j = randbelow(i + 1)
+            x[i], x[j] = x[j], x[i]
+
+    # ---- 状態の保存/復元 ----
+    def getstate(self) -> Tuple[int, int]:
+        return self.key, self.counter
+
+    def setstate(self, state: Tuple[int, int]) -> None:
+        self.key, self.counter = state
+
+
+BattleRNG = Union[random.Random, CounterRNG]
+
+RNG_KINDS: List[str] = ["mt", "counter"]
+
+
+def make_rng(seed: Optional[int] = None, kind: str = "mt") -> BattleRNG:
+    """
+    戦闘用の rng を作る。seed=None なら毎回ちがう seed。
+    - "mt"      : random.Random（メルセンヌツイスタ）
+    - "counter" : CounterRNG
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    if kind == "mt":
+        return random.Random(seed)
+    if kind == "counter":
+        return CounterRNG(seed)
+    raise ValueError(f"unknown rng kind: {kind}")
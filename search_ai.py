@@ -0,0 +1,325 @@
+# search_ai.py
+"""
+プレイヤー用のターン内探索AI（最良優先ビームサーチ）
+
+- 1ターン内の「どのカードをどの順で出すか」を play_player_card の列として探索する
+- 局面は BattleManager.snapshot()/restore() で行き来する（deepcopy しない）
+- 手札の同じ spec_id のカードは同一視する（S1×5 でも子ノードは1つ）
+- 同じ局面に合流した手順は転置表で1ノードにまとめる
+- 予算は1回の意思決定あたりのノード数 / 壁時計時間
+- 選んだ手を打ったら、その子ノードを次の根として木を使い回す
+
+policy として simulate.run_batch などにそのまま渡せる：
+    ai = TurnSearchPolicy(node_budget=200)
+    run_battle(ids, seed, ai)
+"""
+
+from __future__ import annotations
+import heapq
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from battle import BattleManager
+from battle_state import BattleState
+from events import EventLog
+from enemy_ai import DEFAULT_ENEMY, attack_hits, enemy_threats, get_enemy_plan
+from model import BuffKind, Trigger
+from simulate import module_source_hash
+
+# 敵の次の行動候補 ((1回ごとのダメージ列), 重み)。既定の敵（旧 enemy_act の3択・等確率）のもの。
+# evaluate は enemy_ai.enemy_threats で局面の敵ごとに作り直したものを使う
+Threats = Tuple[Tuple[Tuple[int, ...], int], ...]
+ENEMY_THREATS: Threats = tuple(
+    (attack_hits(c), w) for c, w in zip(get_enemy_plan(DEFAULT_ENEMY).intents,
+                                        get_enemy_plan(DEFAULT_ENEMY).weights())
+)
+
+WIN_SCORE = 10_000.0
+
+Evaluator = Callable[[BattleManager], float]
+
+
+def expected_incoming(
+    block: int,
+    threats: Threats = ENEMY_THREATS,
+    weak: int = 0,
+    recover: int = 0,
+) -> float:
+    """
+    今の Block で敵の次の行動を受けたときの期待被ダメージ。
+    weak は敵の弱体（1ヒットごとに減る量）、recover は Block で受けるたびに戻る Block（S32）。
+    """
+    total = 0.0
+    weights = 0
+    for hits, w in threats:
+        b = block
+        weights += w
+        for dmg in hits:
+            dmg = max(dmg - weak, 0)
+            absorb = min(b, dmg)
+            b -= absorb
+            if absorb > 0:
+                b += recover
+            total += w * (dmg - absorb)
+    return total / weights if weights else 0.0
+
+
+def expected_counter(counter: int, enemy_block: int = 0, threats: Threats = ENEMY_THREATS) -> float:
+    """反撃 counter のまま敵の次の行動を受けたとき、敵に返る期待ダメージ（1ヒットごとに返る）。"""
+    if counter <= 0:
+        return 0.0
+    total = 0.0
+    weights = 0
+    for hits, w in threats:
+        b = enemy_block
+        weights += w
+        for _ in hits:
+            absorb = min(b, counter)
+            b -= absorb
+            total += w * (counter - absorb)
+    return total / weights if weights else 0.0
+
+
+def _weak_next_act(e) -> int:
+    """敵の次の行動に効く弱体（敵の tick のあとも残るもの）。"""
+    store = e.buffs
+    return sum(
+        b.power for b in store.by_trigger[Trigger.ON_ATTACK_CALC].values()
+        if b.kind == BuffKind.WEAK and b.expires > store.now + 1
+    )
+
+
+def _incoming_threats(bm: BattleManager, counter: int) -> Tuple[Threats, float]:
+    """
+    敵の次のターンの (行動候補, 反撃の期待ダメージ)。
+    生きている敵を aid 順に並べ、ヒットはそれぞれ自分の弱体で減らしてから連結する（重みは積）。
+    反撃は殴ってきた敵に返るので、敵ごとにその敵の Block で見積もって足す。
+    """
+    threats: Threats = (((), 1),)
+    reflected = 0.0
+    for e in bm.enemies:
+        if e.hp <= 0:
+            continue
+        mine = enemy_threats(bm.plans[e.aid], e, bm.decks[e.aid])
+        weak = _weak_next_act(e)
+        if weak:
+            mine = tuple((tuple(max(d - weak, 0) for d in hits), w) for hits, w in mine)
+        reflected += expected_counter(counter, e.block, mine)
+        threats = tuple((hits + h, w * v) for hits, w in threats for h, v in mine)
+    return threats, reflected
+
+
+def evaluate(bm: BattleManager) -> float:
+    """
+    「ここでターン終了したら」の局面評価（大きいほどプレイヤー有利）。
+    敵HPを削るほど、被ダメ期待値が小さいほど（弱体・反撃込み）、残っている陣形バフが多いほど高い。
+    """
+    p = bm.player
+    if bm.enemies_down():
+        return WIN_SCORE + p.hp
+    if p.hp <= 0:
+        return -WIN_SCORE
+    pstore = p.buffs
+    threats, reflected = _incoming_threats(bm, pstore.total(BuffKind.COUNTER))
+    incoming = expected_incoming(p.block, threats, recover=pstore.total(BuffKind.TRIG_BLOCK_RECOVER))
+    dealt = sum(x.max_hp - x.hp for x in bm.enemies)
+    score = 2.0 * (dealt + reflected) + p.hp - incoming
+    for b in pstore.by_trigger[Trigger.TURN_START].values():
+        score += 0.5 * b.power * (b.expires - pstore.now)
+    return score
+
+
+class _Node:
+    __slots__ = ("state", "key", "value", "children", "expanded", "terminal")
+
+    def __init__(self, state: BattleState, key: Tuple, value: float, terminal: bool):
+        self.state = state
+        self.key = key
+        self.value = value              # ここでターン終了したときの評価
+        self.children: Dict[str, "_Node"] = {}   # spec_id -> 子
+        self.expanded = False
+        self.terminal = terminal
+
+    def best(self, memo: Dict[int, float]) -> float:
+        """部分木の最良値（ターン終了を含む）。合流があるので id でメモ化。"""
+        v = memo.get(id(self))
+        if v is not None:
+            return v
+        v = self.value
+        for child in self.children.values():
+            cv = child.best(memo)
+            if cv > v:
+                v = cv
+        memo[id(self)] = v
+        return v
+
+
+_SILENT = EventLog()
+
+
+class TurnSearchPolicy:
+    """
+    ターン内探索で次に出すカードを選ぶ policy。
+
+    - node_budget : 1回の意思決定で生成する局面数の上限
+    - time_budget : 1回の意思決定の壁時計上限（秒, None で無制限）
+    - beam_width  : 同じ深さ（このターンに出した枚数）で展開するノード数の上限
+    """
+
+    def __init__(
+        self,
+        node_budget: int = 300,
+        time_budget: Optional[float] = None,
+        beam_width: int = 16,
+        evaluator: Evaluator = evaluate,
+    ):
+        self.node_budget = node_budget
+        self.time_budget = time_budget
+        self.beam_width = beam_width
+        self.evaluator = evaluator
+        self.root: Optional[_Node] = None
+        self._table: Dict[Tuple, _Node] = {}
+        # 統計
+        self.nodes = 0
+        self.search_time = 0.0
+        self.decisions = 0
+        self.reused = 0
+
+    # ---- policy インターフェース ----
+    def __call__(self, bm: BattleManager) -> Optional[int]:
+        saved_events = bm.events
+        bm.events = _SILENT
+        try:
+            return self._decide(bm)
+        finally:
+            bm.events = saved_events
+
+    def cache_params(self) -> Dict[str, Any]:
+        """結果に効く設定（balance_report などのキャッシュキー用）。"""
+        return {
+            "node_budget": self.node_budget,
+            "time_budget": self.time_budget,
+            "beam_width": self.beam_width,
+            "evaluator": f"{self.evaluator.__module__}.{self.evaluator.__qualname__}",
+            "evaluator_source": module_source_hash(self.evaluator.__module__),
+        }
+
+    def reset(self) -> None:
+        """木を捨てる（戦闘が変わったときなど）。"""
+        self.root = None
+        self._table = {}
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.search_time if self.search_time > 0 else 0.0
+
+    def report(self) -> str:
+        return (f"decisions={self.decisions} nodes={self.nodes} reused={self.reused} "
+                f"time={self.search_time:.3f}s ({self.nodes_per_sec:,.0f} nodes/s)")
+
+    # ---- 本体 ----
+    def _decide(self, bm: BattleManager) -> Optional[int]:
+        t0 = time.perf_counter()
+        self.decisions += 1
+        state = bm.snapshot()
+        key = state.key()
+
+        root = self.root
+        if root is not None and root.key == key:
+            self.reused += 1
+        else:
+            self._table = {}
+            root = self._make_node(bm, state, key)
+        self.root = root
+
+        self._search(bm, root, t0)
+        bm.restore(root.state)
+
+        # 最良の子を選ぶ（ターン終了より良い子が無ければ None）
+        memo: Dict[int, float] = {}
+        best_spec: Optional[str] = None
+        best_v = root.value
+        for spec_id, child in root.children.items():
+            v = child.best(memo)
+            if v > best_v:
+                best_v, best_spec = v, spec_id
+
+        self.search_time += time.perf_counter() - t0
+        if best_spec is None:
+            self.reset()
+            return None
+        self.root = root.children[best_spec]
+        for i, c in enumerate(bm.pdeck.hand):
+            if c.spec_id == best_spec:
+                return i
+        self.reset()
+        return None
+
+    def _make_node(self, bm: BattleManager, state: BattleState, key: Tuple) -> _Node:
+        over, _ = bm.is_battle_over()
+        node = _Node(state, key, self.evaluator(bm), over)
+        self._table[key] = node
+        return node
+
+    def _search(self, bm: BattleManager, root: _Node, t0: float) -> None:
+        budget = self.node_budget
+        deadline = t0 + self.time_budget if self.time_budget is not None else None
+        created = 0
+        expanded_at: Dict[int, int] = {}
+        # 最良優先：ここで終了したときの評価が高いノードから展開
+        counter = 0
+        heap: List[Tuple[float, int, int, _Node]] = [(-root.value, counter, 0, root)]
+        seen = {id(root)}
+        while heap and created < budget:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            _, _, depth, node = heapq.heappop(heap)
+            if node.terminal:
+                continue
+            if node.expanded:
+                # 使い回した部分木：子を候補に戻すだけ
+                for child in node.children.values():
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        counter += 1
+                        heapq.heappush(heap, (-child.value, counter, depth + 1, child))
+                continue
+            if expanded_at.get(depth, 0) >= self.beam_width:
+                continue
+            expanded_at[depth] = expanded_at.get(depth, 0) + 1
+            children, generated = self._expand(bm, node)
+            created += generated
+            for child in children:
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    counter += 1
+                    heapq.heappush(heap, (-child.value, counter, depth + 1, child))
+        self.nodes += created
+
+    def _expand(self, bm: BattleManager, node: _Node) -> Tuple[List[_Node], int]:
+        """
+        出せるカードを spec_id 単位で1回ずつ試して子ノードを作る。
+        戻り値は（新しく作ったノード, 生成した局面数）。
+        """
+        node.expanded = True
+        bm.restore(node.state)
+        energy = bm.player.energy
+        specs: Dict[str, int] = {}
+        for i, c in enumerate(bm.pdeck.hand):
+            if c.cost <= energy and c.spec_id not in specs:
+                specs[c.spec_id] = i
+        new: List[_Node] = []
+        first = True
+        for spec_id, idx in specs.items():
+            if not first:
+                bm.restore(node.state)
+            first = False
+            bm.play_player_card(idx)
+            state = bm.snapshot()
+            key = state.key()
+            child = self._table.get(key)
+            if child is None:
+                child = self._make_node(bm, state, key)
+                new.append(child)
+            node.children[spec_id] = child
+        return new, len(specs)
@@ -0,0 +1,361 @@
+# simulate.py
+"""
+ヘッドレス戦闘シミュレータ（バランス調整用）
+
+- BattleManager を UI / input ループなしで最後まで回す
+- プレイヤーの意思決定は policy（差し替え可能）に委譲
+- ログ出力なし・1戦ごとに seed 指定で再現可能
+- rng_kind="counter" で CounterRNG を使う（rng.py）
+- enemy で敵の種類（data.ENEMY_SPECS のキー）を選ぶ。HP は enemy_hp が優先
+- 一括実行（run_batch など）は BattleRunner で BattleManager を使い回し、1戦ごとに reset する
+- 純 Python のこの経路は1コアで 1万戦/秒 弱が上限（スターターで約8千戦/秒）。
+  数万戦/秒以上が要るときは vector_sim（NumPy 一括版、ops だけのカードプール）を使う
+"""
+
+from __future__ import annotations
+import hashlib
+import random
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from battle import BattleManager
+from battle_deck import BattleDeck
+from master_deck import MasterDeck
+from enemy_ai import DEFAULT_ENEMY, make_enemy
+from model import CardInstance, Player
+from rng import BattleRNG, make_rng
+
+# policy(bm) -> 出すカードの手札 index / None ならターン終了
+Policy = Callable[[BattleManager], Optional[int]]
+
+# spec_id -> [使用回数, 払ったエナジー, 与えたダメージ（敵HPの減少）]
+CardStats = Dict[str, List[int]]
+
+# 行動列（replay.py）でターン終了を表すバイト。それ以外のバイトは手札 index
+END_TURN = 0xFF
+
+
+class GameResult(NamedTuple):
+    """1戦ぶんのコンパクトな結果。"""
+    seed: int
+    winner: str          # "player" / "enemy" / "draw" / "timeout"
+    turns: int
+    player_hp: int
+    enemy_hp: int        # 敵が複数なら残りHPの合計
+    cards_played: int
+
+
+# =========================
+# 標準 policy
+# =========================
+
+def greedy_policy(bm: BattleManager) -> Optional[int]:
+    """手札の先頭から「払えるカード」を順に出すだけの最小 policy。"""
+    energy = bm.player.energy
+    for i, c in enumerate(bm.pdeck.hand):
+        if c.cost <= energy:
+            return i
+    return None
+
+
+def make_random_policy(rng: random.Random) -> Policy:
+    """払えるカードからランダムに1枚選ぶ policy（1/(n+1) でターン終了）。"""
+    def policy(bm: BattleManager) -> Optional[int]:
+        energy = bm.player.energy
+        playable = [i for i, c in enumerate(bm.pdeck.hand) if c.cost <= energy]
+        if not playable:
+            return None
+        k = rng.randrange(len(playable) + 1)
+        return playable[k] if k < len(playable) else None
+    return policy
+
+
+def policy_key(policy: Any) -> Dict[str, Any]:
+    """
+    policy の識別子。関数なら「モジュール.名前」。
+    呼び出し可能オブジェクトはクラス名に cache_params()（無ければ repr）を添える。
+    定義しているモジュールのソースのハッシュも入れる（評価関数などを直したら別のキーになる）。
+    """
+    name = getattr(policy, "__qualname__", None) or type(policy).__qualname__
+    module = getattr(policy, "__module__", None) or type(policy).__module__
+    hook = getattr(policy, "cache_params", None)
+    if callable(hook):
+        params: Any = hook()
+    elif hasattr(policy, "__qualname__"):
+        params = None
+    else:
+        params = repr(policy)
+    return {"name": f"{module}.{name}", "params": params, "source": module_source_hash(module)}
+
+
+_SOURCE_HASHES: Dict[str, Optional[str]] = {}
+
+
+def module_source_hash(module: str) -> Optional[str]:
+    """読み込み済みモジュールのソースファイルの短いハッシュ（ファイルが無ければ None）。プロセス内で1回だけ読む。"""
+    if module in _SOURCE_HASHES:
+        return _SOURCE_HASHES[module]
+    path = getattr(sys.modules.get(module), "__file__", None)
+    digest = None
+    if path:
+        try:
+            with open(path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        except OSError:
+            pass
+    _SOURCE_HASHES[module] = digest
+    return digest
+
+
+# =========================
+# 1戦
+# =========================
+
+def run_battle(
+    card_ids: Sequence[str],
+    seed: int,
+    policy: Policy = greedy_policy,
+    *,
+    player_hp: int = 40,
+    enemy_hp: int = 35,
+    max_energy: int = 3,
+    hand_size: int = 5,
+    max_turns: int = 100,
+    enemy: str = DEFAULT_ENEMY,
+    rng_kind: str = "mt",
+) -> GameResult:
+    """
+    1戦をログなしで最後まで回して結果を返す。
+    進行は main_tk.BattleApp と同じ順序：
+        start_battle → (start_turn → カード使用* → end_turn → enemy_act)*
+    """
+    cards = MasterDeck(card_ids).instantiate()
+    return _play_out(
+        cards, seed, policy, make_rng(seed, rng_kind),
+        player_hp=player_hp, enemy_hp=enemy_hp, max_energy=max_energy,
+        hand_size=hand_size, max_turns=max_turns, enemy=enemy,
+    )
+
+
+def _play_out(
+    cards: List[CardInstance],
+    seed: int,
+    policy: Policy,
+    rng: BattleRNG,
+    *,
+    player_hp: int = 40,
+    enemy_hp: int = 35,
+    max_energy: int = 3,
+    hand_size: int = 5,
+    max_turns: int = 100,
+    enemy: str = DEFAULT_ENEMY,
+    card_stats: Optional[CardStats] = None,
+    actions: Optional[bytearray] = None,
+) -> GameResult:
+    """
+    card_stats を渡すと、カードを出すたびに spec_id ごとの使用回数・エナジー・ダメージを足し込む。
+    actions を渡すと、出した手札 index と END_TURN(0xFF) を1バイトずつ追記する（replay.py）。
+    何戦も回すときは BattleRunner を使い回す（こちらは1戦ごとに組み立てる）。
+    """
+    runner = BattleRunner(
+        cards, rng, player_hp=player_hp, enemy_hp=enemy_hp, max_energy=max_energy,
+        hand_size=hand_size, max_turns=max_turns, enemy=enemy,
+    )
+    return runner.play(seed, policy, card_stats=card_stats, actions=actions)
+
+
+class BattleRunner:
+    """
+    同じデッキ・同じ敵の戦闘を seed だけ変えて何度も回す（run_batch などの一括用）。
+
+    BattleManager・EventLog・敵の行動表とデッキは最初の1戦で1回だけ組み立て、
+    2戦目からは rng を seed し直して BattleManager.reset でその場で戻す。
+    シャッフルの順序は組み立て直したときと同じなので、結果は _play_out と1戦ずつ一致する。
+    ログは付けない（logger=None なので events.on は False のまま、イベントは作られない）。
+    """
+
+    __slots__ = ("cards", "rng", "player_hp", "enemy_hp", "max_energy", "hand_size",
+                 "max_turns", "enemy", "bm")
+
+    def __init__(
+        self,
+        cards: List[CardInstance],
+        rng: BattleRNG,
+        *,
+        player_hp: int = 40,
+        enemy_hp: int = 35,
+        max_energy: int = 3,
+        hand_size: int = 5,
+        max_turns: int = 100,
+        enemy: str = DEFAULT_ENEMY,
+    ):
+        # CardInstance は戦闘中に書き換えられないので、同じリストを使い回してよい
+        self.cards = cards
+        self.rng = rng
+        self.player_hp = player_hp
+        self.enemy_hp = enemy_hp
+        self.max_energy = max_energy
+        self.hand_size = hand_size
+        self.max_turns = max_turns
+        self.enemy = enemy
+        self.bm: Optional[BattleManager] = None
+
+    def play(
+        self,
+        seed: int,
+        policy: Policy,
+        *,
+        card_stats: Optional[CardStats] = None,
+        actions: Optional[bytearray] = None,
+    ) -> GameResult:
+        # rng は呼び出し側の使い回し。seed で毎戦リセットする
+        self.rng.seed(seed)
+        bm = self.bm
+        if bm is None:
+            bm = self.bm = self._build()
+        else:
+            bm.reset()
+        return play_battle(bm, seed, policy, max_turns=self.max_turns,
+                           card_stats=card_stats, actions=actions)
+
+    def _build(self) -> BattleManager:
+        rng = self.rng
+        player = Player("player", max_hp=self.player_hp)
+        pdeck = BattleDeck(self.cards, rng)
+        foe, edeck = make_enemy(self.enemy, rng, hp=self.enemy_hp, name="enemy")
+        bm = BattleManager(
+            player, foe, pdeck, edeck,
+            max_energy=self.max_energy, hand_size=self.hand_size, rng=rng,
+        )
+        bm.logger = None
+        return bm
+
+
+def play_battle(
+    bm: BattleManager,
+    seed: int,
+    policy: Policy,
+    *,
+    max_turns: int = 100,
+    card_stats: Optional[CardStats] = None,
+    actions: Optional[bytearray] = None,
+) -> GameResult:
+    """
+    組み立て済みの BattleManager を最後まで回す（敵が何体でもよい。encounter.py の連戦もこれを使う）。
+    card_stats のダメージは敵全体の HP の減少。
+    """
+    player, pdeck = bm.player, bm.pdeck
+    played = 0
+    bm.start_battle()
+    bm.start_turn()
+    while True:
+        # --- プレイヤーターン ---
+        while True:
+            idx = policy(bm)
+            if idx is None:
+                break
+            before = len(pdeck.hand)
+            if actions is not None:
+                actions.append(idx)
+            if card_stats is not None and 0 <= idx < before:
+                sid = pdeck.hand[idx].spec_id
+                energy0, hp0 = player.energy, bm.enemy_hp_total()
+            bm.play_player_card(idx)
+            ok = bm.last_play_ok
+            if ok:
+                played += 1
+                if card_stats is not None:
+                    cs = card_stats.get(sid)
+                    if cs is None:
+                        cs = card_stats[sid] = [0, 0, 0]
+                    cs[0] += 1
+                    cs[1] += energy0 - player.energy
+                    cs[2] += hp0 - bm.enemy_hp_total()
+            if player.hp <= 0 or (bm.enemy.hp <= 0 and bm.enemies_down()):
+                return _result(seed, bm, played)
+            if not ok:
+                # 出せなかった（エナジー不足など）→ 無限ループ防止でターン終了
+                break
+
+        if actions is not None:
+            actions.append(END_TURN)
+        bm.end_turn()
+
+        # --- 敵ターン ---
+        bm.enemy_act()
+        if player.hp <= 0 or (bm.enemy.hp <= 0 and bm.enemies_down()):
+            return _result(seed, bm, played)
+        if bm.turn > max_turns:
+            return GameResult(seed, "timeout", bm.turn - 1, player.hp, bm.enemy_hp_total(), played)
+
+        bm.start_turn()
+
+
+def _result(seed: int, bm: BattleManager, played: int) -> GameResult:
+    p = bm.player
+    down = bm.enemies_down()
+    if p.hp <= 0 and down:
+        winner = "draw"
+    elif p.hp <= 0:
+        winner = "enemy"
+    else:
+        winner = "player"
+    return GameResult(seed, winner, bm.turn, p.hp, bm.enemy_hp_total(), played)
+
+
+# =========================
+# 複数戦
+# =========================
+
+def run_batch(
+    card_ids: Sequence[str],
+    seeds: Iterable[int],
+    policy: Policy = greedy_policy,
+    *,
+    rng_kind: str = "mt",
+    **kwargs,
+) -> Iterator[GameResult]:
+    """seed ごとに1戦ずつ回して結果を順に返す（カード実体化と BattleManager の組み立ては最初の1回だけ）。"""
+    runner = BattleRunner(MasterDeck(card_ids).instantiate(), make_rng(0, rng_kind), **kwargs)
+    for seed in seeds:
+        yield runner.play(seed, policy)
+
+
+def summarize(results: Iterable[GameResult]) -> dict:
+    """勝率・平均ターン数などの簡易集計。"""
+    n = wins = turns = hp = 0
+    for r in results:
+        n += 1
+        turns += r.turns
+        if r.winner == "player":
+            wins += 1
+            hp += r.player_hp
+    if n == 0:
+        return {"games": 0, "win_rate": 0.0, "avg_turns": 0.0, "avg_hp_left": 0.0}
+    return {
+        "games": n,
+        "win_rate": wins / n,
+        "avg_turns": turns / n,
+        "avg_hp_left": hp / wins if wins else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from profiling import PROFILER
+    from starter_decks import make_starter_deck
+
+    ids: List[str] = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    n = 20000
+    if "--profile" in sys.argv:
+        with PROFILER:
+            list(run_batch(ids, range(2000)))
+        print(PROFILER.report())
+        sys.exit(0)
+    for kind in ("mt", "counter"):
+        t0 = time.perf_counter()
+        res = list(run_batch(ids, range(n), rng_kind=kind))
+        dt = time.perf_counter() - t0
+        print(kind, summarize(res))
+        print(f"{n} battles in {dt:.2f}s ({n / dt:,.0f} battles/s)")
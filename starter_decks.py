@@ -1,17 +1,10 @@
 # starter_decks.py
 from typing import List
 from model import CardInstance
-from data import CARD_SPECS
+from card_table import card_for
 
 def make_card(spec_id: str) -> CardInstance:
-    spec = CARD_SPECS[spec_id]
-    return CardInstance(
-        spec_id=spec_id,
-        cost=spec["cost"],
-        power=spec["power"],
-        card_type=spec["card_type"],
-        tags=list(spec.get("tags", [])),
-    )
+    return card_for(spec_id)
 
 def make_starter_deck(faction: str) -> List[CardInstance]:
     f = faction.upper()
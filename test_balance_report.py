@@ -0,0 +1,79 @@
+# test_balance_report.py
+"""
+balance_report のディスクキャッシュの回帰テスト（python -m pytest -q / python -m unittest）
+
+- 2回目は全部キャッシュから（戦闘0）、結果も同じ
+- 1枚の spec を変えると、そのカードを含む対戦だけ回し直す
+- policy（定義モジュールのソースを含む）や戦闘条件が変わればキャッシュは当たらない
+- --games を BLOCK 単位で増やしたときは、埋まっているブロックを使い回す
+"""
+
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from balance_report import BLOCK, ResultCache, balance_report
+import simulate
+from data import CARD_SPECS
+from simulate import make_random_policy
+from starter_decks import make_starter_deck
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+CARDS = ["S12", "S22"]     # どちらもスターターに入っていないカード
+N = 100
+KW = dict(master_seed=3, workers=1, enemy_hp=80)
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _report(self, **kw):
+        return balance_report(STARTER, CARDS, N, cache=self.cache, **dict(KW, **kw))
+
+    def test_second_run_hits(self):
+        base, rows, ran = self._report()
+        self.assertEqual(ran, N * (1 + len(CARDS)))
+        base2, rows2, ran2 = self._report()
+        self.assertEqual(ran2, 0)
+        self.assertEqual(self.cache.hits, 1 + len(CARDS))
+        self.assertEqual(base2, base)
+        self.assertEqual(rows2, rows)
+
+    def test_spec_edit_reruns_only_that_card(self):
+        self._report()
+        edited = dict(CARD_SPECS["S12"], desc=CARD_SPECS["S12"]["desc"] + "（調整）")
+        with mock.patch.dict(CARD_SPECS, {"S12": edited}):
+            _, _, ran = self._report()
+        self.assertEqual(ran, N)
+        _, _, ran = self._report()     # 元に戻せば前のキャッシュがまた当たる
+        self.assertEqual(ran, 0)
+
+    def test_conditions_change_key(self):
+        self._report()
+        _, _, ran = self._report(enemy_hp=90)
+        self.assertEqual(ran, N * (1 + len(CARDS)))
+        _, _, ran = self._report(policy=make_random_policy(random.Random(0)))
+        self.assertEqual(ran, N * (1 + len(CARDS)))
+
+    def test_policy_source_edit_reruns(self):
+        self._report()
+        # greedy_policy を定義している simulate.py を書き換えたことにする
+        with mock.patch.dict(simulate._SOURCE_HASHES, {"simulate": "edited"}):
+            _, _, ran = self._report()
+        self.assertEqual(ran, N * (1 + len(CARDS)))
+
+    def test_blocks_are_reused_when_games_grow(self):
+        balance_report(STARTER, [], BLOCK, cache=self.cache, **KW)
+        _, _, ran = balance_report(STARTER, [], BLOCK + N, cache=self.cache, **KW)
+        self.assertEqual(ran, N)
+
+
+if __name__ == "__main__":
+    unittest.main()
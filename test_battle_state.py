@@ -0,0 +1,101 @@
+# test_battle_state.py
+"""
+BattleState（snapshot / restore）の回帰テスト（python -m pytest -q / python -m unittest）
+
+- snapshot → 進める → restore で元の局面に戻り、そこから先の展開も1回目と同じ
+- 同じ snapshot から何度でも戻せる
+- key() は敵の行動回数・rng の状態だけが違う局面を区別する
+"""
+
+import unittest
+
+from battle import BattleManager
+from battle_deck import BattleDeck
+from enemy_ai import make_enemy
+from master_deck import MasterDeck
+from model import Player
+from rng import make_rng
+from simulate import greedy_policy
+from starter_decks import make_starter_deck
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")] + ["S32", "S16"]
+
+
+def _make_bm(enemy: str, seed: int = 1) -> BattleManager:
+    rng = make_rng(seed)
+    pdeck = BattleDeck(MasterDeck(STARTER).instantiate(), rng)
+    foe, edeck = make_enemy(enemy, rng, hp=60, name="enemy")
+    bm = BattleManager(Player("player", max_hp=40), foe, pdeck, edeck, rng=rng)
+    bm.logger = None
+    bm.start_battle()
+    bm.start_turn()
+    return bm
+
+
+def _advance(bm: BattleManager, turns: int) -> list:
+    """greedy で turns ターン進め、毎ターンの観測値を返す。"""
+    trace = []
+    for _ in range(turns):
+        while True:
+            idx = greedy_policy(bm)
+            if idx is None:
+                break
+            bm.play_player_card(idx)
+            if not bm.last_play_ok:
+                break
+        bm.end_turn()
+        bm.enemy_act()
+        over, _ = bm.is_battle_over()
+        trace.append((bm.turn, bm.player.hp, bm.player.block, bm.enemy_hp_total(),
+                      [c.spec_id for c in bm.pdeck.draw_pile]))
+        if over:
+            break
+        bm.start_turn()
+    return trace
+
+
+class SnapshotRestoreTest(unittest.TestCase):
+
+    def test_restore_replays_the_same_future(self):
+        for enemy in ("DEFAULT", "SAMURAI_SCRIPTED", "RIVAL_DECK"):
+            with self.subTest(enemy=enemy):
+                bm = _make_bm(enemy)
+                _advance(bm, 2)
+                state = bm.snapshot()
+                key = state.key()
+                first = _advance(bm, 4)
+                self.assertNotEqual(bm.snapshot().key(), key)
+                for _ in range(2):
+                    bm.restore(state)
+                    self.assertEqual(bm.snapshot().key(), key)
+                    self.assertEqual(_advance(bm, 4), first)
+
+    def test_restore_keeps_pile_identity(self):
+        bm = _make_bm("DEFAULT")
+        hand = bm.pdeck.hand
+        state = bm.snapshot()
+        bm.play_player_card(0)
+        bm.restore(state)
+        self.assertIs(bm.pdeck.hand, hand)
+        self.assertEqual(len(hand), len(state.pdeck.hand))
+
+
+class KeyTest(unittest.TestCase):
+
+    def test_key_tracks_enemy_turn_index(self):
+        bm = _make_bm("SAMURAI_SCRIPTED")
+        state = bm.snapshot()
+        bm.enemy.turn_index += 1
+        self.assertNotEqual(bm.snapshot().key(), state.key())
+
+    def test_key_tracks_rng_state(self):
+        bm = _make_bm("DEFAULT")
+        state = bm.snapshot()
+        bm.rng.random()
+        self.assertNotEqual(bm.snapshot().key(), state.key())
+        self.assertEqual(bm.snapshot(include_rng=False).key(),
+                         _make_bm("DEFAULT").snapshot(include_rng=False).key())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+# test_buff_store.py
+"""
+BuffStore の回帰テスト（python -m pytest -q / python -m unittest）
+
+- 同じ kind・同じ期限はまとめて power 合算・stacks を数える（期限が違えば別エントリ）
+- tick で期限切れのものだけ消え、totals / listeners / mods も追従する
+- 0T のバフは次の tick まで残る
+- copy() は元と独立、旧形式の dict リストからも組み立てられる
+"""
+
+import unittest
+
+from buff_store import BuffStore
+from model import BuffKind, Trigger
+
+WEAK, COUNTER = int(BuffKind.WEAK), int(BuffKind.COUNTER)
+CALC, HIT = int(Trigger.ON_ATTACK_CALC), int(Trigger.ON_HIT)
+
+
+class MergeTest(unittest.TestCase):
+
+    def test_same_kind_and_expiry_merge(self):
+        s = BuffStore()
+        a = s.add(COUNTER, 3, 2, HIT)
+        b = s.add(COUNTER, 4, 2, HIT)
+        self.assertIs(a, b)
+        self.assertEqual((a.power, a.stacks), (7, 2))
+        self.assertEqual(len(s), 1)
+        self.assertEqual(s.total(COUNTER), 7)
+        self.assertEqual(s.listeners[HIT], {COUNTER: 1})
+
+    def test_different_expiry_kept_apart(self):
+        s = BuffStore()
+        s.add(COUNTER, 3, 1, HIT)
+        s.add(COUNTER, 4, 2, HIT)
+        self.assertEqual(len(s), 2)
+        self.assertEqual(s.total(COUNTER), 7)
+        self.assertEqual(s.listeners[HIT], {COUNTER: 2})
+
+
+class ExpiryTest(unittest.TestCase):
+
+    def test_tick_removes_only_expired(self):
+        s = BuffStore()
+        s.add(COUNTER, 3, 1, HIT)
+        s.add(COUNTER, 4, 2, HIT)
+        s.add(WEAK, 2, 3, CALC)
+        s.tick()
+        self.assertEqual(s.total(COUNTER), 4)
+        self.assertEqual(s.listeners[HIT], {COUNTER: 1})
+        s.tick()
+        self.assertEqual(s.total(COUNTER), 0)
+        self.assertEqual(s.listeners[HIT], {})
+        self.assertEqual([b.kind for b in s], [WEAK])
+        s.tick()
+        self.assertFalse(s)
+        self.assertEqual(s.totals, {})
+        self.assertEqual(s.expiry, {})
+
+    def test_zero_turn_lasts_until_next_tick(self):
+        s = BuffStore()
+        s.add(WEAK, 1, 0, CALC)
+        self.assertEqual(s.total(WEAK), 1)
+        s.tick()
+        self.assertEqual(s.total(WEAK), 0)
+
+    def test_mods_cache_reset_on_attack_calc_changes(self):
+        s = BuffStore()
+        s.mods = (1.0, 0)
+        s.add(COUNTER, 1, 1, HIT)
+        self.assertIsNotNone(s.mods)
+        s.add(WEAK, 1, 1, CALC)
+        self.assertIsNone(s.mods)
+        s.mods = (1.0, 0)
+        s.tick()
+        self.assertIsNone(s.mods)
+
+    def test_clear_resets_clock(self):
+        s = BuffStore()
+        s.add(WEAK, 1, 2, CALC)
+        s.tick()
+        s.clear()
+        self.assertEqual((s.now, len(s), s.totals), (0, 0, {}))
+
+
+class CopyTest(unittest.TestCase):
+
+    def test_copy_is_independent(self):
+        s = BuffStore()
+        s.add(COUNTER, 3, 2, HIT)
+        c = s.copy()
+        s.add(COUNTER, 5, 2, HIT)
+        s.tick()
+        s.tick()
+        self.assertEqual(c.now, 0)
+        self.assertEqual(c.total(COUNTER), 3)
+        self.assertEqual([(b.power, b.stacks) for b in c], [(3, 1)])
+
+    def test_legacy_dicts(self):
+        s = BuffStore([{"kind": "WEAK", "power": 2, "turns": 1, "trigger": "on_attack_calc"}])
+        self.assertEqual(s.total(WEAK), 2)
+        self.assertEqual(s.listeners[CALC], {WEAK: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
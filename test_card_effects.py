@@ -0,0 +1,130 @@
+# test_card_effects.py
+"""
+card_effects のバフ発動の回帰テスト（python -m pytest -q / python -m unittest）
+
+- COUNTER（ON_HIT）：殴ってきた相手に反撃。source なし・倒れた持ち主では発動しない
+- WEAK（ON_ATTACK_CALC）：与ダメージを段数ぶん減らす（0 未満にはならない）。切れたら元に戻る
+- S32（TRIG_BLOCK_RECOVER）：Block で受けるたびに Block+1（Block が無ければ発動しない）
+- 上の3つをカード（S16 / S9 / S32）から付けても同じように発動する
+"""
+
+import unittest
+
+from battle import BattleManager
+from battle_deck import BattleDeck
+from card_effects import add_buff, calc_attack_damage, tick_buffs
+from card_table import card_for
+from enemy_ai import make_enemy
+from model import BuffKind, Enemy, Player
+from rng import make_rng
+
+
+def _actors():
+    return Player("player", max_hp=40), Enemy("enemy", max_hp=30)
+
+
+def _bm_with_hand(*spec_ids: str) -> BattleManager:
+    rng = make_rng(0)
+    foe, edeck = make_enemy("DEFAULT", rng, hp=30, name="enemy")
+    bm = BattleManager(Player("player", max_hp=40), foe, BattleDeck([], rng), edeck, rng=rng)
+    bm.logger = None
+    bm.start_battle()
+    bm.start_turn()
+    bm.pdeck.hand[:] = [card_for(sid) for sid in spec_ids]
+    return bm
+
+
+class CounterTest(unittest.TestCase):
+
+    def test_counter_hits_source(self):
+        p, e = _actors()
+        add_buff(p, "COUNTER", 2, 1, "on_hit")
+        p.block = 3
+        self.assertEqual(p.take_damage(5, e), 2)
+        self.assertEqual((p.hp, p.block, e.hp), (38, 0, 28))
+        p.take_damage(1, e)         # Block で受けきっても反撃する（1ヒットごと）
+        self.assertEqual(e.hp, 26)
+
+    def test_no_counter_without_source_or_when_down(self):
+        p, e = _actors()
+        add_buff(p, "COUNTER", 2, 1, "on_hit")
+        p.take_damage(5)
+        self.assertEqual(e.hp, 30)
+        p.take_damage(100, e)
+        self.assertEqual((p.hp, e.hp), (0, 30))
+
+    def test_counter_expires(self):
+        p, e = _actors()
+        add_buff(p, "COUNTER", 2, 1, "on_hit")
+        tick_buffs(p)
+        p.take_damage(5, e)
+        self.assertEqual(e.hp, 30)
+
+
+class WeakTest(unittest.TestCase):
+
+    def test_weak_reduces_damage(self):
+        p, e = _actors()
+        self.assertEqual(calc_attack_damage(e, p, 6), 6)
+        add_buff(e, "WEAK", 2, 2, "on_attack_calc")
+        self.assertEqual(calc_attack_damage(e, p, 6), 4)
+        self.assertEqual(calc_attack_damage(e, p, 1), 0)
+        add_buff(e, "WEAK", 1, 1, "on_attack_calc")
+        self.assertEqual(calc_attack_damage(e, p, 6), 3)
+        tick_buffs(e)
+        self.assertEqual(calc_attack_damage(e, p, 6), 4)
+        tick_buffs(e)
+        self.assertEqual(calc_attack_damage(e, p, 6), 6)
+
+
+class BlockRecoverTest(unittest.TestCase):
+
+    def test_recover_on_absorb(self):
+        p, e = _actors()
+        add_buff(p, "TRIG_BLOCK_RECOVER", 1, 1, "on_hit")
+        p.block = 4
+        p.take_damage(3, e)
+        self.assertEqual(p.block, 2)
+        p.take_damage(5, e)         # 残り2を吸収 → 0 → +1
+        self.assertEqual((p.block, p.hp), (1, 37))
+
+    def test_no_recover_without_block(self):
+        p, e = _actors()
+        add_buff(p, "TRIG_BLOCK_RECOVER", 1, 1, "on_hit")
+        p.take_damage(3, e)
+        self.assertEqual((p.block, p.hp), (0, 37))
+
+
+class CardTest(unittest.TestCase):
+
+    def test_s16_counter(self):
+        bm = _bm_with_hand("S16")
+        bm.play_player_card(0)
+        p, e = bm.player, bm.enemy
+        self.assertEqual(p.block, 6)
+        self.assertEqual(p.buffs.total(BuffKind.COUNTER), 1)
+        hp = e.hp
+        p.take_damage(4, e)
+        self.assertEqual(e.hp, hp - 1)
+
+    def test_s9_weak(self):
+        bm = _bm_with_hand("S9")
+        p, e = bm.player, bm.enemy
+        hp = e.hp
+        bm.play_player_card(0)
+        self.assertEqual(e.hp, hp - 6)
+        self.assertEqual(e.buffs.total(BuffKind.WEAK), 1)
+        self.assertEqual(calc_attack_damage(e, p, 6), 5)
+
+    def test_s32_block_recover(self):
+        bm = _bm_with_hand("S32", "S16")
+        bm.play_player_card(0)
+        bm.play_player_card(0)
+        p, e = bm.player, bm.enemy
+        hp = e.hp
+        p.take_damage(4, e)         # Block 6 → 2 → +1、反撃1
+        self.assertEqual((p.block, p.hp, e.hp), (3, 40, hp - 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
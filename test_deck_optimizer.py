@@ -0,0 +1,55 @@
+# test_deck_optimizer.py
+"""
+deck_optimizer の適応度キャッシュの回帰テスト（python -m pytest -q / python -m unittest）
+
+- 続きから足した SimStats が、最初からまとめて回したものと一致する（並び順の違うデッキも同じキー）
+- 別の対戦条件（policy や戦闘パラメータ）で evaluate すると ValueError
+"""
+
+import unittest
+
+from deck_optimizer import FitnessCache, canonical, successive_halving
+from simulate import make_random_policy
+from starter_decks import make_starter_deck
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+OTHER = STARTER[1:] + ["S9"]
+SIM = dict(master_seed=7, workers=1, enemy_hp=80)
+
+
+class FitnessCacheTest(unittest.TestCase):
+
+    def test_resume_equals_fresh_run(self):
+        a, b = canonical(STARTER), canonical(OTHER)
+        resumed = FitnessCache()
+        self.assertEqual(resumed.evaluate([a], 40, **SIM), 40)
+        self.assertEqual(resumed.evaluate([canonical(reversed(STARTER)), b], 100, **SIM), 160)
+        self.assertEqual(resumed.evaluate([a, b], 60, **SIM), 0)
+        fresh = FitnessCache()
+        fresh.evaluate([a, b], 100, **SIM)
+        self.assertEqual(len(resumed), 2)
+        self.assertEqual(resumed.get(a), fresh.get(a))
+        self.assertEqual(resumed.get(b), fresh.get(b))
+
+    def test_changed_params_rejected(self):
+        cache = FitnessCache()
+        key = canonical(STARTER)
+        cache.evaluate([key], 20, **SIM)
+        cache.evaluate([key], 20, **dict(SIM, workers=2))   # 結果に効かない引数は同じ条件
+        with self.assertRaises(ValueError):
+            cache.evaluate([key], 40, **dict(SIM, enemy_hp=90))
+        with self.assertRaises(ValueError):
+            cache.evaluate([key], 40, **dict(SIM, policy=make_random_policy))
+        self.assertEqual(cache.games(key), 20)
+
+    def test_halving_reuses_cache(self):
+        cache = FitnessCache()
+        keys = [canonical(STARTER), canonical(OTHER)]
+        ranked = successive_halving(keys, cache, min_games=30, eta=2, max_games=60, **SIM)
+        self.assertEqual(len(ranked), 1)
+        self.assertEqual(ranked[0][1].games, 60)
+        self.assertEqual(cache.evaluate(keys, 30, **SIM), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
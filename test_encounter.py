@@ -0,0 +1,114 @@
+# test_encounter.py
+"""
+encounter（複数の敵・連戦）の回帰テスト（python -m pytest -q / python -m unittest）
+
+- 敵 N 体：aid 順の配列、同じ種類には A, B… の名前、対象が倒れたら次の敵へ、倒れた敵は行動しない
+- 連戦：HP を持ち越して勝つたびに heal だけ回復、reward のカードを MasterDeck に足す、負けたら終わり
+- run_batch_runs / run_runs_parallel はランを1つずつ回したものと一致
+"""
+
+import unittest
+from unittest import mock
+
+from card_table import card_for
+from data import ENEMY_SPECS, RUN_SPECS
+from encounter import (RunStats, make_battle, run_batch_runs, run_encounter,
+                       run_runs_parallel)
+from master_deck import MasterDeck
+from model import Player
+from parallel_sim import derive_seed
+from rng import make_rng
+from simulate import greedy_policy, play_battle
+from starter_decks import make_starter_deck
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+
+TEST_RUN = {
+    "name": "テスト",
+    "heal": 5,
+    "fights": [
+        {"enemies": ["ASHIGARU_RAIDER"], "reward": ["S9"]},
+        {"enemies": ["DEFAULT", "ASHIGARU_RAIDER"], "reward": ["S16", "S12"]},
+        {"enemies": ["ASHIGARU_RAIDER", "ASHIGARU_RAIDER"]},
+    ],
+}
+
+
+class MultiEnemyTest(unittest.TestCase):
+
+    def _bm(self, enemy_ids):
+        bm = make_battle(Player("player", max_hp=40), MasterDeck(STARTER).instantiate(),
+                         enemy_ids, make_rng(1))
+        bm.logger = None
+        return bm
+
+    def test_actor_arrays_and_names(self):
+        bm = self._bm(["ASHIGARU_RAIDER", "DEFAULT", "ASHIGARU_RAIDER"])
+        self.assertEqual([a.aid for a in bm.actors], [0, 1, 2, 3])
+        self.assertEqual(len(bm.decks), len(bm.actors))
+        base = ENEMY_SPECS["ASHIGARU_RAIDER"].get("name", "ASHIGARU_RAIDER")
+        self.assertEqual([e.name for e in bm.enemies][::2], [base + "A", base + "B"])
+        self.assertIs(bm.enemy, bm.actors[1])
+
+    def test_retarget_and_dead_enemies_skip(self):
+        bm = self._bm(["DEFAULT", "DEFAULT"])
+        bm.start_battle()
+        bm.start_turn()
+        first, second = bm.enemies
+        first.hp = 1
+        bm.pdeck.hand[:] = [card_for("S9")]
+        bm.play_player_card(0)
+        self.assertEqual(first.hp, 0)
+        self.assertIs(bm.enemy, second)
+        bm.end_turn()
+        bm.enemy_act()
+        self.assertEqual((first.turn_index, second.turn_index), (0, 1))
+
+    def test_win_means_all_down(self):
+        wins = 0
+        for seed in range(20):
+            bm = self._bm(["DEFAULT", "ASHIGARU_RAIDER"])
+            r = play_battle(bm, seed, greedy_policy)
+            if r.winner == "player":
+                self.assertTrue(all(e.hp == 0 for e in bm.enemies))
+                self.assertEqual(r.enemy_hp, 0)
+                wins += 1
+        self.assertTrue(wins)
+
+
+@mock.patch.dict(RUN_SPECS, {"TEST": TEST_RUN})
+class RunTest(unittest.TestCase):
+
+    def test_hp_carries_over_and_rewards_apply(self):
+        cleared = lost = 0
+        for seed in range(60):
+            r = run_encounter(STARTER, seed, run="TEST", player_hp=30)
+            self.assertEqual(r.hp_before[0], 30)
+            self.assertEqual(len(r.hp_before), len(r.fights))
+            for i in range(1, len(r.fights)):
+                self.assertEqual(r.hp_before[i], min(30, r.fights[i - 1].player_hp + 5))
+            self.assertTrue(all(f.winner == "player" for f in r.fights[:-1]))
+            won = r.fights_won
+            rewards = [sid for f in TEST_RUN["fights"][:won] for sid in f.get("reward", ())]
+            self.assertEqual(sorted(r.card_ids), sorted(STARTER + rewards))
+            self.assertEqual(r.cleared, won == len(TEST_RUN["fights"]))
+            if r.cleared:
+                cleared += 1
+                self.assertEqual(r.player_hp, min(30, r.fights[-1].player_hp + 5))
+            else:
+                lost += 1
+        self.assertTrue(cleared and lost)   # 両方の経路を通っている
+
+    def test_batch_and_parallel_match_single_runs(self):
+        seeds = [derive_seed(9, i) for i in range(40)]
+        single = [run_encounter(STARTER, s, run="TEST") for s in seeds]
+        self.assertEqual(list(run_batch_runs(STARTER, seeds, run="TEST")), single)
+        expected = RunStats("TEST")
+        for r in single:
+            expected.add(r)
+        got = run_runs_parallel(STARTER, 40, master_seed=9, workers=1, chunk_size=15, run="TEST")
+        self.assertEqual(got, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+# test_exact_solver.py
+"""
+ExactSolver の回帰テスト（python -m pytest -q / python -m unittest）
+
+- 小さいデッキで、正規化・転置表・多変量超幾何の分岐を使わない素朴な全探索と勝率が一致する
+  （全探索はカードを1枚ずつ区別して出し、手札補充も1枚ずつ 1/山札枚数 で引く）
+- 手番中にカードを引くデッキ・deck 型の敵は ValueError
+"""
+
+import unittest
+
+from battle import BattleManager
+from battle_deck import BattleDeck
+from card_table import card_for
+from enemy_ai import make_enemy
+from exact_solver import ExactSolver, _FixedChoice
+from model import Player
+
+# (デッキ, 敵, 設定)。どれも勝率が 0 と 1 の間になる小さい局面
+CASES = [
+    (["S4", "S9", "S16", "S1"], "DEFAULT",
+     dict(player_hp=6, enemy_hp=12, hand_size=2, max_turns=2)),
+    (["S1", "S2", "S2", "S3"], "SAMURAI_SCRIPTED",
+     dict(player_hp=4, enemy_hp=12, hand_size=2, max_turns=3)),
+    (["S4", "S9", "S16", "S1"], "SAMURAI_SCRIPTED",
+     dict(player_hp=6, enemy_hp=12, hand_size=2, max_turns=3)),
+]
+
+
+class _BruteForce:
+    """ExactSolver と同じルールの expectimax を、メモ化も局面の正規化もせずに回す。"""
+
+    def __init__(self, card_ids, enemy, branches, *, player_hp, enemy_hp, hand_size, max_turns):
+        self.rng = _FixedChoice()
+        self.branches = branches
+        self.hand_size = hand_size
+        self.max_turns = max_turns
+        foe, edeck = make_enemy(enemy, hp=enemy_hp, name="enemy")
+        self.bm = BattleManager(Player("player", max_hp=player_hp), foe, BattleDeck([]), edeck,
+                                hand_size=hand_size, rng=self.rng)
+        self.bm.logger = None
+        self.cards = [card_for(sid) for sid in card_ids]
+
+    def solve(self) -> float:
+        bm = self.bm
+        bm.start_battle()
+        bm.start_turn()     # 山札は空なので何も引かない
+        bm.pdeck.draw_pile[:] = self.cards
+        return self._draw(self.hand_size)
+
+    def _draw(self, need: int) -> float:
+        bm = self.bm
+        deck = bm.pdeck
+        if need == 0 or not (deck.draw_pile or deck.discard_pile):
+            return self._player()
+        state = bm.snapshot(include_rng=False)
+        n = len(deck.draw_pile) or len(deck.discard_pile)
+        total = 0.0
+        for i in range(n):
+            bm.restore(state)
+            if not deck.draw_pile:
+                deck.draw_pile[:] = deck.discard_pile
+                deck.discard_pile[:] = []
+            deck.hand.append(deck.draw_pile.pop(i))
+            total += self._draw(need - 1) / n
+        return total
+
+    def _player(self) -> float:
+        bm = self.bm
+        state = bm.snapshot(include_rng=False)
+        best = 0.0
+        for i in range(len(state.pdeck.hand)):
+            bm.restore(state)
+            bm.play_player_card(i)
+            if not bm.last_play_ok:
+                continue
+            if bm.player.hp <= 0 or bm.enemy.hp <= 0:
+                v = 1.0 if bm.player.hp > 0 else 0.0
+            else:
+                v = self._player()
+            best = max(best, v)
+        return max(best, self._end_turn(state))
+
+    def _end_turn(self, state) -> float:
+        bm = self.bm
+        deck = bm.pdeck
+        total = 0.0
+        for weight, a in self.branches:
+            bm.restore(state)
+            bm.end_turn()
+            self.rng.index = a
+            bm.enemy_act()
+            if bm.player.hp <= 0 or bm.enemy.hp <= 0:
+                total += weight if bm.player.hp > 0 else 0.0
+                continue
+            if bm.turn > self.max_turns:
+                continue
+            draw, disc = list(deck.draw_pile), list(deck.discard_pile)
+            deck.draw_pile[:] = []
+            deck.discard_pile[:] = []
+            bm.start_turn()
+            deck.draw_pile[:] = draw
+            deck.discard_pile[:] = disc
+            total += weight * self._draw(max(0, self.hand_size - len(deck.hand)))
+        return total
+
+
+class BruteForceTest(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        for ids, enemy, kw in CASES:
+            with self.subTest(deck=ids, enemy=enemy):
+                solver = ExactSolver(ids, enemy=enemy, **kw)
+                exact = solver.solve()
+                self.assertTrue(0.0 < exact < 1.0)
+                brute = _BruteForce(ids, enemy, solver.enemy_branches, **kw).solve()
+                self.assertAlmostEqual(exact, brute, places=9)
+                self.assertEqual(solver.solve(), exact)    # 転置表を使い回しても同じ
+
+
+class UnsupportedTest(unittest.TestCase):
+
+    def test_rejects_unsolvable(self):
+        kw = CASES[0][2]
+        with self.assertRaises(ValueError):
+            ExactSolver(["S1", "S2"], enemy="RIVAL_DECK", **kw)
+        with self.assertRaises(ValueError):
+            ExactSolver(["S1", "S2", "S26"], **kw)     # 手番中にカードを引く
+
+
+if __name__ == "__main__":
+    unittest.main()
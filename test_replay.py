@@ -0,0 +1,30 @@
+# test_replay.py
+"""
+replay の回帰テスト（python -m pytest -q / python -m unittest）
+
+- 記録 → バイト列 → 再生 が記録時の GameResult と一致（S32・pattern / deck 型の敵を含む）
+"""
+
+import unittest
+
+from replay import Replay, replay_battle, run_batch_recorded
+from starter_decks import make_starter_deck
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+
+
+class ReplayTest(unittest.TestCase):
+
+    def test_record_replay_roundtrip(self):
+        decks = {"starter": STARTER, "s32": STARTER + ["S32", "S32", "S16"]}
+        for label, ids in decks.items():
+            for enemy in ("DEFAULT", "SAMURAI_SCRIPTED", "RIVAL_DECK"):
+                with self.subTest(deck=label, enemy=enemy):
+                    for r, rep in run_batch_recorded(ids, range(100), enemy_hp=60, enemy=enemy):
+                        again = Replay.from_bytes(rep.to_bytes())
+                        self.assertEqual(again, rep)
+                        self.assertEqual(replay_battle(again), r)
+
+
+if __name__ == "__main__":
+    unittest.main()
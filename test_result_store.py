@@ -0,0 +1,81 @@
+# test_result_store.py
+"""
+result_store の回帰テスト（python -m pytest -q / python -m unittest）
+
+- ResultWriter → ResultReader で1戦ずつのレコードと集計が simulate.run_batch と一致
+  （チャンク境界をまたぐ書き出し・敵ごとに別のデッキキー）
+- with の中で例外が出たらフッタを書かない：書けたレコードだけ読め、strict=True ならエラー
+"""
+
+import os
+import tempfile
+import unittest
+
+from enemy_ai import DEFAULT_ENEMY
+from simulate import run_batch, summarize
+from starter_decks import make_starter_deck
+from vector_sim import WINNERS
+
+try:
+    from result_store import ResultFile, ResultReader, ResultWriter, deck_hash, write_batch
+    import numpy as np
+except ImportError:
+    np = None
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+N = 150
+KW = dict(enemy_hp=80)
+
+
+@unittest.skipIf(np is None, "numpy が無い")
+class RoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "sweep.cbr")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_records_and_aggregate_match_run_batch(self):
+        with ResultWriter(self.path, chunk=64) as w:
+            write_batch(w, STARTER, range(N), **KW)
+            write_batch(w, STARTER, range(N), enemy="ASHIGARU_RAIDER", **KW)
+        rf = ResultFile(self.path)
+        self.assertTrue(rf.complete)
+        self.assertEqual(rf.count, 2 * N)
+
+        ref = list(run_batch(STARTER, range(N), **KW))
+        recs = rf.records()[:N]
+        self.assertEqual(
+            [(int(r["seed"]), WINNERS[r["winner"]], int(r["turns"]), int(r["player_hp"]),
+              int(r["enemy_hp"]), int(r["cards_played"])) for r in recs],
+            [(r.seed, r.winner, r.turns, r.player_hp, r.enemy_hp, r.cards_played) for r in ref],
+        )
+
+        agg = ResultReader([self.path]).aggregate(rows=100)
+        self.assertEqual(len(agg), 2)
+        mine = agg[deck_hash(STARTER)]
+        self.assertEqual(mine["cards"], sorted(STARTER))
+        self.assertEqual(mine["enemy"], DEFAULT_ENEMY)
+        for k, v in summarize(ref).items():
+            self.assertAlmostEqual(mine[k], v, msg=k)
+        self.assertAlmostEqual(sum(mine["plays_per_game"].values()) * N, sum(r.cards_played for r in ref))
+        other = agg[deck_hash(STARTER, "ASHIGARU_RAIDER")]
+        self.assertEqual(other["enemy"], "ASHIGARU_RAIDER")
+
+    def test_exception_leaves_file_incomplete(self):
+        with self.assertRaises(RuntimeError):
+            with ResultWriter(self.path, chunk=64) as w:
+                write_batch(w, STARTER, range(N), **KW)
+                raise RuntimeError("途中で失敗")
+        rf = ResultFile(self.path)
+        self.assertFalse(rf.complete)
+        self.assertEqual(rf.count, N)
+        self.assertEqual(len(ResultReader([self.path])), N)
+        with self.assertRaises(ValueError):
+            ResultReader([self.path], strict=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+# test_simulate.py
+"""
+simulate の回帰テスト（python -m pytest -q / python -m unittest）
+
+- 同じ seed なら同じ結果（mt / counter）
+- BattleRunner を使い回した run_batch が、1戦ずつ組み立てる run_battle と1戦ずつ一致
+"""
+
+import unittest
+
+from simulate import run_batch, run_battle
+from starter_decks import make_starter_deck
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+
+N = 300
+
+
+class DeterminismTest(unittest.TestCase):
+
+    def test_same_seed_same_result(self):
+        for kind in ("mt", "counter"):
+            with self.subTest(rng_kind=kind):
+                a = list(run_batch(STARTER, range(N), rng_kind=kind, enemy_hp=80))
+                b = list(run_batch(STARTER, range(N), rng_kind=kind, enemy_hp=80))
+                self.assertEqual(a, b)
+
+
+class RunnerReuseTest(unittest.TestCase):
+
+    def test_batch_matches_fresh_battles(self):
+        deck = STARTER + ["S32", "S16"]
+        for kind in ("mt", "counter"):
+            for enemy in ("DEFAULT", "SAMURAI_SCRIPTED", "RIVAL_DECK"):
+                with self.subTest(rng_kind=kind, enemy=enemy):
+                    kw = dict(rng_kind=kind, enemy_hp=60, enemy=enemy)
+                    batch = list(run_batch(deck, range(50), **kw))
+                    fresh = [run_battle(deck, seed, **kw) for seed in range(50)]
+                    self.assertEqual(batch, fresh)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+# test_vector_sim.py
+"""
+vector_sim（NumPy 一括版）の回帰テスト（python -m pytest -q / python -m unittest）
+
+- simulate（スカラー版）と rng_kind="counter" で1戦ずつ完全一致
+  弱体（ON_ATTACK_CALC）・反撃（ON_HIT）を含むデッキと、weighted 型の敵で確かめる
+"""
+
+import unittest
+
+from simulate import run_batch
+from starter_decks import make_starter_deck
+from vector_sim import np, results_from_arrays, simulate_arrays, vectorizable
+
+STARTER = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+
+# 一括化できるデッキ（弱体・反撃を含む）
+VECTOR_DECKS = {
+    "starter": STARTER,
+    "weak": ["S4", "S4", "S9", "S9", "S10", "S12", "S1", "S1", "S3", "S3"],
+    "counter": ["S16", "S16", "S16", "S22", "S22", "S2", "S2", "S6", "S1", "S3"],
+}
+VECTOR_ENEMIES = ("DEFAULT", "ASHIGARU_RAIDER")
+
+N = 300
+
+
+@unittest.skipIf(np is None, "numpy が無い")
+class VectorParityTest(unittest.TestCase):
+
+    def test_vector_matches_scalar(self):
+        for label, ids in VECTOR_DECKS.items():
+            for enemy in VECTOR_ENEMIES:
+                with self.subTest(deck=label, enemy=enemy):
+                    self.assertTrue(vectorizable(ids, enemy=enemy))
+                    kw = dict(enemy_hp=80, enemy=enemy)
+                    vec = results_from_arrays(simulate_arrays(ids, range(N), **kw))
+                    ref = list(run_batch(ids, range(N), rng_kind="counter", **kw))
+                    self.assertEqual(vec, ref)
+
+
+if __name__ == "__main__":
+    unittest.main()
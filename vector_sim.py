@@ -0,0 +1,519 @@
+# vector_sim.py
+"""
+NumPy による一括戦闘シミュレータ（勝率スイープ用）
+
+何千戦ぶんの HP・Block・エナジー・山札・手札・捨て札を戦闘数ぶんの配列で持ち、
+全戦闘を1ターンずつ足並みをそろえて進める。カード効果も op ごとに全戦闘へ一括で適用する。
+
+対象（vectorizable）:
+    - プランが attack / gain_block / add_weak / add_counter の step だけでできたカード
+      （旧タグ由来でも中身が同じ step なら可。スキルの「使用した」だけの step も可。
+        バフの step は「敵に WEAK 2T」「自分に COUNTER 1T（on_hit）」の形だけ）
+    - policy は greedy_policy、rng_kind は "counter"（CounterRNG は NumPy で同じ値を再現できる）
+    - 敵は weighted 型で、各 intent が「attack の列 → gain_block」だけのもの（vector_enemy）
+それ以外は simulate.run_batch（スカラーの BattleManager）にそのまま回す。
+
+同じ seed ならスカラー版と同じ GameResult を返す：
+    - 乱数の消費順（初回シャッフル → 山札切れの再シャッフル → enemy_act の抽選）を
+      BattleManager と同じにしている（抽選は randbelow(重み合計) → 累積重みの表を二分探索）
+    - 敵に付けた WEAK 2T は直後の敵行動の各ヒットを段数ぶん減らし、次の敵行動の前に切れる
+    - 自分に付けた COUNTER 1T は直後の敵行動の各ヒットで敵に返り（敵の Block に当たる）、
+      次のプレイヤーターン開始で切れる
+      → どちらも「このターンに出した分の合計」を敵行動のあとで 0 に戻すだけでよい
+
+    from vector_sim import run_batch_vec
+    results = run_batch_vec(ids, range(100_000))
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy が無ければ常にスカラー版
+    np = None
+
+from card_effects import (
+    COUNTER, ON_ATTACK_CALC, ON_HIT, WEAK, _op_add_counter, _op_add_weak, _op_attack, _op_gain_block,
+    _step_add_buff, _step_use_skill,
+)
+from enemy_ai import DEFAULT_ENEMY, MODE_WEIGHTED, get_enemy_plan
+from master_deck import MasterDeck
+from model import CardInstance
+from rng import _GAMMA
+from simulate import GameResult, Policy, greedy_policy, run_batch
+
+WINNERS: Tuple[str, ...] = ("player", "enemy", "draw", "timeout")
+_W_PLAYER, _W_ENEMY, _W_DRAW, _W_TIMEOUT = range(4)
+
+EnemyActions = Tuple[Tuple[Tuple[int, ...], int], ...]
+
+
+def vector_enemy(enemy_id: str) -> Optional[Tuple[EnemyActions, Tuple[int, ...]]]:
+    """
+    敵の行動表を (intent ごとの (ダメージ列, Block), 累積重み) にまとめる。一括化できなければ None。
+    Block は攻撃のあとに足す（反撃が敵の Block に当たる順番を変えないため、
+    gain_block のあとに attack が来る intent は対象外）。
+    """
+    plan = get_enemy_plan(enemy_id)
+    if plan.mode != MODE_WEIGHTED:
+        return None
+    actions = []
+    for intent in plan.intents:
+        hits: List[int] = []
+        block = 0
+        for step in intent.plan:
+            fn = getattr(step, "func", step)
+            if fn is _op_attack and not block:
+                hits.append(max(int(step.args[0]), 0))
+            elif fn is _op_gain_block:
+                block += step.args[0]
+            else:
+                return None
+        actions.append((tuple(hits), block))
+    return tuple(actions), plan.cum
+
+
+# 既定の敵（旧 enemy_act の3択）の (ダメージ列, Block)
+ENEMY_ACTIONS: EnemyActions = vector_enemy(DEFAULT_ENEMY)[0]
+
+
+# =========================
+# カードの判定
+# =========================
+
+def vector_card(card: CardInstance) -> Optional[Tuple[int, int, int, int]]:
+    """
+    カード1枚を (与ダメージ合計, 獲得Block合計, 敵への弱体, 自分の反撃) にまとめる。
+    一括化できなければ None。
+    同じカード内の複数ヒットは Block に順に当たるが、吸収量の合計は
+    min(Block, ダメージ合計) と同じなので合算してよい（プレイヤーの攻撃は弱体の影響を受けない）。
+    """
+    dmg = block = weak = counter = 0
+    for step in card.plan:
+        fn = getattr(step, "func", step)
+        args = getattr(step, "args", ())
+        if fn is _op_attack:
+            dmg += max(int(args[0]), 0)
+        elif fn is _op_gain_block:
+            block += args[0]
+        elif fn is _op_add_weak:
+            weak += args[0]
+        elif fn is _op_add_counter:
+            counter += args[0]
+        elif fn is _step_use_skill:
+            pass
+        elif fn is _step_add_buff:
+            on_target, kind, power, turns, trigger = args
+            if kind == WEAK and on_target and turns == 2 and trigger == ON_ATTACK_CALC:
+                weak += power
+            elif kind == COUNTER and not on_target and turns == 1 and trigger == ON_HIT:
+                counter += power
+            else:
+                return None
+        else:
+            return None
+    return dmg, block, weak, counter
+
+
+def vectorizable(card_ids: Sequence[str], policy: Policy = greedy_policy, rng_kind: str = "counter",
+                 enemy: str = DEFAULT_ENEMY) -> bool:
+    if np is None or policy is not greedy_policy or rng_kind != "counter":
+        return False
+    if vector_enemy(enemy) is None:
+        return False
+    return all(vector_card(c) is not None for c in MasterDeck(card_ids).instantiate())
+
+
+# =========================
+# CounterRNG の一括版
+# =========================
+
+if np is not None:
+    _U30, _U27, _U31, _U32 = (np.uint64(s) for s in (30, 27, 31, 32))
+    _M1 = np.uint64(0xBF58476D1CE4E5B9)
+    _M2 = np.uint64(0x94D049BB133111EB)
+    _G = np.uint64(_GAMMA)
+
+
+def _mix64(z: "np.ndarray") -> "np.ndarray":
+    z = (z ^ (z >> _U30)) * _M1
+    z = (z ^ (z >> _U27)) * _M2
+    return z ^ (z >> _U31)
+
+
+class _Chunk:
+    """
+    戦闘 B 件ぶんの状態。
+    山札・捨て札・手札は (枚目, 戦闘) の向きに持ち、1枚目・2枚目…の行がそれぞれ連続した (B,) 配列になる。
+    各山の末尾に1行余分な「捨て行」を置き、対象外の戦闘の書き込みはそこに逃がす
+    （行ごとにマスクで詰め直さず、全戦闘に同じ命令を流すため）。
+    """
+
+    ARRAYS = ("key", "ctr", "php", "ehp", "pblock", "eblock", "energy",
+              "turn", "played", "dlen", "hlen", "clen", "orig")
+    PILES = ("draw", "hand", "disc")
+
+    def __init__(self, seeds: "np.ndarray", deck: "np.ndarray", hand_size: int,
+                 player_hp: int, enemy_hp: int, orig: "np.ndarray"):
+        n, d = len(seeds), len(deck)
+        i32 = np.int32
+        self.n = n
+        self.key = _mix64(seeds)
+        self.ctr = np.zeros(n, np.uint64)
+        self.php = np.full(n, player_hp, i32)
+        self.ehp = np.full(n, enemy_hp, i32)
+        self.pblock = np.zeros(n, i32)
+        self.eblock = np.zeros(n, i32)
+        self.energy = np.zeros(n, i32)
+        self.turn = np.ones(n, i32)
+        self.played = np.zeros(n, i32)
+        self.draw = np.zeros((d + 1, n), deck.dtype)
+        self.draw[:d] = deck[:, None]
+        self.dlen = np.full(n, d, i32)
+        self.hand = np.zeros((hand_size + 1, n), deck.dtype)
+        self.hlen = np.zeros(n, i32)
+        self.disc = np.zeros((d + 1, n), deck.dtype)
+        self.clen = np.zeros(n, i32)
+        self.orig = orig
+        self.ar = np.arange(n)
+
+    def keep(self, mask: "np.ndarray") -> None:
+        for name in self.ARRAYS:
+            setattr(self, name, getattr(self, name)[mask])
+        # reshape(-1) で書き込めるよう C 連続に戻す（[:, mask] は連続とは限らない）
+        for name in self.PILES:
+            setattr(self, name, np.ascontiguousarray(getattr(self, name)[:, mask]))
+        self.n = len(self.orig)
+        self.ar = np.arange(self.n)
+
+    # ---- 乱数 ----
+    def randbelow(self, mask: "np.ndarray", n: int) -> "np.ndarray":
+        """mask の戦闘だけ CounterRNG.randbelow(n) を1回引く（他の戦闘の値は捨てる）。"""
+        self.ctr += mask
+        z = _mix64(self.key + self.ctr * _G)
+        return ((z >> _U32) * np.uint64(n) >> _U32).astype(np.int32)
+
+    def shuffle_draw(self, mask: "np.ndarray") -> None:
+        """mask の戦闘の山札を Fisher-Yates（CounterRNG.shuffle と同じ順）で混ぜる。"""
+        lens = np.where(mask, self.dlen, 0)
+        top = int(lens.max())
+        draw = self.draw
+        flat = draw.reshape(-1)
+        dummy = (draw.shape[0] - 1) * self.n + self.ar
+        for i in range(top - 1, 0, -1):
+            m = lens > i
+            j = self.randbelow(m, i + 1)
+            a = draw[i].copy()
+            pos = j * self.n + self.ar
+            draw[i] = np.where(m, flat[pos], a)
+            flat[np.where(m, pos, dummy)] = a
+
+    # ---- 山札 → 手札 ----
+    def draw_to(self, hand_size: int) -> None:
+        """手札が hand_size 枚になるまで引く（BattleDeck.draw と同じく山札切れで再シャッフル）。"""
+        n, ar = self.n, self.ar
+        for _ in range(hand_size):
+            sel = self.hlen < hand_size
+            if not sel.any():
+                return
+            empty = sel & (self.dlen == 0) & (self.clen > 0)
+            if empty.any():
+                self.draw = np.where(empty, self.disc, self.draw)
+                self.dlen = np.where(empty, self.clen, self.dlen)
+                self.clen = np.where(empty, 0, self.clen)
+                self.shuffle_draw(empty)
+            can = sel & (self.dlen > 0)
+            card = self.draw.reshape(-1)[np.where(can, self.dlen - 1, 0) * n + ar]
+            self.hand.reshape(-1)[np.where(can, self.hlen, hand_size) * n + ar] = card
+            self.dlen -= can
+            self.hlen += can
+
+
+def _run_chunk(
+    seeds: "np.ndarray",
+    orig: "np.ndarray",
+    out: Dict[str, "np.ndarray"],
+    deck: "np.ndarray",
+    cost_t: "np.ndarray",
+    dmg_t: "np.ndarray",
+    blk_t: "np.ndarray",
+    weak_t: "np.ndarray",
+    ctr_t: "np.ndarray",
+    actions: EnemyActions,
+    cum: Tuple[int, ...],
+    *,
+    player_hp: int,
+    enemy_hp: int,
+    max_energy: int,
+    hand_size: int,
+    max_turns: int,
+) -> None:
+    # 行動ごとのヒット列（足りない分は -1 = ヒットなし）。末尾の列は「行動しない」（決着済みの戦闘用）
+    n_act = len(actions)
+    n_hits = max(len(h) for h, _ in actions)
+    act_hits = np.full((n_hits, n_act + 1), -1, np.int32)
+    for a, (hits, _) in enumerate(actions):
+        act_hits[:len(hits), a] = hits
+    act_blk = np.array([b for _, b in actions] + [0], np.int32)
+    act_cum = np.array(cum, np.int32)
+    total = int(cum[-1])
+    # デッキに弱体・反撃のカードが無ければ、その集計と反撃の当たり判定を丸ごと省く
+    has_weak = bool(weak_t.any())
+    has_ctr = bool(ctr_t.any())
+    H = hand_size
+
+    ch = _Chunk(seeds, deck, H, player_hp, enemy_hp, orig)
+
+    def finish(done: "np.ndarray", winner, turns: "np.ndarray") -> None:
+        o = ch.orig[done]
+        out["winner"][o] = winner
+        out["turns"][o] = turns[done]
+        out["player_hp"][o] = ch.php[done]
+        out["enemy_hp"][o] = ch.ehp[done]
+        out["cards_played"][o] = ch.played[done]
+
+    def winner_of(done: "np.ndarray") -> "np.ndarray":
+        pdead = ch.php[done] <= 0
+        edead = ch.ehp[done] <= 0
+        return np.where(pdead & edead, _W_DRAW, np.where(pdead, _W_ENEMY, _W_PLAYER))
+
+    # 初回シャッフル（BattleDeck の生成時）→ start_battle → start_turn
+    ch.shuffle_draw(np.ones(ch.n, bool))
+    ch.energy[:] = max_energy
+    ch.draw_to(H)
+
+    while ch.n:
+        alive = np.ones(ch.n, bool)
+
+        # --- プレイヤーターン（greedy：手札の先頭から払えるカードを出す） ---
+        # ops だけのデッキではエナジーは減る一方なので、一度払えなかったカードはこのターン中
+        # ずっと払えない。よって「先頭から払えるものを出す」の繰り返しは、手札を左から
+        # 1回なめて払えるカードを順に出すのと同じ手順になる。
+        hand, hlen = ch.hand, ch.hlen
+        d = ch.disc.shape[0] - 1
+        disc_flat = ch.disc.reshape(-1)
+        live = alive.copy()
+        weak = np.zeros(ch.n, np.int32)       # このターンに敵へ付けた弱体
+        counter = np.zeros(ch.n, np.int32)    # このターンに自分へ付けた反撃
+        used = []
+        for k in range(H):
+            c = hand[k]
+            cst = cost_t[c]
+            ok = live & (hlen > k) & (cst <= ch.energy)
+            used.append(ok)
+            if not ok.any():
+                continue
+            ch.energy -= np.where(ok, cst, 0)
+            dm = np.where(ok, dmg_t[c], 0)
+            absorb = np.minimum(ch.eblock, dm)
+            ch.eblock -= absorb
+            ch.ehp = np.maximum(0, ch.ehp - (dm - absorb))
+            ch.pblock += np.where(ok, blk_t[c], 0)
+            if has_weak:
+                weak += np.where(ok, weak_t[c], 0)
+            if has_ctr:
+                counter += np.where(ok, ctr_t[c], 0)
+            disc_flat[np.where(ok, ch.clen, d) * ch.n + ch.ar] = c
+            ch.clen += ok
+            ch.played += ok
+            # ops だけならプレイヤー側は自分のターンに倒れないので敵HPだけ見る
+            over = ok & (ch.ehp <= 0)
+            if over.any():
+                done = np.nonzero(over)[0]
+                finish(done, winner_of(done), ch.turn)
+                alive &= ~over
+                live &= ~over
+        # 残った手札を前に詰める
+        new_hand = np.zeros_like(hand)
+        flat = new_hand.reshape(-1)
+        pos = np.zeros(ch.n, np.int32)
+        for k in range(H):
+            rest = (hlen > k) & ~used[k]
+            flat[np.where(rest, pos, H) * ch.n + ch.ar] = hand[k]
+            pos += rest
+        ch.hand = new_hand
+        ch.hlen = pos
+
+        # --- end_turn → enemy_act ---
+        ch.turn += alive
+        act = np.searchsorted(act_cum, ch.randbelow(alive, total), side="right")
+        act[~alive] = n_act
+        for hits in act_hits:
+            # 1ヒットずつ：弱体で減らして Block → HP、まだ立っていれば反撃を敵に返す
+            # （ヒットなしは -1 なので、弱体を引いて 0 で止めれば 0 ダメージになる）
+            h = hits[act]
+            dm = np.maximum(h - weak, 0) if has_weak else np.maximum(h, 0)
+            absorb = np.minimum(ch.pblock, dm)
+            ch.pblock -= absorb
+            ch.php = np.maximum(0, ch.php - (dm - absorb))
+            if has_ctr:
+                back = np.where((h >= 0) & (ch.php > 0), counter, 0)
+                absorb = np.minimum(ch.eblock, back)
+                ch.eblock -= absorb
+                ch.ehp = np.maximum(0, ch.ehp - (back - absorb))
+        ch.eblock += act_blk[act]
+
+        over = alive & ((ch.php <= 0) | (ch.ehp <= 0))
+        if over.any():
+            done = np.nonzero(over)[0]
+            finish(done, winner_of(done), ch.turn)
+            alive &= ~over
+        late = alive & (ch.turn > max_turns)
+        if late.any():
+            finish(np.nonzero(late)[0], _W_TIMEOUT, ch.turn - 1)
+            alive &= ~late
+
+        # 決着した戦闘を配列から外す
+        if not alive.all():
+            ch.keep(alive)
+        if not ch.n:
+            break
+
+        # --- start_turn ---
+        ch.pblock[:] = 0
+        ch.eblock[:] = 0
+        ch.energy[:] = max_energy
+        ch.draw_to(H)
+
+
+# =========================
+# 本体
+# =========================
+
+# 1チャンクの戦闘数（状態がキャッシュに収まるくらい）
+CHUNK = 16384
+
+
+def simulate_arrays(
+    card_ids: Sequence[str],
+    seeds: Iterable[int],
+    *,
+    player_hp: int = 40,
+    enemy_hp: int = 35,
+    max_energy: int = 3,
+    hand_size: int = 5,
+    max_turns: int = 100,
+    enemy: str = DEFAULT_ENEMY,
+    chunk: int = CHUNK,
+) -> Dict[str, "np.ndarray"]:
+    """
+    greedy_policy・CounterRNG での全戦闘を一括で回し、結果を列ごとの配列で返す：
+        seed, winner（WINNERS の添字）, turns, player_hp, enemy_hp, cards_played
+    vectorizable でないデッキには ValueError。
+    """
+    if np is None:
+        raise ImportError("vector_sim には numpy が必要です")
+    venemy = vector_enemy(enemy)
+    if venemy is None:
+        raise ValueError(f"敵 {enemy} は一括化できません")
+    actions, cum = venemy
+    cards = MasterDeck(card_ids).instantiate()
+    # デッキ内のカードを 0.. の局所番号に振り直し、番号ごとのコスト・ダメージ・Block を表にする
+    local: Dict[str, int] = {}
+    cost: List[int] = []
+    dmg: List[int] = []
+    blk: List[int] = []
+    weak: List[int] = []
+    ctr: List[int] = []
+    for c in cards:
+        if c.spec_id in local:
+            continue
+        v = vector_card(c)
+        if v is None:
+            raise ValueError(f"{c.spec_id} は一括化できません")
+        local[c.spec_id] = len(cost)
+        cost.append(max(0, c.cost))
+        dmg.append(v[0])
+        blk.append(v[1])
+        weak.append(v[2])
+        ctr.append(v[3])
+    cost_t = np.array(cost, np.int32)
+    dmg_t = np.array(dmg, np.int32)
+    blk_t = np.array(blk, np.int32)
+    weak_t = np.array(weak, np.int32)
+    ctr_t = np.array(ctr, np.int32)
+    deck = np.array([local[c.spec_id] for c in cards], np.int8 if len(cost) < 128 else np.int16)
+
+    if isinstance(seeds, range) and seeds.start >= 0:
+        seed_arr = np.arange(seeds.start, seeds.stop, seeds.step, dtype=np.uint64)
+    else:
+        seed_arr = np.array([int(s) & ((1 << 64) - 1) for s in seeds], np.uint64)
+    n = len(seed_arr)
+    out = {
+        "seed": seed_arr,
+        "winner": np.zeros(n, np.int8),
+        "turns": np.zeros(n, np.int32),
+        "player_hp": np.zeros(n, np.int32),
+        "enemy_hp": np.zeros(n, np.int32),
+        "cards_played": np.zeros(n, np.int32),
+    }
+    for s in range(0, n, chunk):
+        e = min(s + chunk, n)
+        _run_chunk(
+            seed_arr[s:e], np.arange(s, e), out, deck, cost_t, dmg_t, blk_t, weak_t, ctr_t, actions, cum,
+            player_hp=player_hp, enemy_hp=enemy_hp, max_energy=max_energy,
+            hand_size=hand_size, max_turns=max_turns,
+        )
+    return out
+
+
+def results_from_arrays(out: Dict[str, "np.ndarray"]) -> List[GameResult]:
+    cols = [out[k].tolist() for k in ("seed", "winner", "turns", "player_hp", "enemy_hp", "cards_played")]
+    return [
+        GameResult(s, WINNERS[w], t, php, ehp, played)
+        for s, w, t, php, ehp, played in zip(*cols)
+    ]
+
+
+def summarize_arrays(out: Dict[str, "np.ndarray"]) -> dict:
+    """simulate.summarize と同じ集計を配列のまま行う。"""
+    n = len(out["winner"])
+    if n == 0:
+        return {"games": 0, "win_rate": 0.0, "avg_turns": 0.0, "avg_hp_left": 0.0}
+    win = out["winner"] == _W_PLAYER
+    wins = int(win.sum())
+    return {
+        "games": n,
+        "win_rate": wins / n,
+        "avg_turns": int(out["turns"].sum()) / n,
+        "avg_hp_left": int(out["player_hp"][win].sum()) / wins if wins else 0.0,
+    }
+
+
+def run_batch_vec(
+    card_ids: Sequence[str],
+    seeds: Iterable[int],
+    policy: Policy = greedy_policy,
+    *,
+    rng_kind: str = "counter",
+    **kwargs,
+) -> List[GameResult]:
+    """
+    simulate.run_batch の一括版。一括化できない条件ならスカラー版で回す。
+    結果は seeds の順。
+    """
+    if vectorizable(card_ids, policy, rng_kind, kwargs.get("enemy", DEFAULT_ENEMY)):
+        return results_from_arrays(simulate_arrays(card_ids, seeds, **kwargs))
+    return list(run_batch(card_ids, seeds, policy, rng_kind=rng_kind, **kwargs))
+
+
+if __name__ == "__main__":
+    import time
+    from simulate import summarize
+    from starter_decks import make_starter_deck
+
+    ids = [c.spec_id for c in make_starter_deck("HIDEYOSHI")]
+    n = 200_000
+    t0 = time.perf_counter()
+    out = simulate_arrays(ids, range(n))
+    dt = time.perf_counter() - t0
+    print("vector", summarize_arrays(out))
+    print(f"{n} battles in {dt:.2f}s ({n / dt:,.0f} battles/s)")
+
+    m = 20_000
+    t0 = time.perf_counter()
+    ref = list(run_batch(ids, range(m), rng_kind="counter"))
+    dt = time.perf_counter() - t0
+    print("scalar", summarize(ref))
+    print(f"{m} battles in {dt:.2f}s ({m / dt:,.0f} battles/s)")